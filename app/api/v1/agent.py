@@ -1,23 +1,37 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import StreamingResponse
 import time
-from typing import Optional, Union
-
-from core.schemas.chat import ChatRequest, ChatResponse
-from core.services.agent_service import AgentService
-from core.services.memory_service import MemoryService
+from threading import Lock
+from typing import TYPE_CHECKING, Optional, Union
+import json
+
+from core.observability.spans import recording
+from core.schemas.chat import ChatBatchRequest, ChatRequest, ChatResponse
+from core.repositories.long_term_memory import LongTermMemoryRepo
+from core.services.chat_coordination import UserBusyError
+from core.services.extraction_gate import get_extraction_gate
+from core.services.llm_resilience import LLMTimeoutError, LLMUnavailableError
+from core.services.memory_service import get_memory_service
 from core.services.tavily_service import TavilyService
 from core.services.conversation import ConversationService
+from core.services.user_data import get_user_data_service
 from config import settings
 
+if TYPE_CHECKING:
+    from core.services.agent_service import AgentService
+
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
 
-def _build_agent() -> AgentService:
+def _build_agent() -> "AgentService":
+    # Imported here so routes that don't chat never pay for langgraph/torch/genai
+    from core.services.agent_service import AgentService
+
     conversation = ConversationService()
-    memory = MemoryService()
+    memory = get_memory_service()
     tavily = None
     try:
         if settings.tavily_api_key:
@@ -26,31 +40,93 @@ def _build_agent() -> AgentService:
         tavily = None
     return AgentService(memory=memory, tavily=tavily, conversation=conversation)
 
-# Reuse a singleton agent to avoid reloading models per request
-AGENT = _build_agent()
+_AGENT: Optional["AgentService"] = None
+_AGENT_LOCK = Lock()
+
+
+def get_agent() -> "AgentService":
+    """
+    Reuse a singleton agent to avoid reloading models per request; built on first use
+    (or explicitly by the startup warmup).
+    """
+    global _AGENT
+    if _AGENT is None:
+        with _AGENT_LOCK:
+            if _AGENT is None:
+                _AGENT = _build_agent()
+    return _AGENT
 
 
 @router.post("/chat", response_model=ChatResponse)
 def chat(req: ChatRequest) -> ChatResponse:
     try:
         t0 = time.perf_counter()
-        out = AGENT.chat(user_id=req.user_id or req.username, username=req.username, message=req.message)
+        with recording() as rec:
+            out = get_agent().chat(
+                user_id=req.user_id or req.username,
+                username=req.username,
+                message=req.message,
+                idempotency_key=req.idempotency_key,
+            )
         elapsed = time.perf_counter() - t0
-        return ChatResponse(message=out.get("message", ""), gen_time_sec=round(elapsed, 4), agent_id="langgraph-agent", agent_detail={
+        detail = {
             "long_term": out.get("long_term", []),
             "search_results": out.get("search_results", []),
             "extracted_facts": out.get("extracted_facts", []),
-        })
+            "prompt_tokens": out.get("prompt_tokens", {}),
+            "retrieval": out.get("retrieval", {}),
+            "replayed": bool(out.get("replayed")),
+        }
+        if req.include_agent_detail:
+            detail["timings"] = rec.as_dict()
+        return ChatResponse(message=out.get("message", ""), gen_time_sec=round(elapsed, 4), agent_id="langgraph-agent", agent_detail=detail)
     except HTTPException:
         raise
+    except UserBusyError as e:
+        # Another request of this user is still running
+        raise HTTPException(status_code=409, detail=str(e))
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/chat/batch")
+def chat_batch(req: ChatBatchRequest):
+    """
+    Bulk chat for offline jobs. Streams NDJSON: one {"type": "result"} line per item as it
+    finishes (`index` is its position in `items`), then a {"type": "done"} summary.
+    Messages of the same user are processed in order.
+    """
+    if len(req.items) > settings.chat_batch_max_items:
+        raise HTTPException(status_code=413, detail=f"at most {settings.chat_batch_max_items} items per batch")
+    agent = get_agent()
+    items = [it.model_dump() for it in req.items]
+
+    def lines():
+        t0 = time.perf_counter()
+        ok = failed = 0
+        results = agent.chat_batch(items, max_concurrency=req.max_concurrency)
+        try:
+            for out in results:
+                ok, failed = (ok + 1, failed) if out.get("ok") else (ok, failed + 1)
+                yield json.dumps({"type": "result", **out}, ensure_ascii=False, default=str) + "\n"
+        finally:
+            # A disconnected client closes this generator; stop the batch with it
+            results.close()
+        yield json.dumps({"type": "done", "ok": ok, "failed": failed, "elapsed_sec": round(time.perf_counter() - t0, 4)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/conversation/{user_id}/recent")
 def recent_conversation(user_id: Union[int, str], k: int = Query(10, ge=1, le=50)):
     try:
-        conv = ConversationService().get_conversation(user_id=user_id, page_size=k, newest_first=True)
+        conv = ConversationService().get_conversation(
+            user_id=user_id, page_size=k, newest_first=True, read_preference=settings.mongo_hot_read_preference,
+        )
         return list(reversed([{k: d[k] for k in ("role", "content", "created_at", "message_id")} for d in conv["items"]]))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -59,7 +135,9 @@ def recent_conversation(user_id: Union[int, str], k: int = Query(10, ge=1, le=50
 @router.get("/memory/long-term/{user_id}")
 def list_long_term_memory(user_id: Union[int, str], limit: Optional[int] = Query(None, ge=1, le=200)):
     try:
-        docs = MemoryService().list_long_term_memory(user_id=user_id, limit=limit)
+        docs = LongTermMemoryRepo().list_by_user(
+            user_id=user_id, limit=limit, read_preference=settings.mongo_hot_read_preference,
+        )
         out = []
         for d in docs:
             dd = dict(d)
@@ -74,11 +152,22 @@ def list_long_term_memory(user_id: Union[int, str], limit: Optional[int] = Query
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/memory/retrieval-stats")
+def memory_retrieval_stats():
+    return get_agent().memory.retrieval_stats()
+
+
+@router.get("/memory/extraction-gate-stats")
+def memory_extraction_gate_stats():
+    gate = get_extraction_gate()
+    return gate.stats() if gate is not None else {"enabled": False}
+
+
 @router.get("/tools/search-results/{user_id}")
 def recent_search_results(user_id: Union[int, str], limit: int = Query(20, ge=1, le=100)):
     try:
         tav = TavilyService()
-        return tav.recent_results(user_id=user_id, limit=limit)
+        return tav.recent_results(user_id=user_id, limit=limit, read_preference=settings.mongo_hot_read_preference)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -86,13 +175,75 @@ def recent_search_results(user_id: Union[int, str], limit: int = Query(20, ge=1,
 @router.delete("/reset/{user_id}")
 def reset_user_state(user_id: Union[int, str]):
     """
-    Xoá toàn bộ long-term memory và conversation history cho user_id.
+    Xoá toàn bộ long-term memory, conversation history, tool logs, summary và Qdrant points
+    cho user_id (theo từng batch), cùng checkpoint của thread mặc định (thread_id = user_id).
     """
     try:
-        mem_deleted = MemoryService().delete_long_term_memory(user_id=user_id)
-        conv_deleted = ConversationService().delete_conversation(user_id=user_id)["deleted"]
-        return {"user_id": user_id, "deleted_long_term": mem_deleted, "deleted_messages": conv_deleted}
+        from core.services.checkpointing import delete_checkpoint_thread
+
+        counts = get_user_data_service().delete_all(user_id=user_id)
+        counts["checkpoints"] = int(delete_checkpoint_thread(str(user_id)))
+        return {
+            "user_id": user_id,
+            "deleted_long_term": counts.get("long_term_memory", 0),
+            "deleted_messages": counts.get("messages", 0),
+            "deleted": counts,
+        }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/export/{user_id}")
+def export_user_data(
+    user_id: Union[int, str],
+    batch_size: int = Query(500, ge=1, le=5000),
+    resume_token: Optional[str] = None,
+):
+    """
+    Stream every stored document for user_id as NDJSON; pass the last progress
+    line's resume_token to continue an interrupted export.
+    """
+    try:
+        lines = get_user_data_service().export_ndjson(user_id=user_id, batch_size=batch_size, resume_token=resume_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.post("/jobs/delete/{user_id}")
+def start_delete_job(user_id: Union[int, str], background: BackgroundTasks):
+    svc = get_user_data_service()
+    job = svc.start_delete_job(user_id=user_id)
+    background.add_task(svc.run_job, job["job_id"])
+    return _job_view(job)
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_user_data_service().jobs.get(job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return _job_view(job)
+
+
+@router.post("/jobs/{job_id}/resume")
+def resume_job(job_id: str, background: BackgroundTasks):
+    svc = get_user_data_service()
+    job = svc.claim_job(job_id)
+    if job is not None:
+        background.add_task(svc.run_job, job_id, claimed=True)
+        return _job_view(job)
+    job = svc.jobs.get(job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    if job.get("status") != "done":
+        raise HTTPException(status_code=409, detail="job is already running")
+    return _job_view(job)
+
+
+def _job_view(job: dict) -> dict:
+    out = {k: v for k, v in job.items() if k != "_id"}
+    for k in ("created_at", "updated_at"):
+        if hasattr(out.get(k), "isoformat"):
+            out[k] = out[k].isoformat()
+    return out
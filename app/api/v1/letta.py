@@ -27,7 +27,7 @@ def _event(message_id, user_id, role, content, correlation_id):
     }
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
+async def chat(req: ChatRequest) -> ChatResponse:
     try:
         corr = f"req-{uuid4()}"
         # 1) publish user message (nhanh, không chặn lâu)
@@ -38,7 +38,7 @@ def chat(req: ChatRequest) -> ChatResponse:
 
         # 2) gọi LLM
         print('2')
-        reply, elapsed, agent_id, agent_details = llm.send_message(req.user_id, req.username, req.message)
+        reply, elapsed, agent_id, agent_details = await llm.send_message(req.user_id, req.username, req.message)
 
         # 3) publish assistant message
         print(agent_details)
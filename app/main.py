@@ -1,12 +1,27 @@
+
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import os
 from config import settings
 # from app.api.v1.letta import router as letta_router
 # from app.api.v1.conversation import router as conversation_router
 from app.api.v1.agent import router as agent_router
+from app.warmup import warmup
+from core.observability.metrics import render as render_metrics
 from fastapi.middleware.cors import CORSMiddleware
-app = FastAPI(title="eq-chat-service")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup_on_startup:
+        app.state.warmup = await run_in_threadpool(warmup)
+    yield
+
+
+app = FastAPI(title="eq-chat-service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,5 +42,34 @@ if settings.langchain_api_key and settings.langchain_tracing_v2:
 # app.include_router(conversation_router, prefix="/v1")
 app.include_router(agent_router, prefix="/v1")
 
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: MongoDB answers a ping within mongo_ready_timeout_ms. Includes pool stats.
+    """
+    from core.database.mongodb_client import MongoManager
+
+    mongo = MongoManager(db="EMOSTAGRAM")
+    try:
+        mongo.ping(timeout_ms=settings.mongo_ready_timeout_ms)
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e)
+    body = {"status": "ready" if ok else "unavailable", "mongo": {"ok": ok, "error": error, "pool": mongo.pool_stats()}}
+    return JSONResponse(body, status_code=200 if ok else 503)
+
+
+@app.post("/warmup")
+def warmup_endpoint():
+    return warmup()
+
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=5002, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=5002, reload=True)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict
+import time
+
+
+def warmup() -> Dict[str, float]:
+    """
+    Explicitly load every heavy client (embedding model, Gemini SDK, LangGraph, Kafka producer)
+    so the first user request doesn't pay for it. Returns per-stage seconds.
+    """
+    from app.api.v1.agent import get_agent
+    from core.services.intent_router import get_search_router
+    from infra.kafka.producer import get_default_producer
+
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    agent = get_agent()
+    timings["agent"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    agent.memory.embed_text("warmup")
+    timings["embedding"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    # Seed centroids of the local classifiers are encoded once, on first use
+    get_search_router().classifier.centroids()
+    timings["search_router"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    # Atlas $vectorSearch vs local cosine for Mongo LTM retrieval
+    agent.memory.vector_backend()
+    timings["ltm_vector_backend"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    get_default_producer()
+    timings["kafka"] = round(time.perf_counter() - t0, 3)
+    return timings
+
+
+def preload_for_fork() -> Dict[str, float]:
+    """
+    Load only fork-safe state in a pre-fork master: heavy imports and the embedding
+    weights (shared copy-on-write by workers). Network clients (Mongo, Kafka, Gemini)
+    are not fork-safe and are created per worker by warmup().
+    """
+    from config import settings
+    from core.services.embedders import get_shared_embedder
+
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    import core.services.agent_service  # noqa: F401  (langgraph, langchain_core, tools)
+    timings["imports"] = round(time.perf_counter() - t0, 3)
+
+    # onnxruntime sessions own thread pools that don't survive fork; load those per worker
+    if settings.embedding_backend == "sentence_transformers":
+        t0 = time.perf_counter()
+        get_shared_embedder()
+        timings["embedding_model"] = round(time.perf_counter() - t0, 3)
+    return timings
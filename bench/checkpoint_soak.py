@@ -0,0 +1,111 @@
+"""
+Soak test for agent graph checkpointing: RSS must stay flat over many turns/users.
+
+    python -m bench.checkpoint_soak [--mode memory] [--turns 100000] [--users 10000] [--max-growth-mb 30]
+
+Uses a graph with the same shape and state keys as AgentService's, with no I/O,
+so only checkpointer memory is measured. Exits non-zero if RSS keeps growing.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, TypedDict, Union
+
+
+class SoakState(TypedDict, total=False):
+    user_id: Union[int, str]
+    user_message: str
+    short_term_context: List[Dict[str, Any]]
+    long_term_context: List[str]
+    search_results: List[Dict[str, Any]]
+    assistant_reply: str
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _build(checkpointer):
+    from langgraph.graph import END, StateGraph
+
+    def load_context(state: SoakState) -> SoakState:
+        msg = state.get("user_message", "")
+        state["short_term_context"] = [{"role": "user", "content": msg}] * 10
+        state["long_term_context"] = [msg[:40]] * 5
+        return state
+
+    def maybe_search(state: SoakState) -> SoakState:
+        state["search_results"] = []
+        return state
+
+    def respond(state: SoakState) -> SoakState:
+        state["assistant_reply"] = "ok " + state.get("user_message", "")[:100]
+        return state
+
+    b = StateGraph(SoakState)
+    b.add_node("load_context", load_context)
+    b.add_node("maybe_search", maybe_search)
+    b.add_node("respond", respond)
+    b.set_entry_point("load_context")
+    b.add_edge("load_context", "maybe_search")
+    b.add_edge("maybe_search", "respond")
+    b.add_edge("respond", END)
+    return b.compile(checkpointer=checkpointer)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", default="memory", help="off | memory | sqlite | mongo")
+    ap.add_argument("--turns", type=int, default=100_000)
+    ap.add_argument("--users", type=int, default=10_000)
+    ap.add_argument("--warmup-frac", type=float, default=0.2, help="fraction of turns before the RSS baseline")
+    ap.add_argument("--max-growth-mb", type=float, default=30.0)
+    args = ap.parse_args()
+
+    from core.services.checkpointing import build_checkpointer
+
+    graph = _build(build_checkpointer(args.mode))
+    message = "Tôi vừa chuyển nhà sang Bình Thạnh và đang tìm quán cà phê yên tĩnh " * 4
+
+    samples = []
+    baseline = None
+    t0 = time.perf_counter()
+    every = max(1, args.turns // 20)
+    for i in range(args.turns):
+        uid = str(i % args.users)
+        graph.invoke({"user_id": uid, "user_message": f"{i} {message}"}, config={"configurable": {"thread_id": uid}})
+        if (i + 1) % every == 0:
+            gc.collect()
+            rss = _rss_mb()
+            samples.append({"turn": i + 1, "rss_mb": round(rss, 1)})
+            if baseline is None and i + 1 >= args.turns * args.warmup_frac:
+                baseline = rss
+
+    final = _rss_mb()
+    growth = final - (baseline if baseline is not None else final)
+    report = {
+        "mode": args.mode,
+        "turns": args.turns,
+        "users": args.users,
+        "elapsed_sec": round(time.perf_counter() - t0, 1),
+        "baseline_rss_mb": round(baseline or 0.0, 1),
+        "final_rss_mb": round(final, 1),
+        "growth_mb": round(growth, 1),
+        "samples": samples,
+    }
+    print(json.dumps(report))
+    if growth > args.max_growth_mb:
+        print(f"FAIL: RSS grew {growth:.1f} MB after warmup (limit {args.max_growth_mb} MB)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
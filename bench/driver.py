@@ -0,0 +1,102 @@
+"""
+Closed-loop asyncio HTTP load driver shared by the bench scripts.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# (method, path, json body or None)
+RequestFactory = Callable[[random.Random], Tuple[str, str, Optional[Dict[str, Any]]]]
+
+
+@dataclass
+class LoadResult:
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed_sec: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies_ms)
+
+        def pct(p: float) -> float:
+            if not lat:
+                return 0.0
+            return round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))], 2)
+
+        return {
+            "name": self.name,
+            "requests": len(lat),
+            "errors": self.errors,
+            "throughput_rps": round(len(lat) / self.elapsed_sec, 2) if self.elapsed_sec else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(lat[-1], 2) if lat else 0.0,
+        }
+
+
+async def run_load(
+    base_url: str,
+    name: str,
+    factory: RequestFactory,
+    *,
+    concurrency: int,
+    duration_sec: float,
+    seed: int = 0,
+    timeout: float = 60.0,
+) -> LoadResult:
+    result = LoadResult(name=name)
+    deadline = time.perf_counter() + duration_sec
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker(i: int) -> None:
+            rng = random.Random(seed * 1000 + i)
+            while time.perf_counter() < deadline:
+                method, path, body = factory(rng)
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, json=body)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    result.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+                else:
+                    result.errors += 1
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        result.elapsed_sec = time.perf_counter() - t_start
+    return result
+
+
+async def wait_ready(base_url: str, path: str = "/docs", timeout_sec: float = 120.0) -> None:
+    deadline = time.perf_counter() + timeout_sec
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(path)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise TimeoutError(f"{base_url}{path} not ready after {timeout_sec}s")
+
+
+def chat_factory(users: int) -> RequestFactory:
+    def make(rng: random.Random):
+        uid = rng.randrange(users)
+        return "POST", "/v1/agent/chat", {
+            "user_id": uid,
+            "username": f"user{uid}",
+            "message": f"Hôm nay mình muốn kể về chuyến đi Đà Lạt số {rng.randrange(1000)}",
+        }
+    return make
@@ -0,0 +1,103 @@
+"""
+Compare embedding backends: startup time, single-text latency, batch throughput and peak RSS.
+
+    python -m bench.embedding_backends --onnx-dir models/all-MiniLM-L6-v2-onnx [--threads 2]
+
+Each backend runs in its own subprocess so RSS and import cost are not shared.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+SAMPLES = [
+    "Tôi tên là Minh Anh, sống ở Bình Thạnh và làm kỹ sư phần mềm.",
+    "Cuối tuần này tôi định đi Đà Lạt với bạn gái.",
+    "I prefer answers in English when we talk about code.",
+    "Con mèo Mochi của tôi bị ốm mấy hôm nay.",
+    "Gợi ý giúp tôi vài quán cà phê yên tĩnh để làm việc.",
+]
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _worker(backend: str, onnx_dir: str | None, quantized: bool, threads: int | None, iters: int, batch: int) -> dict:
+    t0 = time.perf_counter()
+    from core.services.embedders import OnnxEmbedder, SentenceTransformerEmbedder
+
+    if backend == "onnx":
+        emb = OnnxEmbedder(onnx_dir, quantized=quantized, threads=threads)
+    else:
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        emb = SentenceTransformerEmbedder()
+    emb.encode(["warmup"])
+    load_s = time.perf_counter() - t0
+    rss_loaded = _rss_mb()
+
+    lat = []
+    for i in range(iters):
+        t = time.perf_counter()
+        emb.encode([SAMPLES[i % len(SAMPLES)]])
+        lat.append((time.perf_counter() - t) * 1000.0)
+
+    texts = [SAMPLES[i % len(SAMPLES)] for i in range(batch)]
+    t = time.perf_counter()
+    emb.encode(texts)
+    batch_s = time.perf_counter() - t
+
+    lat.sort()
+    return {
+        "backend": backend if backend != "onnx" else ("onnx-int8" if quantized else "onnx-fp32"),
+        "dim": emb.dim,
+        "load_sec": round(load_s, 3),
+        "single_p50_ms": round(statistics.median(lat), 2),
+        "single_p95_ms": round(lat[int(0.95 * (len(lat) - 1))], 2),
+        "batch_texts_per_sec": round(batch / batch_s, 1),
+        "rss_after_load_mb": round(rss_loaded, 1),
+        "peak_rss_mb": round(_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--onnx-dir", default=None)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--iters", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=512)
+    ap.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--fp32", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args.worker, args.onnx_dir, not args.fp32, args.threads, args.iters, args.batch)))
+        return
+
+    runs = [("sentence_transformers", [])]
+    if args.onnx_dir:
+        runs += [("onnx", ["--fp32"]), ("onnx", [])]
+    results = []
+    for backend, extra in runs:
+        cmd = [sys.executable, "-m", "bench.embedding_backends", "--worker", backend,
+               "--iters", str(args.iters), "--batch", str(args.batch), *extra]
+        if args.onnx_dir:
+            cmd += ["--onnx-dir", args.onnx_dir]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
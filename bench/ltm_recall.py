@@ -0,0 +1,84 @@
+"""
+Offline recall@k for long-term memory retrieval: vector-only vs BM25-only vs RRF fusion.
+
+    python -m bench.ltm_recall [--k 1 3 5] [--data bench/data/ltm_recall.json]
+
+Runs fully in-process (no Mongo/Qdrant): embeddings come from the same MiniLM model
+MemoryService uses, lexical scores from core.search.lexical.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from core.search.lexical import bm25_scores, term_frequencies, tokenize
+from core.search.fusion import reciprocal_rank_fusion
+
+DEFAULT_DATA = Path(__file__).parent / "data" / "ltm_recall.json"
+
+
+def _vector_ranking(mem_vecs: np.ndarray, q_vec: np.ndarray) -> List[int]:
+    sims = mem_vecs @ q_vec
+    return [int(i) for i in np.argsort(-sims)]
+
+
+def _lexical_ranking(index: List[tuple], query: str, n_docs: int, avgdl: float) -> List[int]:
+    return [int(doc_id) for doc_id, _ in bm25_scores(tokenize(query), index, n_docs=n_docs, avgdl=avgdl)]
+
+
+def _recall(ranking: List[int], relevant: List[int], k: int) -> float:
+    return len(set(ranking[:k]) & set(relevant)) / max(1, len(relevant))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=str(DEFAULT_DATA))
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    ap.add_argument("--model", default="all-MiniLM-L6-v2")
+    ap.add_argument("--candidates", type=int, default=3, help="vector/lexical over-fetch multiplier before fusion")
+    ap.add_argument("--rrf-k", type=int, default=60)
+    args = ap.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    data = json.loads(Path(args.data).read_text(encoding="utf-8"))
+    memories: List[str] = data["memories"]
+    queries = data["queries"]
+
+    model = SentenceTransformer(args.model)
+    mem_vecs = model.encode(memories, normalize_embeddings=True)
+    q_vecs = model.encode([q["query"] for q in queries], normalize_embeddings=True)
+
+    index = []
+    total_len = 0
+    for i, m in enumerate(memories):
+        tf, length = term_frequencies(m)
+        index.append((i, tf, length))
+        total_len += length
+    avgdl = total_len / len(memories)
+
+    results: Dict[str, Dict[int, float]] = {"vector": {}, "lexical": {}, "rrf": {}}
+    for k in args.k:
+        depth = k * args.candidates
+        sums = {name: 0.0 for name in results}
+        for q, q_vec in zip(queries, q_vecs):
+            vec = _vector_ranking(mem_vecs, q_vec)
+            lex = _lexical_ranking(index, q["query"], len(memories), avgdl)
+            fused = [doc_id for doc_id, _ in reciprocal_rank_fusion([vec[:depth], lex[:depth]], k=args.rrf_k)]
+            # Same fallback as MemoryService: no lexical hits -> vector order
+            rrf = fused if lex else vec
+            sums["vector"] += _recall(vec, q["relevant"], k)
+            sums["lexical"] += _recall(lex, q["relevant"], k)
+            sums["rrf"] += _recall(rrf, q["relevant"], k)
+        for name in results:
+            results[name][k] = round(sums[name] / len(queries), 3)
+
+    print(json.dumps({"queries": len(queries), "memories": len(memories), "recall_at_k": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
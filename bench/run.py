@@ -0,0 +1,215 @@
+"""
+End-to-end load/latency suite against the real app with local stand-ins (bench.standins).
+
+    python -m bench.run [--concurrency 16] [--duration 20] [--users 200] [--compare bench/results/<sha>.json]
+
+Starts uvicorn on bench.standin_app, seeds conversations/memories through /chat, then runs:
+- chat:   POST /v1/agent/chat
+- recent: GET  /v1/agent/conversation/{id}/recent
+- memory: GET  /v1/agent/memory/long-term/{id}
+- mixed:  80% reads / 20% chat
+Reports p50/p95/p99, throughput, errors and server RSS per scenario and writes
+bench/results/<git-sha>.json. With --compare, exits non-zero when p95 or throughput
+regressed by more than --threshold percent against a previous result file.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bench.driver import RequestFactory, chat_factory, run_load, wait_ready
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "bench" / "results"
+STANDIN_KNOBS = (
+    "BENCH_LLM_LATENCY_MS",
+    "BENCH_LLM_TOKENS_PER_SEC",
+    "BENCH_LLM_REPLY_TOKENS",
+    "BENCH_FAKE_EMBEDDER",
+    "BENCH_KAFKA",
+    "BENCH_QDRANT",
+    "BENCH_TAVILY_LATENCY_MS",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def _git_sha() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT) != 0
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def recent_factory(users: int) -> RequestFactory:
+    def make(rng: random.Random):
+        return "GET", f"/v1/agent/conversation/{rng.randrange(users)}/recent?k=10", None
+    return make
+
+
+def memory_factory(users: int) -> RequestFactory:
+    def make(rng: random.Random):
+        return "GET", f"/v1/agent/memory/long-term/{rng.randrange(users)}?limit=50", None
+    return make
+
+
+def mixed_factory(users: int, chat_frac: float = 0.2) -> RequestFactory:
+    chat, recent, memory = chat_factory(users), recent_factory(users), memory_factory(users)
+
+    def make(rng: random.Random):
+        r = rng.random()
+        if r < chat_frac:
+            return chat(rng)
+        return recent(rng) if r < chat_frac + (1 - chat_frac) / 2 else memory(rng)
+    return make
+
+
+SCENARIOS = {
+    "chat": chat_factory,
+    "recent": recent_factory,
+    "memory": memory_factory,
+    "mixed": mixed_factory,
+}
+
+
+async def _seed(base: str, users: int, turns: int) -> None:
+    # Every user gets `turns` chat turns so the read endpoints have data to page through
+    import httpx
+
+    make = chat_factory(users)
+    rng = random.Random(7)
+    sem = asyncio.Semaphore(16)
+    async with httpx.AsyncClient(base_url=base, timeout=120.0) as client:
+        async def one(uid: int) -> None:
+            async with sem:
+                for _ in range(turns):
+                    _, path, body = make(rng)
+                    body.update(user_id=uid, username=f"user{uid}")
+                    await client.post(path, json=body)
+
+        await asyncio.gather(*(one(uid) for uid in range(users)))
+
+
+def run_suite(args) -> Dict[str, Any]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench.standin_app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ}, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    scenarios: List[Dict[str, Any]] = []
+    try:
+        asyncio.run(wait_ready(base))
+        t0 = time.perf_counter()
+        asyncio.run(_seed(base, args.users, args.seed_turns))
+        seed_sec = round(time.perf_counter() - t0, 1)
+        rss_start = _rss_mb(proc.pid)
+        for name in args.scenarios:
+            res = asyncio.run(run_load(
+                base, name, SCENARIOS[name](args.users),
+                concurrency=args.concurrency, duration_sec=args.duration,
+            ))
+            out = res.summary()
+            out["rss_mb"] = _rss_mb(proc.pid)
+            scenarios.append(out)
+            print(json.dumps(out), file=sys.stderr)
+        rss_end = _rss_mb(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return {
+        "commit": _git_sha(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "params": {
+            "concurrency": args.concurrency,
+            "duration_sec": args.duration,
+            "users": args.users,
+            "seed_turns": args.seed_turns,
+            "standins": {k: os.environ.get(k) for k in STANDIN_KNOBS if os.environ.get(k) is not None},
+        },
+        "seed_sec": seed_sec,
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "scenarios": scenarios,
+    }
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any], threshold_pct: float) -> List[str]:
+    """
+    Regressions of `current` vs `previous`, per scenario: p95 latency up or throughput
+    down by more than threshold_pct. Scenarios missing from either side are ignored.
+    """
+    prev = {s["name"]: s for s in previous.get("scenarios", [])}
+    out: List[str] = []
+    for cur in current.get("scenarios", []):
+        old = prev.get(cur["name"])
+        if not old:
+            continue
+        if old["p95_ms"] and (cur["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 > threshold_pct:
+            out.append(f"{cur['name']}: p95 {old['p95_ms']} -> {cur['p95_ms']} ms")
+        if old["throughput_rps"] and (old["throughput_rps"] - cur["throughput_rps"]) / old["throughput_rps"] * 100 > threshold_pct:
+            out.append(f"{cur['name']}: throughput {old['throughput_rps']} -> {cur['throughput_rps']} rps")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--seed-turns", type=int, default=3)
+    ap.add_argument("--out", default=None, help="result file (default bench/results/<git-sha>.json)")
+    ap.add_argument("--compare", default=None, help="previous result file to check for regressions")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    ap.add_argument("--verbose", action="store_true", help="show server stderr")
+    args = ap.parse_args()
+
+    report = run_suite(args)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"wrote {out}", file=sys.stderr)
+
+    if args.compare:
+        previous: Optional[Dict[str, Any]] = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, previous, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
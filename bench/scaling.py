@@ -0,0 +1,100 @@
+"""
+Throughput scaling of the pre-fork production entrypoint from 1 to N workers,
+against local stand-ins (bench.standin_app).
+
+    python -m bench.scaling --workers 1 2 4 --concurrency 32 --duration 30
+
+Each worker count starts a fresh gunicorn (gunicorn.conf.py) and drives /v1/agent/chat.
+Stand-in knobs (BENCH_LLM_LATENCY_MS, BENCH_FAKE_EMBEDDER, ...) are passed through from env.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+from bench.driver import chat_factory, run_load, wait_ready
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker_rss_mb(master_pid: int) -> float:
+    # Sum PSS (proportional set size) so copy-on-write shared pages are not double counted
+    total_kb = 0
+    pids = [master_pid]
+    try:
+        pids += [int(p) for p in Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()]
+    except OSError:
+        pass
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024.0, 1)
+
+
+def run_one(workers: int, args) -> dict:
+    port = _free_port()
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "bench.standin_app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(base))
+        # Warm each worker's lazy clients before measuring
+        asyncio.run(run_load(base, "warmup", chat_factory(args.users), concurrency=workers * 2, duration_sec=3))
+        res = asyncio.run(run_load(
+            base, f"workers={workers}", chat_factory(args.users),
+            concurrency=args.concurrency, duration_sec=args.duration,
+        ))
+        out = res.summary()
+        out["workers"] = workers
+        out["total_pss_mb"] = _worker_rss_mb(proc.pid)
+        return out
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--out", default=None, help="write JSON results here")
+    args = ap.parse_args()
+
+    results = [run_one(w, args) for w in args.workers]
+    base = results[0]["throughput_rps"] or 1.0
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / base, 2)
+        r["efficiency"] = round(r["speedup"] / (r["workers"] / results[0]["workers"]), 2)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report)
+
+
+if __name__ == "__main__":
+    main()
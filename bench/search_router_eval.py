@@ -0,0 +1,71 @@
+"""
+Offline precision/recall of the web-search router against the old substring keywords.
+
+    python -m bench.search_router_eval [--thresholds 0.5 0.6 0.7] [--data bench/data/search_intent.json]
+
+Runs fully in-process with the same embedder MemoryService uses (settings.embedding_backend);
+no Tavily or LLM calls. Prints one JSON object with per-method metrics and the misrouted messages.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+DEFAULT_DATA = Path(__file__).parent / "data" / "search_intent.json"
+LEGACY_KEYWORDS = ["search", "tìm", "google", "web"]
+
+
+def _metrics(items: List[Dict[str, Any]], predict: Callable[[str], bool]) -> Dict[str, Any]:
+    tp = fp = fn = tn = 0
+    errors: List[Dict[str, Any]] = []
+    for it in items:
+        pred = predict(it["text"])
+        gold = bool(it["search"])
+        tp += pred and gold
+        fp += pred and not gold
+        fn += gold and not pred
+        tn += not pred and not gold
+        if pred != gold:
+            errors.append({"text": it["text"], "expected": gold})
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(f1, 3),
+        # False positives are paid web searches + tool-log writes
+        "searches_per_100": round(100 * (tp + fp) / max(1, len(items)), 1),
+        "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=str(DEFAULT_DATA))
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7])
+    args = ap.parse_args()
+
+    from core.services.intent_router import SearchIntentRouter
+
+    items = json.loads(Path(args.data).read_text(encoding="utf-8"))["messages"]
+    report: Dict[str, Any] = {
+        "n": len(items),
+        "positives": sum(bool(it["search"]) for it in items),
+        "legacy_keywords": _metrics(items, lambda t: any(kw in t.lower() for kw in LEGACY_KEYWORDS)),
+    }
+    rules = SearchIntentRouter(use_embedding=False)
+    report["rules_only"] = _metrics(items, lambda t: rules.route(t).search)
+
+    router = SearchIntentRouter()
+    scores = {it["text"]: router.confidence(it["text"])[0] for it in items}
+    for th in args.thresholds:
+        report[f"router@{th}"] = _metrics(items, lambda t, th=th: scores[t] >= th)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+ASGI app with all external dependencies replaced by bench.standins.
+
+    gunicorn -c gunicorn.conf.py bench.standin_app:app
+    uvicorn bench.standin_app:app
+"""
+from bench.standins import install_from_env
+
+install_from_env()
+
+from app.main import app  # noqa: E402,F401
@@ -0,0 +1,233 @@
+"""
+Local stand-ins for every external dependency so the real app can be benchmarked offline.
+
+    from bench.standins import install_from_env
+    install_from_env()          # must run before app/core modules build any client
+    from app.main import app
+
+Env knobs (all optional):
+    BENCH_LLM_LATENCY_MS      fixed latency before the first token (default 300)
+    BENCH_LLM_TOKENS_PER_SEC  generation speed of the fake LLM (default 80)
+    BENCH_LLM_REPLY_TOKENS    reply length in tokens (default 60)
+    BENCH_FAKE_EMBEDDER       1 = deterministic hash embedder instead of MiniLM (default 0)
+    BENCH_KAFKA               "inprocess" runs the ltm/summary consumers on a background thread,
+                              "null" drops events (default inprocess)
+    BENCH_QDRANT              1 = in-memory Qdrant (needs qdrant-client), 0 = Mongo retrieval (default 0)
+    BENCH_TAVILY_LATENCY_MS   fake web search latency; empty disables search (default 400)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+# Settings() needs these before config is imported; values point at the stand-ins
+_REQUIRED_ENV = {
+    "OPENAI_API_KEY": "bench",
+    "OPENAI_BASE_URL": "http://localhost",
+    "GOOGLE_API_KEY": "bench",
+    "DATASTAX_TOKEN": "bench",
+    "ASTRA_CLIENT_ID": "bench",
+    "ASTRA_CLIENT_SECRET": "bench",
+    "MONGODB_URL": "mongodb://standin",
+    "KAFKA_BOOTSTRAP": "standin:9092",
+}
+
+_INSTALLED = False
+
+
+class FakeEmbedder:
+    """
+    Deterministic 384-dim unit vectors from token hashes (bag of words), no model load.
+    """
+
+    dim = 384
+
+    def encode(self, texts: Sequence[str]):
+        import numpy as np
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for tok in (t or "").lower().split():
+                h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+                out[i, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+            n = float(np.linalg.norm(out[i]))
+            out[i] = out[i] / n if n else out[i]
+        return out
+
+
+class NullProducer:
+    """
+    Accepts and drops events (no broker); counts them for reporting.
+    """
+
+    def __init__(self) -> None:
+        self.sent: Dict[str, int] = {}
+
+    def send(self, topic: str, key: str, value: dict, timeout: float = 0.0) -> None:
+        json.dumps(value, ensure_ascii=False)
+        self.sent[topic] = self.sent.get(topic, 0) + 1
+
+    def flush(self) -> None:
+        pass
+
+
+class InProcessKafka:
+    """
+    Producer stand-in that hands events to the real consumer handlers on a background
+    thread, so extraction/summarization load lands on the app process as with a broker.
+    """
+
+    def __init__(self) -> None:
+        self.sent: Dict[str, int] = {}
+        self.processed: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._q: "queue.Queue[tuple[str, dict]]" = queue.Queue()
+        self._handlers: Dict[str, Callable[[dict], Any]] = {}
+        threading.Thread(target=self._run, name="inprocess-kafka", daemon=True).start()
+
+    def _handler(self, topic: str) -> Optional[Callable[[dict], Any]]:
+        if topic not in self._handlers:
+            if topic == "ltm-extract":
+                from infra.kafka.consumers.ltm_consumer import process_payload
+            elif topic == "conversation-summary":
+                from infra.kafka.consumers.summary_consumer import process_payload
+            else:
+                process_payload = None
+            self._handlers[topic] = process_payload
+        return self._handlers[topic]
+
+    def send(self, topic: str, key: str, value: dict, timeout: float = 0.0) -> None:
+        self.sent[topic] = self.sent.get(topic, 0) + 1
+        self._q.put((topic, json.loads(json.dumps(value, ensure_ascii=False))))
+
+    def _run(self) -> None:
+        while True:
+            topic, payload = self._q.get()
+            try:
+                handler = self._handler(topic)
+                if handler is not None:
+                    handler(payload)
+                self.processed[topic] = self.processed.get(topic, 0) + 1
+            except Exception:
+                self.errors[topic] = self.errors.get(topic, 0) + 1
+
+    def lag(self) -> int:
+        return self._q.qsize()
+
+    def flush(self) -> None:
+        pass
+
+
+class FakeTavilyClient:
+    def __init__(self, latency_ms: float) -> None:
+        self.latency_ms = latency_ms
+
+    def search(self, query: str, max_results: int = 5, **_: Any) -> Dict[str, Any]:
+        time.sleep(self.latency_ms / 1000.0)
+        return {"results": [
+            {"title": f"Result {i} for {query[:40]}", "url": f"https://example.com/{i}", "content": "…"}
+            for i in range(max_results)
+        ]}
+
+
+def _fake_tavily(latency_ms: float) -> None:
+    from core.repositories.tool_logs import ToolLogRepo
+    from core.services.tavily_service import TavilyService
+
+    def __init__(self, *, repo: Optional[ToolLogRepo] = None) -> None:
+        self.client = FakeTavilyClient(latency_ms)
+        self.repo = repo or ToolLogRepo()
+
+    TavilyService.__init__ = __init__
+
+
+def _inmemory_qdrant() -> None:
+    import qdrant_client
+
+    shared = qdrant_client.QdrantClient(location=":memory:")
+    qdrant_client.QdrantClient = lambda *a, **kw: shared
+
+
+def _fake_llm(latency_ms: float, tokens_per_sec: float, reply_tokens: int):
+    from core.services.llm_service import LLMService
+
+    def __init__(self, *, model: str = "gemini-2.0-flash", temperature: float = 0.2, **_: Any) -> None:
+        self.model = model
+        self.temperature = temperature
+
+    def chat(self, *, system_prompt: Optional[str], user_prompt: str, response_format: Optional[Dict[str, Any]] = None, **_: Any) -> str:
+        time.sleep(latency_ms / 1000.0)
+        if response_format and response_format.get("type") == "json_object":
+            # Extraction: first-person statements yield one fact so LTM grows like real traffic
+            msg = user_prompt.rsplit("Nội dung:", 1)[-1].strip()
+            facts = [{"text": msg[:150], "category": "bench", "confidence": 0.8}] if "mình" in msg.lower() else []
+            return json.dumps({"facts": facts}, ensure_ascii=False)
+        time.sleep(reply_tokens / max(tokens_per_sec, 1e-6))
+        return " ".join(["ok"] * reply_tokens)
+
+    LLMService.__init__ = __init__
+    LLMService.chat = chat
+
+
+def install(
+    *,
+    llm_latency_ms: float = 300.0,
+    llm_tokens_per_sec: float = 80.0,
+    llm_reply_tokens: int = 60,
+    fake_embedder: bool = False,
+    kafka: str = "inprocess",
+    qdrant: bool = False,
+    tavily_latency_ms: Optional[float] = 400.0,
+) -> None:
+    global _INSTALLED
+    if _INSTALLED:
+        return
+    for k, v in _REQUIRED_ENV.items():
+        os.environ.setdefault(k, v)
+    os.environ["QDRANT_URL"] = "http://standin:6333" if qdrant else ""
+    os.environ["TAVILY_API_KEY"] = "bench" if tavily_latency_ms is not None else ""
+
+    import mongomock
+    import pymongo
+
+    pymongo.MongoClient = mongomock.MongoClient
+
+    _fake_llm(llm_latency_ms, llm_tokens_per_sec, llm_reply_tokens)
+    if tavily_latency_ms is not None:
+        _fake_tavily(tavily_latency_ms)
+    if qdrant:
+        _inmemory_qdrant()
+
+    import infra.kafka.producer as producer
+
+    producer._DEFAULT = InProcessKafka() if kafka == "inprocess" else NullProducer()
+    if kafka == "inprocess":
+        # The in-process queue depth stands in for consumer-group lag (backpressure policy)
+        from config import settings
+        from infra.kafka import lag
+
+        lag._MONITORS[(settings.ltm_extract_topic, settings.ltm_extract_group)] = producer._DEFAULT
+
+    if fake_embedder:
+        from core.services import embedders
+
+        embedders._SHARED["all-MiniLM-L6-v2"] = FakeEmbedder()
+    _INSTALLED = True
+
+
+def install_from_env() -> None:
+    tavily = os.environ.get("BENCH_TAVILY_LATENCY_MS", "400")
+    install(
+        llm_latency_ms=float(os.environ.get("BENCH_LLM_LATENCY_MS", "300")),
+        llm_tokens_per_sec=float(os.environ.get("BENCH_LLM_TOKENS_PER_SEC", "80")),
+        llm_reply_tokens=int(os.environ.get("BENCH_LLM_REPLY_TOKENS", "60")),
+        fake_embedder=os.environ.get("BENCH_FAKE_EMBEDDER", "0") == "1",
+        kafka=os.environ.get("BENCH_KAFKA", "inprocess"),
+        qdrant=os.environ.get("BENCH_QDRANT", "0") == "1",
+        tavily_latency_ms=float(tavily) if tavily else None,
+    )
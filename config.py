@@ -7,6 +7,11 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     letta_base_url: str = "http://localhost:8283"
     backend_url: str = "http://localhost:5001/api/v1"
+    # Letta path: pooled async HTTP client; user -> agent id/details cached per process
+    letta_timeout_sec: float = 60.0
+    letta_lookup_timeout_sec: float = 5.0
+    letta_max_connections: int = 100
+    letta_agent_cache_ttl_sec: float = 600.0
 
     openai_api_key: str 
     openai_base_url: str 
@@ -18,6 +23,20 @@ class Settings(BaseSettings):
     cassandra_enabled: bool = True
     
     mongodb_url: str
+    # MongoClient pool/timeouts; read preference/write concern defaults (overridable per operation)
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int | None = None
+    mongo_wait_queue_timeout_ms: int = 2000
+    mongo_server_selection_timeout_ms: int = 5000
+    mongo_connect_timeout_ms: int = 5000
+    mongo_socket_timeout_ms: int = 10000
+    mongo_read_preference: str = "primary"
+    mongo_write_concern: str | None = None
+    mongo_write_timeout_ms: int | None = None
+    # Read preference for hot, staleness-tolerant reads (recent history, memory listing)
+    mongo_hot_read_preference: str = "secondaryPreferred"
+    mongo_ready_timeout_ms: int = 1000
     kafka_bootstrap: str
     tavily_api_key: str | None = None
     # LangSmith / LangChain tracing
@@ -28,6 +47,136 @@ class Settings(BaseSettings):
     qdrant_url: str | None = None
     qdrant_api_key: str | None = None
     qdrant_collection: str = "ltm_vectors"
+    # Embedding backend: "sentence_transformers" (torch, fp32) or "onnx" (onnxruntime, int8 by default)
+    embedding_backend: str = "sentence_transformers"
+    embedding_onnx_dir: str | None = None
+    embedding_onnx_quantized: bool = True
+    embedding_threads: int | None = None
+    # Long-term memory retrieval: "qdrant", "mongo" or "hybrid" (qdrant first, mongo fallback)
+    ltm_retrieval_strategy: str = "hybrid"
+    # Fuse BM25 over memory content with vector hits (reciprocal rank fusion)
+    ltm_lexical_fusion: bool = True
+    ltm_fusion_candidates: int = 3
+    ltm_rrf_k: int = 60
+    # Per-process; memories written by the ltm consumer become visible after at most this long
+    ltm_negative_cache_ttl_sec: float = 120.0
+    ltm_negative_cache_max_users: int = 100000
+    # LTM capacity: above ltm_max_memories_per_user, compaction evicts the lowest
+    # confidence x recency (half-life from last access) x access-frequency scores
+    ltm_track_hits: bool = True
+    ltm_max_memories_per_user: int = 500
+    ltm_recency_half_life_days: float = 30.0
+    ltm_default_confidence: float = 0.5
+    ltm_compaction_interval_sec: float = 3600.0
+    # Mongo vector search for LTM: "auto" (Atlas $vectorSearch when the index is detected,
+    # re-checked every reprobe_sec, else local), "atlas" (always $vectorSearch) or "local"
+    # (streamed cosine in-app)
+    ltm_mongo_vector_backend: str = "auto"
+    ltm_vector_backend_reprobe_sec: float = 300.0
+    ltm_vector_index_name: str = "ltm_embedding_index"
+    ltm_vector_num_candidates: int = 100
+    # Preload models/clients in the app lifespan instead of on the first request
+    warmup_on_startup: bool = True
+    # LangGraph checkpointing: "off", "memory" (bounded LRU), "sqlite" or "mongo"
+    checkpoint_mode: str = "memory"
+    checkpoint_max_threads: int = 1000
+    checkpoint_ttl_sec: float | None = 3600.0
+    checkpoint_sqlite_path: str = "checkpoints.sqlite"
+    checkpoint_mongo_db: str = "EMOSTAGRAM_checkpoints"
+    # Prompt token budget for AgentService.respond (estimated tokens)
+    prompt_budget_total: int = 3000
+    prompt_budget_long_term: int = 600
+    prompt_budget_history: int = 1800
+    prompt_budget_search: int = 400
+    prompt_budget_max_turn: int = 300
+    prompt_budget_summary: int = 400
+    prompt_budget_profile: int = 300
+    # Newest N memories listed in the stable prompt prefix (0 = none; only query-relevant ones).
+    # With context caching on, up to prompt_profile_facts_cached memories (within
+    # prompt_budget_cached_profile tokens) fill the prefix to llm_context_cache_min_tokens;
+    # the list is snapshotted with the rolling summary so the prefix stays stable between folds
+    prompt_profile_facts: int = 20
+    prompt_profile_facts_cached: int = 300
+    prompt_budget_cached_profile: int = 6000
+    # LLM routing per task (Gemini models) and per-call timeouts
+    llm_reply_model: str = "gemini-2.0-flash"
+    llm_extraction_model: str = "gemini-2.0-flash-lite"
+    llm_summarization_model: str = "gemini-2.0-flash-lite"
+    llm_reply_timeout_sec: float = 20.0
+    llm_extraction_timeout_sec: float = 30.0
+    llm_summarization_timeout_sec: float = 60.0
+    llm_max_concurrency: int = 32
+    # Hedging: for these tasks, a second identical request goes out once the first has run
+    # longer than the observed p95 (needs llm_hedge_min_samples latencies first)
+    llm_hedge_tasks: List[str] = ["reply"]
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    # Circuit breaker per provider:model; failed/timed-out or breaker-open calls go to the
+    # fallback: "openai" (OPENAI_* settings), "gemini" (another Gemini model) or "none"
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_sec: float = 30.0
+    llm_fallback_provider: str = "openai"
+    llm_fallback_model: str = "gpt-4o-mini"
+    # Gemini explicit context caching of the stable prompt prefix, one cache per user.
+    # Only used once system + prefix reach the provider's minimum cacheable size
+    # (4096 tokens for gemini-2.0-flash; lower it to match the reply model)
+    llm_context_cache_enabled: bool = True
+    llm_context_cache_min_tokens: int = 4096
+    llm_context_cache_ttl_sec: int = 600
+    llm_context_cache_max_entries: int = 1000
+    # Rolling conversation summaries: the prompt gets the summary plus the newest
+    # summary_keep_recent messages; older ones are folded in once summary_every_n_messages pile up
+    summary_every_n_messages: int = 10
+    summary_keep_recent: int = 6
+    summary_max_chars: int = 1500
+    # conversation-summary consumer: same commit/retry/dead-letter handling as ltm-extract
+    summary_topic: str = "conversation-summary"
+    summary_group: str = "conversation-summary-consumers"
+    summary_dead_letter_topic: str = "conversation-summary.dlq"
+    summary_consumer_max_retries: int = 3
+    summary_consumer_metrics_port: int | None = 9103
+    # ltm-extract consumer: manual offset commits, retries, then dead-letter topic
+    ltm_extract_topic: str = "ltm-extract"
+    ltm_extract_group: str = "ltm-extract-consumers"
+    ltm_dead_letter_topic: str = "ltm-extract.dlq"
+    ltm_consumer_max_retries: int = 3
+    ltm_consumer_metrics_port: int | None = 9102
+    # Producer backpressure: above soft lag, low-value messages are not enqueued;
+    # above hard lag (0 = off) the rest is sampled at hard_lag / lag (never below min_keep)
+    ltm_backpressure_soft_lag: int = 1000
+    ltm_backpressure_hard_lag: int = 0
+    ltm_backpressure_min_keep: float = 0.2
+    ltm_lag_refresh_sec: float = 10.0
+    # Local pre-filter before the extraction LLM call (heuristics + MiniLM seed classifier)
+    ltm_gate_enabled: bool = True
+    ltm_gate_threshold: float = 0.35
+    ltm_gate_min_chars: int = 8
+    ltm_gate_use_embedding: bool = True
+    # Local web-search intent router; search runs when P(search) >= threshold
+    search_router_threshold: float = 0.6
+    search_router_use_embedding: bool = True
+    # Longest accepted chat message (~800 estimated tokens); longer ones get a 422 instead
+    # of being cut, since the prompt budget only trims the context around the message
+    chat_message_max_chars: int = 3200
+    # chat(): one request per user at a time and idempotency-key result cache.
+    # "local" (per process), "mongo" (lease lock + cache shared by all workers) or "off" (no lock)
+    chat_coordination_backend: str = "local"
+    chat_user_lock_timeout_sec: float = 30.0
+    chat_user_lock_lease_sec: float = 120.0
+    chat_idempotency_ttl_sec: float = 300.0
+    chat_idempotency_max_entries: int = 10000
+    # Batch chat (/v1/agent/chat/batch): max items per call, users processed concurrently,
+    # messages embedded per encode() call, and the longest wait for the next result before
+    # the items still outstanding are reported as failed
+    chat_batch_max_items: int = 1000
+    chat_batch_concurrency: int = 8
+    chat_batch_embed_size: int = 256
+    chat_batch_result_timeout_sec: float = 120.0
+    # User-data export/delete jobs: documents per batch, optional pause between delete batches
+    user_data_batch_size: int = 500
+    user_data_batch_pause_ms: int = 0
+    # A running delete job with no progress for this long is presumed dead and can be resumed
+    user_data_job_stale_sec: float = 300.0
     @property
     def debug(self) -> bool:
         return self.environment == "dev"
@@ -1,6 +1,107 @@
 import pymongo
+import time
+from functools import wraps
+from itertools import islice
+from pymongo import ReadPreference, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError
 from config import settings
-    
+from core.observability.metrics import EXTERNAL_LATENCY, external_call
+from core.observability.mongo_pool import POOL_LISTENER
+
+_READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def resolve_read_preference(name):
+    """
+    Read preference by mode name ("primary", "secondaryPreferred", ...); None keeps the client default.
+    """
+    if name is None or not isinstance(name, str):
+        return name
+    if name not in _READ_PREFERENCES:
+        raise ValueError(f"read preference must be one of {tuple(_READ_PREFERENCES)}")
+    return _READ_PREFERENCES[name]
+
+
+def resolve_write_concern(w=None, *, wtimeout_ms=None, journal=None):
+    """
+    WriteConcern from "majority" / a node count (int or digit string); None keeps the client default.
+    """
+    if w is None or isinstance(w, WriteConcern):
+        return w
+    if isinstance(w, str) and w.isdigit():
+        w = int(w)
+    return WriteConcern(w=w, wtimeout=wtimeout_ms, j=journal)
+
+
+def client_options():
+    """
+    MongoClient keyword arguments from settings (pool sizing, timeouts, defaults).
+    """
+    opts = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "readPreference": settings.mongo_read_preference,
+        "event_listeners": [POOL_LISTENER],
+    }
+    if settings.mongo_max_idle_time_ms is not None:
+        opts["maxIdleTimeMS"] = settings.mongo_max_idle_time_ms
+    if settings.mongo_write_concern is not None:
+        wc = resolve_write_concern(settings.mongo_write_concern, wtimeout_ms=settings.mongo_write_timeout_ms)
+        opts["w"] = wc.document["w"]
+        if settings.mongo_write_timeout_ms:
+            opts["wTimeoutMS"] = settings.mongo_write_timeout_ms
+    return opts
+
+
+def _mongo_op(fn):
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with external_call("mongo", fn.__name__):
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def _timed_cursor(cursor, operation):
+    # Only time spent fetching from the cursor counts, not the caller's work between documents
+    fetch_sec = 0.0
+    outcome = "ok"
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                doc = next(cursor)
+            except StopIteration:
+                fetch_sec += time.perf_counter() - t0
+                return
+            except BaseException:
+                outcome = "error"
+                raise
+            fetch_sec += time.perf_counter() - t0
+            yield doc
+    finally:
+        cursor.close()
+        EXTERNAL_LATENCY.labels(service="mongo", operation=operation, outcome=outcome).observe(fetch_sec)
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 class MongoManager:
     __instances = {}
 
@@ -17,45 +118,119 @@ class MongoManager:
 
         self.db = db
         self.connection_str = settings.mongodb_url
-        self.__client = pymongo.MongoClient(self.connection_str)
+        self.__client = pymongo.MongoClient(self.connection_str, **client_options())
         self.__database = self.__client[self.db]
 
+    def collection(self, collection_name, *, read_preference=None, write_concern=None):
+        """
+        Collection handle, optionally with a per-operation read preference
+        (e.g. "secondaryPreferred" for hot history reads) or write concern.
+        """
+        rp = resolve_read_preference(read_preference)
+        wc = resolve_write_concern(write_concern)
+        if rp is None and wc is None:
+            return self.__database[collection_name]
+        return self.__database.get_collection(collection_name, read_preference=rp, write_concern=wc)
+
+    # The underlying pymongo.MongoClient, for libraries that take a client (e.g. MongoDBSaver)
+    def mongo_client(self):
+        return self.__client
+
+    # Readiness: round trip to a selectable server within timeout_ms
+    def ping(self, timeout_ms=1000):
+        with pymongo.timeout(timeout_ms / 1000.0):
+            self.__client.admin.command("ping")
+        return True
+
+    def pool_stats(self):
+        return POOL_LISTENER.snapshot()
+
     # Inserts a single document into the specified collection
-    def insert_one(self, collection_name, data):
-        collection = self.__database[collection_name]
-        collection.insert_one(data)
+    @_mongo_op
+    def insert_one(self, collection_name, data, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
+        return collection.insert_one(data)
 
     # Inserts multiple documents into the specified collection
-    def insert_many(self, collection_name, data, options={}):
-        collection = self.__database[collection_name]
-        collection.insert_many(data, **options)
+    @_mongo_op
+    def insert_many(self, collection_name, data, options={}, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
+        return collection.insert_many(data, **options)
 
     # Performs a bulk upsert (update or insert) operation on the specified collection
-    def upsert_many(self, collection_name, data):
-        collection = self.__database[collection_name]
-        collection.bulk_write(data)
+    @_mongo_op
+    def upsert_many(self, collection_name, data, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
+        return collection.bulk_write(data)
+
+    # Inserts documents from any iterable in chunks of chunk_size (unordered by default: one bad
+    # document doesn't stop the rest). Returns {"inserted_count", "inserted_ids", "errors"} where
+    # errors are {"index", "errmsg"} with index into the input sequence
+    @_mongo_op
+    def bulk_insert(self, collection_name, docs, *, ordered=False, chunk_size=1000, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
+        out = {"inserted_count": 0, "inserted_ids": [], "errors": []}
+        offset = 0
+        for chunk in _chunks(docs, chunk_size):
+            try:
+                res = collection.insert_many(chunk, ordered=ordered)
+                out["inserted_ids"].extend(res.inserted_ids)
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details.get("writeErrors", [])}
+                out["errors"].extend({"index": offset + err["index"], "errmsg": err.get("errmsg")} for err in e.details.get("writeErrors", []))
+                if ordered:
+                    # An ordered insert stops at the first error
+                    out["inserted_ids"].extend(d["_id"] for d in chunk[: min(failed, default=len(chunk))])
+                    break
+                out["inserted_ids"].extend(d["_id"] for i, d in enumerate(chunk) if i not in failed)
+            offset += len(chunk)
+        out["inserted_count"] = len(out["inserted_ids"])
+        return out
+
+    # Upserts documents matched on key_fields ($set of the whole document), in chunks;
+    # returns summed {"matched_count", "modified_count", "upserted_count", "upserted_ids"}
+    @_mongo_op
+    def bulk_upsert(self, collection_name, docs, *, key_fields=("_id",), ordered=False, chunk_size=1000, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
+        out = {"matched_count": 0, "modified_count": 0, "upserted_count": 0, "upserted_ids": []}
+        for chunk in _chunks(docs, chunk_size):
+            ops = [
+                UpdateOne({k: d[k] for k in key_fields}, {"$set": {k: v for k, v in d.items() if k != "_id"}}, upsert=True)
+                for d in chunk
+            ]
+            res = collection.bulk_write(ops, ordered=ordered)
+            out["matched_count"] += res.matched_count
+            out["modified_count"] += res.modified_count
+            out["upserted_count"] += res.upserted_count
+            out["upserted_ids"].extend((res.upserted_ids or {}).values())
+        return out
 
     # Updates a single document in the specified collection based on a filter
-    def update_one(self, collection_name, filter, data):
-        collection = self.__database[collection_name]
+    @_mongo_op
+    def update_one(self, collection_name, filter, data, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
         collection.update_one(filter, data, upsert=True)
 
     # Updates multiple documents in the specified collection based on a filter
-    def update_many(self, collection_name, filter, data):
-        collection = self.__database[collection_name]
+    @_mongo_op
+    def update_many(self, collection_name, filter, data, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
         collection.update_many(filter, data)
 
     # Deletes multiple documents in the specified collection based on a filter
-    def delete_many(self, collection_name, filter={}):
-        collection = self.__database[collection_name]
+    @_mongo_op
+    def delete_many(self, collection_name, filter={}, write_concern=None):
+        collection = self.collection(collection_name, write_concern=write_concern)
         collection.delete_many(filter)
 
     # Finds a single document in the specified collection based on a filter
-    def find_one(self, collection_name, filter={}):
-        collection = self.__database[collection_name]
+    @_mongo_op
+    def find_one(self, collection_name, filter={}, read_preference=None):
+        collection = self.collection(collection_name, read_preference=read_preference)
         return collection.find_one(filter)
 
     # Finds multiple documents in the specified collection based on a filter, with optional projection, sorting, offset, and limit
+    @_mongo_op
     def find(
         self,
         collection_name,
@@ -64,8 +239,9 @@ class MongoManager:
         sort=None,
         offset=0,
         limit=None,
+        read_preference=None,
     ):
-        collection = self.__database[collection_name]
+        collection = self.collection(collection_name, read_preference=read_preference)
         result = collection.find(filter, projection)
         if sort:
             if isinstance(sort, list):
@@ -78,12 +254,47 @@ class MongoManager:
             result = result.limit(limit)
         return list(result)
 
-    # Performs an aggregation operation on the specified collection
-    def aggregate(self, collection_name, filter={}):
-        collection = self.__database[collection_name]
-        return collection.aggregate(filter)
+    # Streams documents instead of materializing the cursor; the server returns batch_size
+    # documents per round trip, so memory stays at one batch whatever the result size
+    def iter_find(
+        self,
+        collection_name,
+        filter={},
+        projection=None,
+        sort=None,
+        limit=None,
+        batch_size=500,
+        read_preference=None,
+    ):
+        collection = self.collection(collection_name, read_preference=read_preference)
+        cursor = collection.find(filter, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort) if isinstance(sort, list) else cursor.sort(*sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return _timed_cursor(cursor, "iter_find")
+
+    # Performs an aggregation operation on the specified collection and returns a cursor;
+    # allow_disk_use lets $sort/$group spill to disk past the 100MB stage limit
+    @_mongo_op
+    def aggregate(self, collection_name, filter={}, read_preference=None, allow_disk_use=False, batch_size=None, max_time_ms=None):
+        collection = self.collection(collection_name, read_preference=read_preference)
+        kwargs = {"allowDiskUse": allow_disk_use}
+        if batch_size:
+            kwargs["batchSize"] = batch_size
+        if max_time_ms:
+            kwargs["maxTimeMS"] = max_time_ms
+        return collection.aggregate(filter, **kwargs)
 
     # Finds the distinct values for a specified field across a single collection and returns the list of distinct values
-    def distinct(self, collection_name, field, filter={}):
-        collection = self.__database[collection_name]
-        return collection.distinct(field, filter)
\ No newline at end of file
+    @_mongo_op
+    def distinct(self, collection_name, field, filter={}, read_preference=None):
+        collection = self.collection(collection_name, read_preference=read_preference)
+        return collection.distinct(field, filter)
+
+    # Counts the documents matching a filter, stopping at limit when one is given
+    @_mongo_op
+    def count_documents(self, collection_name, filter={}, limit=None, read_preference=None):
+        collection = self.collection(collection_name, read_preference=read_preference)
+        kwargs = {"limit": limit} if limit else {}
+        return collection.count_documents(filter, **kwargs)
\ No newline at end of file
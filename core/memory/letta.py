@@ -1,15 +1,27 @@
 # eq_chat_service/app/api/v1/letta.py
-import os
+import asyncio
 import time
 import re
 import unicodedata
-import requests
 from threading import Lock
-from fastapi import APIRouter, HTTPException
-from letta_client import CreateBlock, Letta, MessageCreate
-router = APIRouter(prefix="/letta", tags=["letta"])
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from config import settings
+
+_DETAIL_FIELDS = ("created_at", "updated_at", "id", "name", "agent_type", "llm_config", "embedding_config")
+
 
 class LettaService:
+    """
+    Async Letta client on one pooled httpx.AsyncClient.
+    user_id -> (agent_id, agent details) is cached for letta_agent_cache_ttl_sec, so a
+    known user's turn is a single Letta message call. Resolving/creating a user's agent is
+    single-flight: concurrent first messages share one lookup and create at most one agent.
+    """
+
     _instance = None
     _lock: Lock = Lock()
 
@@ -24,17 +36,38 @@ class LettaService:
     def __init__(self, backend_url: str, letta_base_url: str):
         if getattr(self, "_initialized", False):
             return
-        self.backend_url = backend_url
-        self.letta_url = letta_base_url
-        self.client = Letta(base_url=letta_base_url)
+        self.backend_url = backend_url.rstrip("/")
+        self.letta_url = letta_base_url.rstrip("/")
+        self.cache_ttl_sec = settings.letta_agent_cache_ttl_sec
+        self._http: Optional[httpx.AsyncClient] = None
+        # user_id -> (monotonic expiry, agent_id, details)
+        self._agents: Dict[int, Tuple[float, str, Optional[Dict[str, Any]]]] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
         self._initialized = True
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the serving event loop
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.letta_timeout_sec, connect=settings.letta_lookup_timeout_sec),
+                limits=httpx.Limits(
+                    max_connections=settings.letta_max_connections,
+                    max_keepalive_connections=settings.letta_max_connections,
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     # ------------- Helpers (service layer) -------------
-    def _backend_get_agent_id(self, user_id: int) -> str | None:
+    async def _backend_get_agent_id(self, user_id: int) -> str | None:
         try:
             url = f"{self.backend_url}/users/{user_id}/agent-id"
-            r = requests.get(url, timeout=5)
+            r = await self.http.get(url, timeout=settings.letta_lookup_timeout_sec)
             if r.status_code == 200:
                 return (r.json().get("data") or {}).get("agent_id")
             # Any non-200: treat as missing to avoid breaking chat
@@ -42,20 +75,27 @@ class LettaService:
         except Exception:
             return None
 
-    def _backend_set_agent_id(self, user_id: int, agent_id: str) -> None:
+    async def _backend_set_agent_id(self, user_id: int, agent_id: str) -> None:
         try:
             url = f"{self.backend_url}/users/{user_id}/agent-id"
-            requests.put(url, json={"agent_id": agent_id}, timeout=5)
+            await self.http.put(url, json={"agent_id": agent_id}, timeout=settings.letta_lookup_timeout_sec)
         except Exception:
             # Best-effort persistence only
             pass
-    def _get_agent_details(self, agent_id: str):
+
+    async def _get_agent_details(self, agent_id: str) -> Optional[Dict[str, Any]]:
         try:
             url = f"{self.letta_url}/v1/agents/{agent_id}"
-            agent_details = requests.get(url, timeout=5).json()
-            return agent_details
+            r = await self.http.get(url, timeout=settings.letta_lookup_timeout_sec)
+            if r.status_code == 200:
+                return self._extract_details(r.json())
+            return None
         except Exception:
-            pass
+            return None
+
+    @staticmethod
+    def _extract_details(agent: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: agent.get(k) for k in _DETAIL_FIELDS}
 
     @staticmethod
     def _make_safe_agent_name(raw_name: str, uid: int | None) -> str:
@@ -68,56 +108,88 @@ class LettaService:
             ascii_name = f"{ascii_name}-{uid}"
         return ascii_name[:64]
 
-    def _ensure_agent_id(self, user_id: int | None, username: str) -> tuple[str, str | None]:
-        if user_id is not None:
-            agent_id = self._backend_get_agent_id(user_id)
-            agent_details = self._get_agent_details(agent_id=agent_id)
-            agent_detail_extracted = {
-                "created_at": agent_details["created_at"],
-                "updated_at": agent_details["updated_at"],
-                "id": agent_details["id"],
-                "name": agent_details["name"],
-                "agent_type": agent_details["agent_type"],
-                "llm_config": agent_details["llm_config"],
-                "embedding_config": agent_details["embedding_config"]
-            }
-            if agent_id:
-                return agent_id, agent_detail_extracted
-
-        agent = self.client.agents.create(
-            memory_blocks=[
-                CreateBlock(
-                    value=f"you are chatting with a person named {username}",
-                    label="persona",
-                ),
-            ],
-            model="google_ai/gemini-2.0-flash",
-            embedding="google_ai/text-embedding-004",
-            name=self._make_safe_agent_name(username, user_id),
+    async def _create_agent(self, user_id: int | None, username: str) -> Tuple[str, Dict[str, Any]]:
+        r = await self.http.post(
+            f"{self.letta_url}/v1/agents/",
+            json={
+                "memory_blocks": [{"value": f"you are chatting with a person named {username}", "label": "persona"}],
+                "model": "google_ai/gemini-2.0-flash",
+                "embedding": "google_ai/text-embedding-004",
+                "name": self._make_safe_agent_name(username, user_id),
+            },
         )
+        r.raise_for_status()
+        agent = r.json()
+        if user_id is not None:
+            await self._backend_set_agent_id(user_id, agent["id"])
+        return agent["id"], self._extract_details(agent)
+
+    async def _resolve_agent(self, user_id: int, username: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        agent_id = await self._backend_get_agent_id(user_id)
+        if agent_id:
+            return agent_id, await self._get_agent_details(agent_id)
+        return await self._create_agent(user_id, username)
 
+    def invalidate(self, user_id: int | None) -> None:
         if user_id is not None:
-            self._backend_set_agent_id(user_id, agent.id)
+            self._agents.pop(user_id, None)
 
-        return agent.id, agent_details
+    async def _ensure_agent_id(self, user_id: int | None, username: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if user_id is None:
+            # Guests get a fresh agent each time; nothing to key a cache on
+            return await self._create_agent(None, username)
 
-    def send_message(self, user_id: int | None, username: str, message: str) -> tuple[str, float, str, str | None]:
-        t0 = time.perf_counter()
-        agent_id, agent_details = self._ensure_agent_id(user_id, username)
-        response = self.client.agents.messages.create(
-            agent_id=agent_id,
-            messages=[MessageCreate(role="user", content=message)],
+        hit = self._agents.get(user_id)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1], hit[2]
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = fut
+        try:
+            agent_id, details = await self._resolve_agent(user_id, username)
+            self._agents[user_id] = (time.monotonic() + self.cache_ttl_sec, agent_id, details)
+            fut.set_result((agent_id, details))
+            return agent_id, details
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Waiters re-raise it; mark retrieved so an unshared failure isn't logged as unhandled
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(user_id, None)
+
+    async def _post_message(self, agent_id: str, message: str) -> httpx.Response:
+        return await self.http.post(
+            f"{self.letta_url}/v1/agents/{agent_id}/messages",
+            json={"messages": [{"role": "user", "content": message}]},
         )
+
+    async def send_message(self, user_id: int | None, username: str, message: str) -> tuple[str, float, str, Dict[str, Any] | None]:
+        t0 = time.perf_counter()
+        agent_id, agent_details = await self._ensure_agent_id(user_id, username)
+        r = await self._post_message(agent_id, message)
+        if r.status_code == 404 and user_id is not None:
+            # Cached agent was deleted on the Letta side: resolve again once
+            self.invalidate(user_id)
+            agent_id, agent_details = await self._ensure_agent_id(user_id, username)
+            r = await self._post_message(agent_id, message)
+        r.raise_for_status()
         elapsed = time.perf_counter() - t0
 
+        messages = r.json().get("messages") or []
         reply_text = ""
-        for msg in response.messages:
-            if getattr(msg, "message_type", None) == "assistant_message":
-                reply_text = msg.content
+        for msg in messages:
+            if msg.get("message_type") == "assistant_message":
+                reply_text = msg.get("content") or ""
                 break
-        if not reply_text and response.messages:
-            reply_text = getattr(response.messages[-1], "content", "")
+        if not reply_text and messages:
+            reply_text = messages[-1].get("content") or ""
         if not reply_text:
             raise HTTPException(status_code=500, detail="No assistant message in response")
         return reply_text, elapsed, agent_id, agent_details
-
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator, Tuple
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+from core.observability.spans import span
+
+# Latency buckets (seconds) spanning sub-ms Mongo reads to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+NODE_LATENCY = Histogram(
+    "agent_node_seconds", "Latency of LangGraph agent nodes", ["node"], buckets=LATENCY_BUCKETS,
+)
+REPO_LATENCY = Histogram(
+    "repository_call_seconds", "Latency of repository methods", ["repo", "method"], buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_LATENCY = Histogram(
+    "external_call_seconds", "Latency of calls to external services", ["service", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TTFB = Histogram(
+    "llm_time_to_first_chunk_seconds", "Time until the first streamed LLM chunk", ["model"], buckets=LATENCY_BUCKETS,
+)
+EMBED_LATENCY = Histogram(
+    "embedding_encode_seconds", "Latency of one embedding encode call", buckets=LATENCY_BUCKETS,
+)
+EMBED_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per embedding encode call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+KAFKA_PRODUCE_LATENCY = Histogram(
+    "kafka_produce_seconds", "Time to enqueue a Kafka message (produce + poll)", ["topic"], buckets=LATENCY_BUCKETS,
+)
+KAFKA_DELIVERY_LATENCY = Histogram(
+    "kafka_delivery_seconds", "Time from produce to broker delivery report", ["topic", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+KAFKA_PRODUCE_ERRORS = Counter(
+    "kafka_produce_errors_total", "Kafka produce calls that raised", ["topic"],
+)
+KAFKA_CONSUMER_LAG = Gauge(
+    "kafka_consumer_lag_messages", "High watermark minus consumer position, per assigned partition",
+    ["topic", "partition"], multiprocess_mode="max",
+)
+KAFKA_GROUP_LAG = Gauge(
+    "kafka_group_lag_messages", "Consumer group lag (high watermark minus committed offset) seen by producers",
+    ["topic", "group"], multiprocess_mode="max",
+)
+KAFKA_CONSUMED = Counter(
+    "kafka_consumed_total", "Messages handled by a consumer", ["topic", "outcome"],
+)
+KAFKA_PROCESS_LATENCY = Histogram(
+    "kafka_process_seconds", "Time to process one consumed message", ["topic"], buckets=LATENCY_BUCKETS,
+)
+LTM_GATE_DECISIONS = Counter(
+    "ltm_gate_decisions_total", "Extraction pre-filter decisions before the LLM call", ["decision", "reason"],
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "MongoDB connections per server, by state (open includes checked out)",
+    ["address", "state"], multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_seconds", "Time to check a connection out of the MongoDB pool", ["address"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CHECKOUT_FAILED = Counter(
+    "mongo_pool_checkout_failed_total", "Failed MongoDB pool checkouts (timeout = pool exhausted)", ["address", "reason"],
+)
+SEARCH_ROUTER_DECISIONS = Counter(
+    "search_router_decisions_total", "Web search routing decisions", ["search", "reason"],
+)
+LTM_EVICTED = Counter(
+    "ltm_evicted_total", "Long-term memories evicted by capacity compaction",
+)
+LLM_CALLS = Counter(
+    "llm_calls_total", "LLM call attempts by task and provider:model target", ["task", "target", "outcome"],
+)
+LLM_HEDGED = Counter(
+    "llm_hedged_total", "LLM requests that sent a hedge after the p95 delay", ["task"],
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total", "LLM requests served by the fallback target", ["task", "reason"],
+)
+LLM_BREAKER_OPEN = Gauge(
+    "llm_breaker_open", "1 while the circuit breaker of an LLM target is open", ["target"], multiprocess_mode="max",
+)
+LLM_CONTEXT_CACHE = Counter(
+    "llm_context_cache_total", "Prompt-prefix context cache lookups", ["result"],
+)
+LTM_EXTRACT_SKIPPED = Counter(
+    "ltm_extract_skipped_total", "ltm-extract events not enqueued under backpressure", ["reason"],
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        h = histogram.labels(**labels) if labels else histogram
+        h.observe(time.perf_counter() - t0)
+
+
+@contextmanager
+def external_call(service: str, operation: str) -> Iterator[None]:
+    """
+    Time a call to an external dependency, labelled ok/error by whether it raised.
+    """
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(f"{service}.{operation}"):
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_LATENCY.labels(service=service, operation=operation, outcome=outcome).observe(time.perf_counter() - t0)
+
+
+def instrument_node(name: str) -> Callable:
+    def deco(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(NODE_LATENCY, node=name), span(f"node.{name}"):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def instrument_repo(fn: Callable) -> Callable:
+    """
+    Decorator for repository methods; the repo label is the owning class name.
+    """
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        repo = type(self).__name__
+        with timed(REPO_LATENCY, repo=repo, method=fn.__name__), span(f"repo.{repo}.{fn.__name__}"):
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Prometheus exposition for this process, or aggregated across workers when
+    PROMETHEUS_MULTIPROC_DIR is set (gunicorn/uvicorn multi-worker).
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    from prometheus_client import REGISTRY
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
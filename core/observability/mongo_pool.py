@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from threading import Lock
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+from core.observability.metrics import MONGO_POOL_CHECKOUT_FAILED, MONGO_POOL_CHECKOUT_WAIT, MONGO_POOL_CONNECTIONS
+
+
+def _addr(address: Any) -> str:
+    try:
+        host, port = address
+        return f"{host}:{port}"
+    except (TypeError, ValueError):
+        return str(address)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    CMAP (connection monitoring and pooling) listener feeding Prometheus gauges/histograms
+    and an in-process snapshot for the readiness endpoint. Per server address:
+    open/checked-out connections, checkout wait time and failed checkouts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"open": 0, "checked_out": 0, "checkout_failed": 0})
+
+    def _bump(self, address: Any, state: str, n: int) -> None:
+        addr = _addr(address)
+        with self._lock:
+            self._stats[addr][state] += n
+        MONGO_POOL_CONNECTIONS.labels(address=addr, state=state).inc(n)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {addr: dict(st) for addr, st in self._stats.items()}
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self._bump(event.address, "open", 1)
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._bump(event.address, "open", -1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        addr = _addr(event.address)
+        with self._lock:
+            self._stats[addr]["checkout_failed"] += 1
+        MONGO_POOL_CHECKOUT_FAILED.labels(address=addr, reason=str(event.reason)).inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address=addr).observe(duration)
+
+    def connection_checked_out(self, event) -> None:
+        self._bump(event.address, "checked_out", 1)
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address=_addr(event.address)).observe(duration)
+
+    def connection_checked_in(self, event) -> None:
+        self._bump(event.address, "checked_out", -1)
+
+
+POOL_LISTENER = PoolMetricsListener()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+_CURRENT: ContextVar[Optional["SpanRecorder"]] = ContextVar("span_recorder", default=None)
+
+
+class SpanRecorder:
+    """
+    Collects timing spans and annotations for one request. Lives in a ContextVar so
+    services can record without passing it around (and without importing LangSmith).
+    """
+
+    def __init__(self) -> None:
+        self._t0 = time.perf_counter()
+        self._lock = Lock()
+        self.spans: List[Dict[str, Any]] = []
+        self.annotations: Dict[str, Any] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add_span(self, name: str, start: float, end: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+        item = {
+            "name": name,
+            "start_ms": round((start - self._t0) * 1000.0, 2),
+            "duration_ms": round((end - start) * 1000.0, 2),
+        }
+        if attrs:
+            item.update(attrs)
+        with self._lock:
+            self.spans.append(item)
+
+    def annotate(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.annotations[key] = value
+
+    def incr(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+            totals: Dict[str, float] = {}
+            for s in spans:
+                totals[s["name"]] = round(totals.get(s["name"], 0.0) + s["duration_ms"], 2)
+            return {
+                "total_ms": round((time.perf_counter() - self._t0) * 1000.0, 2),
+                "by_stage_ms": totals,
+                "spans": spans,
+                "annotations": dict(self.annotations),
+                "counters": dict(self.counters),
+            }
+
+
+def current() -> Optional[SpanRecorder]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def recording() -> Iterator[SpanRecorder]:
+    rec = SpanRecorder()
+    token = _CURRENT.set(rec)
+    try:
+        yield rec
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    rec = _CURRENT.get()
+    if rec is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec.add_span(name, start, time.perf_counter(), attrs or None)
+
+
+def annotate(key: str, value: Any) -> None:
+    rec = _CURRENT.get()
+    if rec is not None:
+        rec.annotate(key, value)
+
+
+def incr(key: str, n: int = 1) -> None:
+    rec = _CURRENT.get()
+    if rec is not None:
+        rec.incr(key, n)
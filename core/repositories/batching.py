@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import time
+
+
+def iter_batches(
+    coll,
+    flt: Dict[str, Any],
+    *,
+    batch_size: int = 500,
+    projection: Optional[Dict[str, int]] = None,
+    after_id: Any = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield matching documents in _id order, batch_size at a time (keyset on _id, so each
+    query is an index range scan and memory stays at one batch). Pass the last _id seen
+    as after_id to resume.
+    """
+    batch_size = max(1, batch_size)
+    while True:
+        q = dict(flt)
+        if after_id is not None:
+            q["_id"] = {"$gt": after_id}
+        batch = list(coll.find(q, projection).sort([("_id", 1)]).limit(batch_size))
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1]["_id"]
+        if len(batch) < batch_size:
+            return
+
+
+def delete_in_batches(
+    coll,
+    flt: Dict[str, Any],
+    *,
+    batch_size: int = 500,
+    pause_sec: float = 0.0,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    delete_many in chunks of batch_size _ids so a large user never holds the collection
+    for one long write; on_batch(n_deleted) is called after every chunk.
+    """
+    total = 0
+    batch_size = max(1, batch_size)
+    while True:
+        ids = [d["_id"] for d in coll.find(flt, {"_id": 1}).sort([("_id", 1)]).limit(batch_size)]
+        if not ids:
+            return total
+        res = coll.delete_many({"_id": {"$in": ids}})
+        n = int(getattr(res, "deleted_count", len(ids)))
+        total += n
+        if on_batch:
+            on_batch(n)
+        if len(ids) < batch_size:
+            return total
+        if pause_sec:
+            time.sleep(pause_sec)
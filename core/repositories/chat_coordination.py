@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from core.database.mongodb_client import MongoManager
+from core.observability.metrics import instrument_repo
+
+
+class UserLockRepo:
+    """
+    Lease-based locks shared by every worker: one document per held key, `_id` = key.
+    A lock is free when no document exists or its lease (`expires_at`) has run out, so a
+    crashed holder blocks others for at most one lease.
+    """
+
+    def __init__(self, *, db_name: str = "EMOSTAGRAM", collection: str = "user_locks") -> None:
+        self.client = MongoManager(db=db_name)
+        self.collection = collection
+        self._indexed = False
+
+    def _coll(self):
+        coll = self.client.collection(self.collection)
+        if not self._indexed:
+            coll.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return coll
+
+    @instrument_repo
+    def try_acquire(self, *, key: str, owner: str, lease_sec: float) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches only an expired lease; a live one makes the upsert collide on _id
+            self._coll().find_one_and_update(
+                {"_id": key, "expires_at": {"$lt": now}},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_sec)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @instrument_repo
+    def release(self, *, key: str, owner: str) -> None:
+        self._coll().delete_one({"_id": key, "owner": owner})
+
+
+class IdempotencyRepo:
+    """
+    Results of /chat requests that carried an idempotency key, kept until `expires_at`
+    (TTL index; reads also check expiry since the TTL monitor runs only once a minute).
+    """
+
+    def __init__(self, *, db_name: str = "EMOSTAGRAM", collection: str = "chat_idempotency") -> None:
+        self.client = MongoManager(db=db_name)
+        self.collection = collection
+        self._indexed = False
+
+    def _coll(self):
+        coll = self.client.collection(self.collection)
+        if not self._indexed:
+            coll.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return coll
+
+    @instrument_repo
+    def get(self, *, key: str) -> Optional[Dict[str, Any]]:
+        doc = self._coll().find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        return (doc or {}).get("result")
+
+    @instrument_repo
+    def put(self, *, key: str, result: Dict[str, Any], ttl_sec: float) -> None:
+        self._coll().replace_one(
+            {"_id": key},
+            {"result": result, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_sec)},
+            upsert=True,
+        )
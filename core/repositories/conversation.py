@@ -3,11 +3,13 @@ from __future__ import annotations
 
 from uuid import uuid4
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
 from bson import ObjectId
 import base64, json
 
-from core.database.mongodb_client import MongoManager 
+from core.database.mongodb_client import MongoManager
+from core.observability.metrics import instrument_repo 
+from core.repositories.batching import delete_in_batches, iter_batches
 
 
 class ConversationRepo:
@@ -15,6 +17,7 @@ class ConversationRepo:
         self.client = MongoManager(db=db_name)
         self.collection = collection
 
+    @instrument_repo
     def store_new_message(
         self,
         *,
@@ -37,6 +40,7 @@ class ConversationRepo:
         self.client.insert_one(self.collection, doc)
         return message_id
 
+    @instrument_repo
     def get_conversation(
         self,
         *,
@@ -45,6 +49,7 @@ class ConversationRepo:
         cursor: Optional[str] = None,     
         newest_first: bool = True,
         projection: Optional[Dict[str, int]] = None,
+        read_preference: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Cursor/Keyset pagination (infinite scroll mượt):
@@ -54,10 +59,34 @@ class ConversationRepo:
         page_size = max(1, min(page_size, 200))
 
         sort = [("created_at", -1), ("_id", -1)] if newest_first else [("created_at", 1), ("_id", 1)]
-        uid = self._normalize_user_id(user_id)
-        cand = {uid, str(uid)}
-        flt: Dict[str, Any] ={"user_id": {"$in": list(cand)}}
+        flt = self._page_filter(user_id, cursor, newest_first)
+
+        docs: List[Dict[str, Any]] = self.client.find(
+            collection_name=self.collection,
+            filter=flt,
+            projection=projection or {"_id": 1, "created_at": 1, "role": 1, "content": 1, "message_id": 1},
+            sort=sort,
+            limit=page_size,
+            read_preference=read_preference,
+        )
+
+        next_cursor = self.cursor_for(docs[-1]) if docs else None
+
+        return {
+            "items": docs,
+            "next_cursor": next_cursor,
+            "page_size": page_size,
+        }
+
+    @instrument_repo
+    def count_after(self, *, user_id: int | str, cursor: Optional[str] = None, limit: Optional[int] = None) -> int:
+        """
+        Number of the user's messages past `cursor` (all of them without one), counting at most `limit`.
+        """
+        return self.client.count_documents(self.collection, filter=self._page_filter(user_id, cursor, False), limit=limit)
 
+    def _page_filter(self, user_id: int | str, cursor: Optional[str], newest_first: bool) -> Dict[str, Any]:
+        flt: Dict[str, Any] = self.user_filter(user_id)
         if cursor:
             c = self._decode_cursor(cursor)
             last_created_at = datetime.fromisoformat(c["last_created_at"])
@@ -72,35 +101,31 @@ class ConversationRepo:
                     {"created_at": {"$gt": last_created_at}},
                     {"created_at": last_created_at, "_id": {"$gt": last_id}},
                 ]
+        return flt
 
-        docs: List[Dict[str, Any]] = self.client.find(
-            collection_name=self.collection,
-            filter=flt,
-            projection=projection or {"_id": 1, "created_at": 1, "role": 1, "content": 1, "message_id": 1},
-            sort=sort,
-            limit=page_size,
-        )
+    def user_filter(self, user_id: int | str) -> Dict[str, Any]:
+        uid = self._normalize_user_id(user_id)
+        return {"user_id": {"$in": list({uid, str(uid)})}}
 
-        next_cursor = None
-        if docs:
-            last = docs[-1]
-            next_cursor = self._encode_cursor({
-                "last_created_at": last["created_at"].isoformat() if isinstance(last.get("created_at"), datetime) else last.get("created_at"),
-                "last_id": str(last["_id"]),
-            })
+    def iter_by_user(self, *, user_id: int | str, batch_size: int = 500, after_id: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        coll = self.client.collection(self.collection)
+        return iter_batches(coll, self.user_filter(user_id), batch_size=batch_size, after_id=after_id)
 
-        return {
-            "items": docs,
-            "next_cursor": next_cursor,
-            "page_size": page_size,
-        }
+    @instrument_repo
+    def delete_by_user(self, *, user_id: int | str, batch_size: int = 500, pause_sec: float = 0.0, on_batch=None) -> int:
+        coll = self.client.collection(self.collection)
+        return delete_in_batches(coll, self.user_filter(user_id), batch_size=batch_size, pause_sec=pause_sec, on_batch=on_batch)
+
+    @classmethod
+    def cursor_for(cls, doc: Dict[str, Any]) -> str:
+        """
+        Cursor pointing just past `doc` (same format as next_cursor).
+        """
+        return cls._encode_cursor({
+            "last_created_at": doc["created_at"].isoformat() if isinstance(doc.get("created_at"), datetime) else doc.get("created_at"),
+            "last_id": str(doc["_id"]),
+        })
 
-    def delete_by_user(self, *, user_id: int | str) -> int:
-        uid = self._normalize_user_id(user_id)
-        cand = {uid, str(uid)}
-        coll = self.client._MongoManager__database[self.collection]
-        res = coll.delete_many({"user_id": {"$in": list(cand)}})
-        return int(getattr(res, "deleted_count", 0))
     @staticmethod
     def _normalize_user_id(user_id: int | str) -> int | str:
         if isinstance(user_id, str) and user_id.isdigit():
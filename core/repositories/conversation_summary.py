@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timezone
+
+from core.database.mongodb_client import MongoManager
+from core.observability.metrics import instrument_repo
+
+
+class ConversationSummaryRepo:
+    """
+    One rolling summary document per user.
+    `cursor` is a ConversationRepo pagination cursor pointing at the last summarized message;
+    `profile` is the snapshot of profile facts taken with the summary.
+    """
+
+    def __init__(self, *, db_name: str = "EMOSTAGRAM", collection: str = "conversation_summaries") -> None:
+        self.client = MongoManager(db=db_name)
+        self.collection = collection
+
+    @instrument_repo
+    def get(self, *, user_id: Union[int, str]) -> Optional[Dict[str, Any]]:
+        return self.client.find_one(self.collection, filter={"user_id": str(user_id)})
+
+    @instrument_repo
+    def upsert(
+        self,
+        *,
+        user_id: Union[int, str],
+        summary: str,
+        cursor: Optional[str],
+        last_created_at: Optional[datetime],
+        message_count: int,
+        profile: Optional[List[str]] = None,
+    ) -> None:
+        fields: Dict[str, Any] = {
+            "user_id": str(user_id),
+            "summary": summary,
+            "cursor": cursor,
+            "last_created_at": last_created_at,
+            "message_count": message_count,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if profile is not None:
+            fields["profile"] = profile
+        self.client.update_one(self.collection, filter={"user_id": str(user_id)}, data={"$set": fields})
+
+    def user_filter(self, user_id: Union[int, str]) -> Dict[str, Any]:
+        return {"user_id": str(user_id)}
+
+    def iter_by_user(self, *, user_id: Union[int, str], batch_size: int = 500, after_id: Any = None):
+        # At most one document per user; same shape as the other repos for exports
+        doc = self.client.find_one(self.collection, filter=self.user_filter(user_id))
+        if doc is not None and (after_id is None or doc["_id"] > after_id):
+            yield [doc]
+
+    @instrument_repo
+    def delete_by_user(self, *, user_id: Union[int, str], **_: Any) -> int:
+        coll = self.client.collection(self.collection)
+        res = coll.delete_many(self.user_filter(user_id))
+        return int(getattr(res, "deleted_count", 0))
@@ -1,23 +1,54 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 from datetime import datetime, timezone
+from threading import Lock
+
+import heapq
+import time
 
 import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
 
+from config import settings
 from core.database.mongodb_client import MongoManager
+from core.observability import spans
+from core.observability.metrics import instrument_repo
+from core.repositories.batching import delete_in_batches, iter_batches
+from core.search.lexical import bm25_scores, term_frequencies, tokenize
+
+VECTOR_BACKENDS = ("auto", "atlas", "local")
+# (db, collection) -> (resolved backend "atlas" | "local", monotonic time it was resolved);
+# in "auto" mode it is re-probed every settings.ltm_vector_backend_reprobe_sec
+_VECTOR_BACKEND: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_VECTOR_BACKEND_LOCK = Lock()
+# Server errors meaning $vectorSearch cannot work here (IndexNotFound, CommandNotSupported,
+# SearchNotEnabled, unrecognized pipeline stage), as opposed to a transient failure
+_VECTOR_UNSUPPORTED_CODES = frozenset({27, 115, 31082, 40324})
 
 
 class LongTermMemoryRepo:
     """
     MongoDB-backed repository for long-term memory facts per user.
-    Stores text content and its embedding vector for similarity search.
+    Stores text content and its embedding vector for similarity search, plus
+    per-document term frequencies (lex_*) and per-user length stats for BM25.
     """
 
-    def __init__(self, *, db_name: str = "EMOSTAGRAM", collection: str = "long_term_memory") -> None:
+    def __init__(
+        self,
+        *,
+        db_name: str = "EMOSTAGRAM",
+        collection: str = "long_term_memory",
+        stats_collection: str = "long_term_memory_stats",
+    ) -> None:
         self.client = MongoManager(db=db_name)
+        self.db_name = db_name
         self.collection = collection
+        self.stats_collection = stats_collection
 
+    @instrument_repo
     def add_memory(
         self,
         *,
@@ -25,61 +56,410 @@ class LongTermMemoryRepo:
         content: str,
         embedding: List[float],
         source: str = "extracted",
+        category: Optional[str] = None,
+        confidence: Optional[float] = None,
     ) -> str:
+        doc, length = self._new_doc(
+            user_id, content, embedding, source=source, category=category, confidence=confidence, now=datetime.now(timezone.utc),
+        )
+        self.client.insert_one(self.collection, doc)
+        self._inc_lexical_stats(user_id, docs=1, length=length)
+        # ObjectId is created by Mongo, but we return content as id is not immediately available
+        return content
+
+    @instrument_repo
+    def add_memories(
+        self,
+        *,
+        user_id: Union[int, str],
+        items: Sequence[Tuple[str, List[float]]],
+        source: str = "extracted",
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[Optional[str]]:
+        """
+        Insert many (content, embedding) facts with one unordered bulk insert; `metadata`
+        gives each item's category/confidence. Returns one entry per item: None if stored,
+        else the error message.
+        """
+        now = datetime.now(timezone.utc)
+        meta = list(metadata) if metadata is not None else [{}] * len(items)
+        docs: List[Dict[str, Any]] = []
+        lengths: List[int] = []
+        for (content, embedding), m in zip(items, meta):
+            doc, length = self._new_doc(
+                user_id, content, embedding, source=source, category=m.get("category"), confidence=m.get("confidence"), now=now,
+            )
+            docs.append(doc)
+            lengths.append(length)
+        if not docs:
+            return []
+        res = self.client.bulk_insert(self.collection, docs)
+        errors: List[Optional[str]] = [None] * len(docs)
+        for err in res["errors"]:
+            errors[err["index"]] = err.get("errmsg") or "insert failed"
+        stored = [i for i, e in enumerate(errors) if e is None]
+        if stored:
+            self._inc_lexical_stats(user_id, docs=len(stored), length=sum(lengths[i] for i in stored))
+        return errors
+
+    @staticmethod
+    def _new_doc(
+        user_id: Union[int, str],
+        content: str,
+        embedding: List[float],
+        *,
+        source: str,
+        category: Optional[str],
+        confidence: Optional[float],
+        now: datetime,
+    ) -> Tuple[Dict[str, Any], int]:
+        tf, length = term_frequencies(content)
         doc: Dict[str, Any] = {
             "user_id": user_id,
             "content": content,
             "embedding": embedding,
             "source": source,
-            "created_at": datetime.now(timezone.utc),
+            "category": category,
+            "confidence": confidence,
+            # Retrieval usage, maintained by record_hits(); read by compaction
+            "hits": 0,
+            "last_accessed_at": None,
+            "lex_terms": list(tf.keys()),
+            "lex_tf": tf,
+            "lex_len": length,
+            "created_at": now,
         }
-        self.client.insert_one(self.collection, doc)
-        # ObjectId is created by Mongo, but we return content as id is not immediately available
-        return content
+        return doc, length
+
+    @instrument_repo
+    def record_hits(self, *, user_id: Union[int, str], contents: Sequence[str]) -> None:
+        """
+        Count one retrieval for each of the user's memories with these contents.
+        """
+        if not contents:
+            return
+        self.client.update_many(
+            self.collection,
+            filter={"user_id": {"$in": self._candidate_user_ids(user_id)}, "content": {"$in": list(set(contents))}},
+            data={"$inc": {"hits": 1}, "$set": {"last_accessed_at": datetime.now(timezone.utc)}},
+        )
 
-    def list_by_user(self, *, user_id: Union[int, str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    @instrument_repo
+    def users_over_capacity(self, *, capacity: int) -> List[Tuple[Union[int, str], int]]:
+        """
+        (user_id, memory count) for every user holding more than `capacity` memories.
+        """
+        pipeline = [
+            {"$group": {"_id": "$user_id", "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": capacity}}},
+        ]
+        return [(d["_id"], int(d["n"])) for d in self.client.aggregate(self.collection, pipeline, allow_disk_use=True)]
+
+    def iter_scoring_fields(self, *, user_id: Union[int, str], batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        return self.client.iter_find(
+            self.collection,
+            filter=self.user_filter(user_id),
+            projection={"_id": 1, "content": 1, "confidence": 1, "hits": 1, "created_at": 1, "last_accessed_at": 1, "lex_len": 1},
+            batch_size=batch_size,
+        )
+
+    @instrument_repo
+    def delete_memories(self, *, user_id: Union[int, str], docs: Sequence[Dict[str, Any]], batch_size: int = 500) -> int:
+        """
+        Delete these docs (by _id) of one user and take the ones actually deleted out of the
+        BM25 stats, using their stored lex_len. Returns the number deleted.
+        """
+        deleted = length = 0
+        for start in range(0, len(docs), max(1, batch_size)):
+            ids = [d["_id"] for d in docs[start:start + batch_size]]
+            present = self.client.find(self.collection, filter={"_id": {"$in": ids}}, projection={"_id": 1, "lex_len": 1})
+            if not present:
+                continue
+            self.client.delete_many(self.collection, filter={"_id": {"$in": [d["_id"] for d in present]}})
+            left = {d["_id"] for d in self.client.find(self.collection, filter={"_id": {"$in": ids}}, projection={"_id": 1})}
+            gone = [d for d in present if d["_id"] not in left]
+            deleted += len(gone)
+            length += sum(int(d.get("lex_len") or 0) for d in gone)
+        if deleted:
+            self._inc_lexical_stats(user_id, docs=-deleted, length=-length)
+        return deleted
+
+    def contents_in_use(self, *, user_id: Union[int, str], contents: Sequence[str]) -> Set[str]:
+        """The subset of `contents` still held by at least one of the user's memories."""
+        if not contents:
+            return set()
+        return set(self.client.distinct(
+            self.collection, "content", filter={**self.user_filter(user_id), "content": {"$in": list(set(contents))}},
+        ))
+
+    @instrument_repo
+    def list_by_user(
+        self, *, user_id: Union[int, str], limit: Optional[int] = None, read_preference: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         sort = [("created_at", -1), ("_id", -1)]
         candidates = self._candidate_user_ids(user_id)
-        docs = self.client.find(self.collection, filter={"user_id": {"$in": candidates}}, sort=sort, limit=limit)
+        docs = self.client.find(
+            self.collection, filter={"user_id": {"$in": candidates}}, sort=sort, limit=limit, read_preference=read_preference,
+        )
         return docs
 
-    def delete_by_user(self, *, user_id: Union[int, str]) -> int:
-        candidates = self._candidate_user_ids(user_id)
+    def user_filter(self, user_id: Union[int, str]) -> Dict[str, Any]:
+        return {"user_id": {"$in": self._candidate_user_ids(user_id)}}
+
+    def iter_by_user(
+        self, *, user_id: Union[int, str], batch_size: int = 500, after_id: Any = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        coll = self.client.collection(self.collection)
+        return iter_batches(coll, self.user_filter(user_id), batch_size=batch_size, after_id=after_id)
+
+    @instrument_repo
+    def delete_by_user(
+        self, *, user_id: Union[int, str], batch_size: int = 500, pause_sec: float = 0.0, on_batch=None
+    ) -> int:
         # MongoManager.delete_many returns None; we can run raw operation via private handle
-        coll = self.client._MongoManager__database[self.collection]
-        res = coll.delete_many({"user_id": {"$in": candidates}})
-        return int(getattr(res, "deleted_count", 0))
+        coll = self.client.collection(self.collection)
+        deleted = delete_in_batches(coll, self.user_filter(user_id), batch_size=batch_size, pause_sec=pause_sec, on_batch=on_batch)
+        self.client.delete_many(self.stats_collection, {"user_id": str(user_id)})
+        return deleted
+
+    @instrument_repo
+    def search_lexical(
+        self,
+        *,
+        user_id: Union[int, str],
+        query: str,
+        top_k: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 over the user's memories using the stored inverted-index fields.
+        Every memory containing a query term is scored (bm25_scores needs all of them for
+        document frequencies); only scoring fields are streamed, then the top_k docs are
+        loaded. Returns docs (without embeddings) with a `lexical_score`.
+        """
+        q_tokens = tokenize(query)
+        if not q_tokens:
+            return []
+        candidates = self._candidate_user_ids(user_id)
+        matches = self.client.iter_find(
+            self.collection,
+            filter={"user_id": {"$in": candidates}, "lex_terms": {"$in": list(set(q_tokens))}},
+            projection={"_id": 1, "lex_tf": 1, "lex_len": 1},
+        )
+        stats = self.client.find_one(self.stats_collection, filter={"user_id": str(user_id)}) or {}
+        docs = [(d["_id"], d.get("lex_tf") or {}, int(d.get("lex_len") or 0)) for d in matches]
+        if not docs:
+            return []
+        n_docs = int(stats.get("doc_count") or len(docs))
+        avgdl = float(stats.get("total_len") or 0) / n_docs if n_docs else 0.0
+        top = bm25_scores(q_tokens, docs, n_docs=n_docs, avgdl=avgdl)[: max(1, top_k)]
+        if not top:
+            return []
+        found = self.client.find(
+            self.collection,
+            filter={"_id": {"$in": [doc_id for doc_id, _ in top]}},
+            projection={"embedding": 0, "lex_terms": 0, "lex_tf": 0},
+        )
+        by_id = {d["_id"]: d for d in found}
+        out: List[Dict[str, Any]] = []
+        for doc_id, score in top:
+            d = by_id.get(doc_id)
+            if d is not None:
+                out.append({**d, "lexical_score": score})
+        return out
 
+    def backfill_lexical(self, *, user_id: Optional[Union[int, str]] = None) -> int:
+        """
+        Add lex_* fields to memories written before lexical indexing existed and rebuild stats.
+        """
+        self.ensure_lexical_index()
+        flt: Dict[str, Any] = {"lex_terms": {"$exists": False}}
+        if user_id is not None:
+            flt["user_id"] = {"$in": self._candidate_user_ids(user_id)}
+        n = 0
+        ops: List[UpdateOne] = []
+        stats: Dict[str, List[int]] = {}
+        for d in self.client.iter_find(self.collection, filter=flt, projection={"_id": 1, "user_id": 1, "content": 1}):
+            tf, length = term_frequencies(d.get("content") or "")
+            ops.append(UpdateOne({"_id": d["_id"]}, {"$set": {"lex_terms": list(tf.keys()), "lex_tf": tf, "lex_len": length}}))
+            st = stats.setdefault(str(d.get("user_id")), [0, 0])
+            st[0] += 1
+            st[1] += length
+            n += 1
+            if len(ops) >= 500:
+                self.client.upsert_many(self.collection, ops)
+                ops = []
+        if ops:
+            self.client.upsert_many(self.collection, ops)
+        for uid, (docs, length) in stats.items():
+            self._inc_lexical_stats(uid, docs=docs, length=length)
+        return n
+
+    def ensure_lexical_index(self) -> None:
+        coll = self.client.collection(self.collection)
+        coll.create_index([("user_id", 1), ("lex_terms", 1)])
+
+    def _inc_lexical_stats(self, user_id: Union[int, str], *, docs: int, length: int) -> None:
+        self.client.update_one(
+            self.stats_collection,
+            filter={"user_id": str(user_id)},
+            data={"$inc": {"doc_count": docs, "total_len": length}},
+        )
+
+    def detect_vector_backend(self, *, refresh: bool = False) -> str:
+        """
+        Resolve settings.ltm_mongo_vector_backend to "atlas" or "local". In "auto" mode Atlas
+        is used only if a queryable vectorSearch index named settings.ltm_vector_index_name
+        exists; servers without search indexes (community, mongomock) resolve to "local".
+        The auto result is re-probed after settings.ltm_vector_backend_reprobe_sec.
+        """
+        key = (self.db_name, self.collection)
+        mode = settings.ltm_mongo_vector_backend
+        cached = _VECTOR_BACKEND.get(key)
+        if not refresh and cached is not None:
+            if mode != "auto" or time.monotonic() - cached[1] < settings.ltm_vector_backend_reprobe_sec:
+                return cached[0]
+        with _VECTOR_BACKEND_LOCK:
+            if mode not in VECTOR_BACKENDS:
+                raise ValueError(f"ltm mongo vector backend must be one of {VECTOR_BACKENDS}")
+            backend = mode
+            if mode == "auto":
+                backend = "atlas" if self._vector_index_ready() else "local"
+            _VECTOR_BACKEND[key] = (backend, time.monotonic())
+        return backend
+
+    def _vector_index_ready(self) -> bool:
+        name = settings.ltm_vector_index_name
+        try:
+            indexes = list(self.client.collection(self.collection).list_search_indexes(name))
+        except Exception:
+            return False
+        return any(ix.get("name") == name and ix.get("queryable") for ix in indexes)
+
+    def ensure_vector_index(self, *, num_dimensions: int, similarity: str = "cosine") -> str:
+        """
+        Create the Atlas vectorSearch index on `embedding`, with user_id as a pre-filter field.
+        The index builds asynchronously; call detect_vector_backend(refresh=True) once it is queryable.
+        """
+        model = SearchIndexModel(
+            definition={
+                "fields": [
+                    {"type": "vector", "path": "embedding", "numDimensions": num_dimensions, "similarity": similarity},
+                    {"type": "filter", "path": "user_id"},
+                ]
+            },
+            name=settings.ltm_vector_index_name,
+            type="vectorSearch",
+        )
+        return self.client.collection(self.collection).create_search_index(model)
+
+    @instrument_repo
     def search_similar(
         self,
         *,
         user_id: Union[int, str],
         query_embedding: List[float],
         top_k: int = 5,
+        batch_size: int = 256,
     ) -> List[Dict[str, Any]]:
         """
-        Naive in-memory cosine similarity over user's memories. Suitable for small scale.
+        Top-k memories by cosine similarity, on the backend chosen by detect_vector_backend().
+        If $vectorSearch fails, this query falls back to the local scan. Later queries stay
+        on Atlas unless the server says the index/stage is unavailable ("auto" mode only),
+        in which case they use the local scan until the next re-probe.
         """
-        docs = self.list_by_user(user_id=user_id, limit=None)
-        if not docs:
+        if self.detect_vector_backend() == "atlas":
+            try:
+                docs = self.search_vector(user_id=user_id, query_embedding=query_embedding, top_k=top_k)
+                spans.annotate("ltm.mongo_vector_backend", "atlas")
+                return docs
+            except Exception as e:
+                spans.incr("ltm.vector_search_fallback")
+                unsupported = isinstance(e, OperationFailure) and e.code in _VECTOR_UNSUPPORTED_CODES
+                if unsupported and settings.ltm_mongo_vector_backend == "auto":
+                    _VECTOR_BACKEND[(self.db_name, self.collection)] = ("local", time.monotonic())
+        spans.annotate("ltm.mongo_vector_backend", "local")
+        return self.search_similar_local(user_id=user_id, query_embedding=query_embedding, top_k=top_k, batch_size=batch_size)
+
+    def search_vector(
+        self,
+        *,
+        user_id: Union[int, str],
+        query_embedding: List[float],
+        top_k: int = 5,
+        num_candidates: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Atlas $vectorSearch with a user_id pre-filter; similarity is computed in the database
+        and only the top_k docs (without embeddings) come back, with the index `score`.
+        """
+        if not query_embedding:
             return []
+        top_k = max(1, top_k)
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": settings.ltm_vector_index_name,
+                    "path": "embedding",
+                    "queryVector": [float(x) for x in query_embedding],
+                    "numCandidates": max(top_k, num_candidates or settings.ltm_vector_num_candidates),
+                    "limit": top_k,
+                    "filter": self.user_filter(user_id),
+                }
+            },
+            {"$addFields": {"score": {"$meta": "vectorSearchScore"}}},
+            {"$project": {"embedding": 0, "lex_terms": 0, "lex_tf": 0, "lex_len": 0}},
+        ]
+        return list(self.client.aggregate(self.collection, pipeline))
 
+    def search_similar_local(
+        self,
+        *,
+        user_id: Union[int, str],
+        query_embedding: List[float],
+        top_k: int = 5,
+        batch_size: int = 256,
+    ) -> List[Dict[str, Any]]:
+        """
+        Brute-force cosine similarity over the user's memories, streamed batch_size docs at a
+        time; only the current batch and the running top_k are held in memory.
+        """
         q = np.array(query_embedding, dtype=np.float32)
-        if np.linalg.norm(q) == 0:
+        if q.size == 0 or np.linalg.norm(q) == 0:
             return []
         q = q / (np.linalg.norm(q) + 1e-12)
+        top_k = max(1, top_k)
 
-        scored: List[tuple[float, Dict[str, Any]]] = []
+        heap: List[tuple] = []  # (sim, seq, doc) min-heap of the best top_k so far
+        seq = 0
+        batch: List[Dict[str, Any]] = []
+        docs = self.client.iter_find(
+            self.collection,
+            filter={"user_id": {"$in": self._candidate_user_ids(user_id)}, "embedding.0": {"$exists": True}},
+            projection={"lex_terms": 0, "lex_tf": 0, "lex_len": 0},
+            batch_size=batch_size,
+        )
         for d in docs:
-            emb = np.array(d.get("embedding") or [], dtype=np.float32)
-            if emb.size == 0:
-                continue
-            emb = emb / (np.linalg.norm(emb) + 1e-12)
-            sim = float(np.dot(q, emb))
-            scored.append((sim, d))
+            if len(d.get("embedding") or []) == q.size:
+                batch.append(d)
+            if len(batch) >= batch_size:
+                seq = self._push_top_k(heap, batch, q, top_k, seq)
+                batch = []
+        if batch:
+            self._push_top_k(heap, batch, q, top_k, seq)
+        return [d for _, _, d in sorted(heap, key=lambda x: (-x[0], x[1]))]
 
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [d for _, d in scored[: max(1, top_k)]]
+    @staticmethod
+    def _push_top_k(heap: List[tuple], batch: List[Dict[str, Any]], q: np.ndarray, top_k: int, seq: int) -> int:
+        embs = np.array([d["embedding"] for d in batch], dtype=np.float32)
+        sims = (embs @ q) / (np.linalg.norm(embs, axis=1) + 1e-12)
+        for sim, d in zip(sims.tolist(), batch):
+            item = (sim, seq, d)
+            seq += 1
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif sim > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        return seq
 
     @staticmethod
     def _candidate_user_ids(user_id: Union[int, str]) -> List[Union[int, str]]:
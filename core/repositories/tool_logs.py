@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from datetime import datetime, timezone
 
 from core.database.mongodb_client import MongoManager
+from core.observability.metrics import instrument_repo
+from core.repositories.batching import delete_in_batches, iter_batches
 
 
 class ToolLogRepo:
@@ -15,6 +17,7 @@ class ToolLogRepo:
         self.client = MongoManager(db=db_name)
         self.collection = collection
 
+    @instrument_repo
     def log_search(
         self,
         *,
@@ -32,8 +35,32 @@ class ToolLogRepo:
         }
         self.client.insert_one(self.collection, doc)
 
-    def list_recent(self, *, user_id: Union[int, str], limit: int = 20) -> List[Dict[str, Any]]:
+    @instrument_repo
+    def list_recent(
+        self, *, user_id: Union[int, str], limit: int = 20, read_preference: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         sort = [("created_at", -1), ("_id", -1)]
-        return self.client.find(self.collection, filter={"user_id": {"$in": [user_id, str(user_id)]}}, sort=sort, limit=limit)
+        return self.client.find(
+            self.collection, filter=self.user_filter(user_id), sort=sort, limit=limit, read_preference=read_preference,
+        )
+
+    def user_filter(self, user_id: Union[int, str]) -> Dict[str, Any]:
+        cand: List[Union[int, str]] = [user_id, str(user_id)]
+        if isinstance(user_id, str) and user_id.isdigit():
+            cand.append(int(user_id))
+        return {"user_id": {"$in": cand}}
+
+    def iter_by_user(
+        self, *, user_id: Union[int, str], batch_size: int = 500, after_id: Any = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        coll = self.client.collection(self.collection)
+        return iter_batches(coll, self.user_filter(user_id), batch_size=batch_size, after_id=after_id)
+
+    @instrument_repo
+    def delete_by_user(
+        self, *, user_id: Union[int, str], batch_size: int = 500, pause_sec: float = 0.0, on_batch=None
+    ) -> int:
+        coll = self.client.collection(self.collection)
+        return delete_in_batches(coll, self.user_filter(user_id), batch_size=batch_size, pause_sec=pause_sec, on_batch=on_batch)
 
 
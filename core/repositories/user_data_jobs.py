@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Union
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from pymongo import ReturnDocument
+
+from core.database.mongodb_client import MongoManager
+from core.observability.metrics import instrument_repo
+
+
+class UserDataJobRepo:
+    """
+    Progress documents for chunked user-data jobs (delete), one per job.
+    `done` lists the stages already finished so a resumed job skips them;
+    `progress` holds per-stage counts of items processed so far.
+    """
+
+    def __init__(self, *, db_name: str = "EMOSTAGRAM", collection: str = "user_data_jobs") -> None:
+        self.client = MongoManager(db=db_name)
+        self.collection = collection
+
+    @instrument_repo
+    def create(self, *, user_id: Union[int, str], kind: str) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        doc: Dict[str, Any] = {
+            "job_id": uuid4().hex,
+            "user_id": user_id,
+            "kind": kind,
+            "status": "pending",
+            "stage": None,
+            "done": [],
+            "progress": {},
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.client.insert_one(self.collection, dict(doc))
+        return doc
+
+    @instrument_repo
+    def get(self, *, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.client.find_one(self.collection, filter={"job_id": job_id})
+
+    @instrument_repo
+    def claim(self, *, job_id: str, stale_sec: float) -> Optional[Dict[str, Any]]:
+        """
+        Atomically mark the job running and return it, or None if it is done, missing or
+        already running. A running job whose updated_at is older than stale_sec (its
+        worker died) can be claimed again; running jobs touch updated_at every batch.
+        """
+        now = datetime.now(timezone.utc)
+        return self.client.collection(self.collection).find_one_and_update(
+            {
+                "job_id": job_id,
+                "$or": [
+                    {"status": {"$in": ["pending", "failed"]}},
+                    {"status": "running", "updated_at": {"$lt": now - timedelta(seconds=stale_sec)}},
+                ],
+            },
+            {"$set": {"status": "running", "error": None, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @instrument_repo
+    def update(self, *, job_id: str, set_fields: Optional[Dict[str, Any]] = None, inc: Optional[Dict[str, int]] = None) -> None:
+        data: Dict[str, Any] = {"$set": {**(set_fields or {}), "updated_at": datetime.now(timezone.utc)}}
+        if inc:
+            data["$inc"] = inc
+        self.client.update_one(self.collection, filter={"job_id": job_id}, data=data)
+
+    @instrument_repo
+    def mark_stage_done(self, *, job_id: str, stage: str) -> None:
+        self.client.update_one(
+            self.collection,
+            filter={"job_id": job_id},
+            data={"$addToSet": {"done": stage}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        )
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Union
-
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qmodels
+from typing import Any, Dict, List, Optional, Sequence, Union
+from uuid import NAMESPACE_URL, uuid5
 
 from config import settings
+from core.observability.metrics import external_call
 
 
 class QdrantVectorRepo:
     def __init__(self, *, collection: str | None = None) -> None:
         if not settings.qdrant_url:
             raise RuntimeError("Qdrant URL not configured")
+        from qdrant_client import QdrantClient
+        from qdrant_client.http import models as qmodels
+
+        self._qm = qmodels
         self.collection = collection or settings.qdrant_collection
         self.client = QdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
         self._ensure_collection()
@@ -22,23 +25,121 @@ class QdrantVectorRepo:
         except Exception:
             self.client.recreate_collection(
                 collection_name=self.collection,
-                vectors_config=qmodels.VectorParams(size=384, distance=qmodels.Distance.COSINE),
+                vectors_config=self._qm.VectorParams(size=384, distance=self._qm.Distance.COSINE),
             )
+        # Facts are matched by payload (user_id, text) when deduping and deleting
+        for field in ("user_id", "text"):
+            try:
+                self.client.create_payload_index(self.collection, field, field_schema=self._qm.PayloadSchemaType.KEYWORD)
+            except Exception:
+                pass
 
-    def upsert_memory(self, *, user_id: Union[int, str], text: str, embedding: List[float]) -> None:
-        payload = {"user_id": str(user_id), "text": text}
-        self.client.upsert(
-            collection_name=self.collection,
-            points=[qmodels.PointStruct(id=None, vector=embedding, payload=payload)],
+    @staticmethod
+    def point_id(user_id: Union[int, str], text: str) -> str:
+        # Deterministic per (user, text): re-upserting the same fact overwrites instead of duplicating
+        return str(uuid5(NAMESPACE_URL, f"ltm:{user_id}:{text}"))
+
+    def _facts_filter(self, user_id: Union[int, str], texts: Sequence[str], *, except_ids: Sequence[str] = ()):
+        qm = self._qm
+        return qm.Filter(
+            must=[
+                qm.FieldCondition(key="user_id", match=qm.MatchValue(value=str(user_id))),
+                qm.FieldCondition(key="text", match=qm.MatchAny(any=list(texts))),
+            ],
+            must_not=[qm.HasIdCondition(has_id=list(except_ids))] if except_ids else None,
         )
 
+    def upsert_memory(self, *, user_id: Union[int, str], text: str, embedding: List[float]) -> None:
+        self.upsert_memories(user_id=user_id, texts=[text], embeddings=[embedding])
+
+    def upsert_memories(
+        self,
+        *,
+        user_id: Union[int, str],
+        texts: Sequence[str],
+        embeddings: Sequence[List[float]],
+        payloads: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> int:
+        """
+        Upsert many facts of one user in a single request; facts without an embedding are skipped.
+        `payloads` adds per-fact payload fields (category, confidence). Returns the number of points written.
+        Points written before ids were deterministic (random ids, same user_id/text payload) are
+        removed first, so an upgraded collection converges without a separate reindex.
+        """
+        extra = list(payloads) if payloads is not None else [{}] * len(texts)
+        points = [
+            self._qm.PointStruct(
+                id=self.point_id(user_id, text), vector=emb, payload={**more, "user_id": str(user_id), "text": text},
+            )
+            for text, emb, more in zip(texts, embeddings, extra)
+            if emb
+        ]
+        if not points:
+            return 0
+        texts = [p.payload["text"] for p in points]
+        with external_call("qdrant", "delete"):
+            self.client.delete(
+                collection_name=self.collection,
+                points_selector=self._qm.FilterSelector(
+                    filter=self._facts_filter(user_id, texts, except_ids=[p.id for p in points]),
+                ),
+                wait=True,
+            )
+        with external_call("qdrant", "upsert"):
+            self.client.upsert(collection_name=self.collection, points=points)
+        return len(points)
+
+    def delete_memories(self, *, user_id: Union[int, str], texts: Sequence[str]) -> None:
+        # By payload rather than point_id so legacy random-id points of these facts go too
+        if not texts:
+            return
+        with external_call("qdrant", "delete"):
+            self.client.delete(
+                collection_name=self.collection,
+                points_selector=self._qm.FilterSelector(filter=self._facts_filter(user_id, texts)),
+                wait=True,
+            )
+
+    def _user_filter(self, user_id: Union[int, str]):
+        return self._qm.Filter(must=[self._qm.FieldCondition(key="user_id", match=self._qm.MatchValue(value=str(user_id)))])
+
+    def delete_by_user(self, *, user_id: Union[int, str], batch_size: int = 500, on_batch=None) -> int:
+        """
+        Delete the user's points in batches: scroll ids by payload filter, delete those ids.
+        Returns the number of points deleted.
+        """
+        total = 0
+        while True:
+            with external_call("qdrant", "scroll"):
+                points, _ = self.client.scroll(
+                    collection_name=self.collection,
+                    scroll_filter=self._user_filter(user_id),
+                    limit=max(1, batch_size),
+                    with_payload=False,
+                    with_vectors=False,
+                )
+            if not points:
+                return total
+            with external_call("qdrant", "delete"):
+                self.client.delete(
+                    collection_name=self.collection,
+                    points_selector=self._qm.PointIdsList(points=[p.id for p in points]),
+                    wait=True,
+                )
+            total += len(points)
+            if on_batch:
+                on_batch(len(points))
+            if len(points) < batch_size:
+                return total
+
     def search(self, *, user_id: Union[int, str], query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
-        res = self.client.search(
-            collection_name=self.collection,
-            query_vector=query_embedding,
-            limit=top_k,
-            query_filter=qmodels.Filter(must=[qmodels.FieldCondition(key="user_id", match=qmodels.MatchValue(value=str(user_id)))])
-        )
+        with external_call("qdrant", "search"):
+            res = self.client.search(
+                collection_name=self.collection,
+                query_vector=query_embedding,
+                limit=top_k,
+                query_filter=self._user_filter(user_id),
+            )
         out: List[Dict[str, Any]] = []
         for p in res:
             payload = dict(p.payload or {})
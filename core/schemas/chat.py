@@ -1,10 +1,26 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from config import settings
 
 class ChatRequest(BaseModel):
     user_id: int | None = None
     username: str
-    message: str
+    message: str = Field(max_length=settings.chat_message_max_chars)
     include_agent_detail: bool = False
+    # Retries/double-sends with the same key (per user) get the first result back
+    idempotency_key: str | None = Field(default=None, max_length=200)
+
+class ChatBatchItem(BaseModel):
+    user_id: int | None = None
+    username: str
+    message: str = Field(max_length=settings.chat_message_max_chars)
+    idempotency_key: str | None = Field(default=None, max_length=200)
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatBatchItem] = Field(min_length=1)
+    max_concurrency: int | None = Field(default=None, ge=1, le=64)
 
 class ChatResponse(BaseModel):
     message: str
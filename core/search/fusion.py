@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Hashable]], *, k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)), best first."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
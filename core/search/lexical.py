@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+from collections import Counter
+import math
+import re
+import unicodedata
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_diacritics(text: str) -> str:
+    # "Hà Nội" -> "ha noi"; đ is not decomposed by NFKD so map it explicitly
+    text = text.replace("đ", "d").replace("Đ", "D")
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lexical tokens for Vietnamese/English memory text.
+    Emits lowercased syllables, their diacritic-free form (users often type without accents)
+    and syllable bigrams, since Vietnamese words/names usually span two syllables.
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    tokens: List[str] = []
+    for w in words:
+        tokens.append(w)
+        folded = fold_diacritics(w)
+        if folded != w:
+            tokens.append(folded)
+    for a, b in zip(words, words[1:]):
+        tokens.append(f"{fold_diacritics(a)}_{fold_diacritics(b)}")
+    return tokens
+
+
+def term_frequencies(text: str) -> Tuple[Dict[str, int], int]:
+    tokens = tokenize(text)
+    return dict(Counter(tokens)), len(tokens)
+
+
+def bm25_scores(
+    query_tokens: Sequence[str],
+    docs: Iterable[Tuple[Hashable, Dict[str, int], int]],
+    *,
+    n_docs: int,
+    avgdl: float,
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> List[Tuple[Hashable, float]]:
+    """
+    BM25 over (doc_id, term_freqs, doc_len) candidates. Document frequencies are taken
+    from the candidates, which must include every doc containing any query term.
+    """
+    docs = list(docs)
+    q_terms = list(dict.fromkeys(query_tokens))
+    df: Dict[str, int] = {t: 0 for t in q_terms}
+    for _, tf, _ in docs:
+        for t in q_terms:
+            if tf.get(t):
+                df[t] += 1
+    n_docs = max(n_docs, len(docs), 1)
+    avgdl = avgdl if avgdl > 0 else 1.0
+
+    scored: List[Tuple[Hashable, float]] = []
+    for doc_id, tf, dl in docs:
+        score = 0.0
+        for t in q_terms:
+            f = tf.get(t, 0)
+            if not f:
+                continue
+            idf = math.log(1.0 + (n_docs - df[t] + 0.5) / (df[t] + 0.5))
+            score += idf * f * (k1 + 1) / (f + k1 * (1 - b + b * dl / avgdl))
+        if score > 0:
+            scored.append((doc_id, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
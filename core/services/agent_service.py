@@ -1,41 +1,51 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Union, TypedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from queue import Empty, Queue
+from threading import Event
+import time
 
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-
-from core.services.memory_service import MemoryService
+from core.services.memory_service import MemoryService, get_memory_service
 from core.services.tavily_service import TavilyService
 from core.services.llm_service import LLMService
 from core.services.conversation import ConversationService
+from core.services.prompt_builder import PromptBudget, PromptBuilder
+from core.services.summary_service import SummaryService, as_utc_naive, profile_fact_limit
+from core.services.intent_router import get_search_router
+from core.services.chat_coordination import get_idempotency_cache, get_user_lock, idempotency_scope
 from core.tools.extract import extract_long_term_facts_tool
 from core.tools.search import tavily_search_tool
-from infra.kafka.producer import KafkaProducerClient
+from core.observability.metrics import instrument_node
+from core.observability.spans import annotate
+from infra.kafka.lag import should_enqueue_extraction
+from infra.kafka.producer import get_default_producer
 from config import settings
 from langsmith import traceable
 
 
-try:
-    _KAFKA_PRODUCER = KafkaProducerClient(bootstrap_servers=settings.kafka_bootstrap)
-except Exception:
-    _KAFKA_PRODUCER = None
-
 class AgentState(TypedDict, total=False):
     user_id: Union[int, str]
     username: str
     user_message: str
+    query_embedding: Optional[List[float]]
     short_term_context: List[Dict[str, Any]]
+    conversation_summary: str
+    profile_facts: List[str]
     long_term_context: List[str]
+    retrieval: Dict[str, Any]
     search_results: List[Dict[str, Any]]
     extracted_facts: List[str]
     assistant_reply: str
+    prompt_tokens: Dict[str, int]
 
 
 def _should_search(state: AgentState) -> bool:
-    user_msg = state.get("user_message", "").lower()
-    return any(kw in user_msg for kw in ["search", "tìm", "google", "web"])
+    decision = get_search_router().route(state.get("user_message", ""), vector=state.get("query_embedding"))
+    annotate("router.search_confidence", round(decision.confidence, 3))
+    return decision.search
 
 
 class AgentService:
@@ -46,31 +56,83 @@ class AgentService:
         tavily: Optional[TavilyService] = None,
         llm: Optional[LLMService] = None,
         conversation: Optional[ConversationService] = None,
+        prompt_builder: Optional[PromptBuilder] = None,
+        summary: Optional[SummaryService] = None,
     ) -> None:
-        self.memory = memory or MemoryService()
+        self.memory = memory or get_memory_service()
         self.tavily = tavily
         self.llm = llm or LLMService()
         self.conv = conversation or ConversationService()
+        self.summary = summary or SummaryService()
+        self.prompt_builder = prompt_builder or PromptBuilder(PromptBudget(
+            total=settings.prompt_budget_total,
+            long_term=settings.prompt_budget_long_term,
+            history=settings.prompt_budget_history,
+            search=settings.prompt_budget_search,
+            max_turn=settings.prompt_budget_max_turn,
+            summary=settings.prompt_budget_summary,
+            profile=settings.prompt_budget_profile,
+            cache_min=settings.llm_context_cache_min_tokens if settings.llm_context_cache_enabled else 0,
+            cached_profile=settings.prompt_budget_cached_profile,
+        ))
 
         self.graph = self._build_graph()
 
     def _build_graph(self):
+        from langgraph.graph import StateGraph, END
+
+        from core.services.checkpointing import get_checkpointer
+
         builder = StateGraph(AgentState)
 
         @traceable(name="agent.load_context")
+        @instrument_node("load_context")
         def load_context(state: AgentState) -> AgentState:
             user_id = state["user_id"]
-            # Short-term: last 10 messages
-            convo = self.conv.get_conversation(user_id=user_id, page_size=10, newest_first=True)
-            history = list(reversed([{k: d[k] for k in ("role", "content")} for d in convo["items"]]))
+            # Rolling summary covers everything up to its cursor; only newer turns are sent verbatim
+            summary_doc = None
+            try:
+                summary_doc = self.summary.get_summary(user_id=user_id)
+            except Exception:
+                summary_doc = None
+            covered_until = as_utc_naive((summary_doc or {}).get("last_created_at"))
+            state["conversation_summary"] = (summary_doc or {}).get("summary") or ""
+            # Short-term: the newest summary_keep_recent messages not yet folded into the summary
+            convo = self.conv.get_conversation(user_id=user_id, page_size=settings.summary_keep_recent, newest_first=True)
+            items = convo["items"]
+            if covered_until is not None:
+                items = [d for d in items if (as_utc_naive(d.get("created_at")) or covered_until) > covered_until]
+            history = list(reversed([{k: d[k] for k in ("role", "content")} for d in items]))
             state["short_term_context"] = history
+            # Profile: newest memories, oldest first, as snapshotted with the summary so the
+            # cached prefix holds between folds; users without a snapshot yet get a live lookup
+            profile: Optional[List[str]] = (summary_doc or {}).get("profile")
+            if profile is None:
+                profile = []
+                if profile_fact_limit() > 0:
+                    try:
+                        docs = self.memory.list_long_term_memory(user_id=user_id, limit=profile_fact_limit())
+                        profile = [d.get("content", "") for d in reversed(docs) if d.get("content")]
+                    except Exception:
+                        profile = []
+            state["profile_facts"] = profile
             # Long-term: retrieve similar memory to current message
             user_msg = state.get("user_message", "")
-            ltm_docs = self.memory.search_long_term_memory(user_id=user_id, query=user_msg, top_k=5)
-            state["long_term_context"] = [d.get("content", "") for d in ltm_docs]
+            if state.get("query_embedding") is None and self.tavily and user_msg.strip():
+                # The search router needs the vector too: embed once here and share it
+                try:
+                    state["query_embedding"] = self.memory.embed_text(user_msg)
+                except Exception:
+                    state["query_embedding"] = None
+            retrieval = self.memory.retrieve_long_term_memory(
+                user_id=user_id, query=user_msg, top_k=5, query_embedding=state.get("query_embedding"),
+            )
+            state["long_term_context"] = [d.get("content", "") for d in retrieval.docs]
+            state["retrieval"] = retrieval.as_detail()
             return state
 
         @traceable(name="agent.maybe_search")
+        @instrument_node("maybe_search")
         def maybe_search(state: AgentState) -> AgentState:
             if self.tavily and _should_search(state):
                 q = state.get("user_message", "")
@@ -85,15 +147,19 @@ class AgentService:
             return state
 
         @traceable(name="agent.extract_facts")
+        @instrument_node("extract_facts")
         def extract_facts(state: AgentState) -> AgentState:
             state["extracted_facts"] = []
             try:
-                if _KAFKA_PRODUCER is not None:
-                    _KAFKA_PRODUCER.send(
-                        topic="ltm-extract",
-                        key=str(state["user_id"]),
-                        value={"user_id": state["user_id"], "message": state.get("user_message", "")},
-                    )
+                producer = get_default_producer()
+                if producer is not None:
+                    # Under consumer lag, low-value messages are dropped rather than queued
+                    if should_enqueue_extraction(state.get("user_message", "")):
+                        producer.send(
+                            topic=settings.ltm_extract_topic,
+                            key=str(state["user_id"]),
+                            value={"user_id": state["user_id"], "message": state.get("user_message", "")},
+                        )
                 else:
                     raise RuntimeError("kafka not available")
             except Exception:
@@ -107,21 +173,26 @@ class AgentService:
             return state
 
         @traceable(name="agent.respond")
+        @instrument_node("respond")
         def respond(state: AgentState) -> AgentState:
             sys = "You are a helpful Vietnamese assistant. Use context when answering."
-            parts: List[str] = []
-            if state.get("long_term_context"):
-                parts.append("Long-term memory:\n" + "\n".join(state["long_term_context"]))
-            if state.get("short_term_context"):
-                turns = [f"{m['role']}: {m['content']}" for m in state["short_term_context"]]
-                parts.append("Recent conversation (last 10):\n" + "\n".join(turns))
-            if state.get("search_results"):
-                lines = [f"- {r.get('title','')} {r.get('url','')}" for r in state["search_results"]]
-                parts.append("Web search results:\n" + "\n".join(lines))
-            context = "\n\n".join(parts)
-
-            user_prompt = f"Context (may be partial):\n{context}\n\nUser: {state.get('user_message','')}\nAssistant:"
-            answer = self.llm.chat(system_prompt=sys, user_prompt=user_prompt)
+            built = self.prompt_builder.build(
+                system=sys,
+                user_message=state.get("user_message", ""),
+                summary=state.get("conversation_summary"),
+                profile=state.get("profile_facts"),
+                long_term=state.get("long_term_context"),
+                history=state.get("short_term_context"),
+                search_results=state.get("search_results"),
+            )
+            answer = self.llm.chat(
+                system_prompt=built.system_prompt,
+                user_prompt=built.suffix,
+                prefix=built.prefix,
+                cache_key=str(state["user_id"]),
+                cacheable_prefix=built.cacheable_prefix or None,
+            )
+            state["prompt_tokens"] = {**built.tokens, "dropped_turns": built.dropped_turns}
             state["assistant_reply"] = answer
             return state
 
@@ -135,8 +206,8 @@ class AgentService:
         builder.add_edge("maybe_search", "extract_facts")
         builder.add_edge("extract_facts", "respond")
         builder.add_edge("respond", END)
-        # Enable checkpointing (in-memory to avoid optional sqlite dependency issues)
-        return builder.compile(checkpointer=MemorySaver())
+        # Checkpointing mode (off / bounded memory / sqlite / mongo) comes from settings.checkpoint_mode
+        return builder.compile(checkpointer=get_checkpointer())
 
     @traceable(name="AgentService.chat", tags=["agent","chat"])
     def chat(
@@ -146,6 +217,41 @@ class AgentService:
         username: str,
         message: str,
         thread_id: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Requests of the same user run one at a time (UserBusyError if the lock isn't free
+        within chat_user_lock_timeout_sec). With idempotency_key, a result cached for that
+        key is returned (with "replayed": True) instead of running the pipeline again.
+        """
+        cache = get_idempotency_cache() if idempotency_key else None
+        scope = idempotency_scope(user_id, idempotency_key) if idempotency_key else ""
+        lock = get_user_lock()
+        with lock.hold(str(user_id), timeout=settings.chat_user_lock_timeout_sec) if lock else nullcontext():
+            if cache is not None:
+                cached = cache.get(scope)
+                if cached is not None:
+                    annotate("chat.idempotent_replay", True)
+                    return {**cached, "replayed": True}
+            out = self._chat(
+                user_id=user_id, username=username, message=message, thread_id=thread_id, query_embedding=query_embedding,
+            )
+            if cache is not None:
+                try:
+                    cache.put(scope, out)
+                except Exception:
+                    pass
+        return out
+
+    def _chat(
+        self,
+        *,
+        user_id: Union[int, str],
+        username: str,
+        message: str,
+        thread_id: Optional[str],
+        query_embedding: Optional[List[float]],
     ) -> Dict[str, Any]:
         # Persist user message
         self.conv.create_message(user_id=user_id, role="user", content=message)
@@ -154,6 +260,7 @@ class AgentService:
             "user_id": user_id,
             "username": username,
             "user_message": message,
+            "query_embedding": query_embedding,
         }
         thread = thread_id or str(user_id)
         final_state = self.graph.invoke(state, config={"configurable": {"thread_id": thread}})
@@ -162,12 +269,100 @@ class AgentService:
         # Persist assistant message
         if answer:
             self.conv.create_message(user_id=user_id, role="assistant", content=answer)
+        # Let the summary consumer fold older turns; no inline fallback to keep the request path cheap
+        producer = get_default_producer()
+        if producer is not None:
+            try:
+                producer.send(topic=settings.summary_topic, key=str(user_id), value={"user_id": user_id})
+            except Exception:
+                pass
 
         return {
             "message": answer,
             "long_term": final_state.get("long_term_context", []),
             "search_results": final_state.get("search_results", []),
             "extracted_facts": final_state.get("extracted_facts", []),
+            "prompt_tokens": final_state.get("prompt_tokens", {}),
+            "retrieval": final_state.get("retrieval", {}),
         }
 
+    def chat_batch(
+        self,
+        items: Sequence[Dict[str, Any]],
+        *,
+        max_concurrency: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run many {"user_id", "username", "message"[, "idempotency_key"]} items through chat(). All messages are
+        embedded up front in embed_batch_size chunks; different users run concurrently (at
+        most max_concurrency at once) while each user's messages run one at a time, in input
+        order. Yields one result per item as it completes, with the item's input `index`.
+        Closing the generator early cancels the items that have not started. If no result
+        arrives for chat_batch_result_timeout_sec, the remaining items are yielded as failed.
+        """
+        if not items:
+            return
+        embed_batch_size = max(1, embed_batch_size or settings.chat_batch_embed_size)
+        messages = [str(it.get("message") or "") for it in items]
+        vectors: List[Optional[List[float]]] = [None] * len(items)
+        for start in range(0, len(messages), embed_batch_size):
+            try:
+                chunk = self.memory.embed_texts(messages[start:start + embed_batch_size])
+            except Exception:
+                # chat() embeds on its own when no vector is given
+                continue
+            vectors[start:start + len(chunk)] = chunk
+
+        def user_of(it: Dict[str, Any]) -> Any:
+            return it.get("username") if it.get("user_id") is None else it.get("user_id")
+
+        by_user: Dict[str, List[int]] = {}
+        for i, it in enumerate(items):
+            by_user.setdefault(str(user_of(it)), []).append(i)
+
+        results: "Queue[Dict[str, Any]]" = Queue()
+        stop = Event()
 
+        def run_user(indices: List[int]) -> None:
+            for i in indices:
+                if stop.is_set():
+                    return
+                it = items[i]
+                t0 = time.perf_counter()
+                out: Dict[str, Any] = {"index": i, "user_id": user_of(it)}
+                try:
+                    res = self.chat(
+                        user_id=out["user_id"],
+                        username=it.get("username") or str(out["user_id"]),
+                        message=messages[i],
+                        query_embedding=vectors[i],
+                        idempotency_key=it.get("idempotency_key"),
+                    )
+                    out.update(ok=True, message=res.get("message", ""))
+                except Exception as e:
+                    out.update(ok=False, error=str(e))
+                out["gen_time_sec"] = round(time.perf_counter() - t0, 4)
+                results.put(out)
+
+        workers = max(1, min(max_concurrency or settings.chat_batch_concurrency, len(by_user)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-batch")
+        try:
+            for indices in by_user.values():
+                pool.submit(run_user, indices)
+            pending = set(range(len(items)))
+            while pending:
+                try:
+                    out = results.get(timeout=settings.chat_batch_result_timeout_sec)
+                except Empty:
+                    # A worker stopped without reporting: fail what is left instead of hanging
+                    for i in sorted(pending):
+                        yield {"index": i, "user_id": user_of(items[i]), "ok": False, "error": "timed out waiting for result"}
+                    return
+                pending.discard(out["index"])
+                yield out
+        finally:
+            # On close (e.g. the client disconnected) queued users never start and running
+            # ones stop after their current message; nothing waits for them here
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
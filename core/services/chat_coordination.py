@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from uuid import uuid4
+import copy
+import time
+
+from config import settings
+
+COORDINATION_BACKENDS = ("off", "local", "mongo")
+
+
+class UserBusyError(TimeoutError):
+    """The per-user chat lock was not free within the wait timeout."""
+
+
+class KeyedLock:
+    """
+    One mutex per key, created on demand and dropped when nobody holds or waits for it.
+    """
+
+    def __init__(self) -> None:
+        self._guard = Lock()
+        self._locks: Dict[str, List[Any]] = {}  # key -> [Lock, holders + waiters]
+
+    @contextmanager
+    def hold(self, key: str, *, timeout: Optional[float] = None) -> Iterator[None]:
+        with self._guard:
+            entry = self._locks.setdefault(key, [Lock(), 0])
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(timeout=-1 if timeout is None else max(0.0, timeout)):
+                raise UserBusyError(f"timed out waiting for lock {key!r}")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
+
+
+class DistributedKeyedLock:
+    """
+    KeyedLock across processes: threads of this process queue on a local KeyedLock first,
+    then the winner polls a Mongo lease (UserLockRepo) until it is free or timeout passes.
+    """
+
+    def __init__(self, repo=None, *, lease_sec: float = 120.0, poll_sec: float = 0.05) -> None:
+        if repo is None:
+            from core.repositories.chat_coordination import UserLockRepo
+
+            repo = UserLockRepo()
+        self.repo = repo
+        self.lease_sec = lease_sec
+        self.poll_sec = poll_sec
+        self._local = KeyedLock()
+
+    @contextmanager
+    def hold(self, key: str, *, timeout: Optional[float] = None) -> Iterator[None]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._local.hold(key, timeout=timeout):
+            owner = uuid4().hex
+            delay = self.poll_sec
+            while not self.repo.try_acquire(key=key, owner=owner, lease_sec=self.lease_sec):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise UserBusyError(f"timed out waiting for lock {key!r}")
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+            try:
+                yield
+            finally:
+                try:
+                    self.repo.release(key=key, owner=owner)
+                except Exception:
+                    # The lease expires on its own
+                    pass
+
+
+class IdempotencyCache:
+    """
+    In-process TTL cache of results by idempotency key (LRU-bounded to max_entries).
+    """
+
+    def __init__(self, *, ttl_sec: float = 300.0, max_entries: int = 10000) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self._lock = Lock()
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                self._items.pop(key, None)
+                return None
+            return copy.deepcopy(hit[1])
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_sec, copy.deepcopy(result))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+class MongoIdempotencyCache:
+    """
+    IdempotencyCache shared by every worker, stored in Mongo (IdempotencyRepo).
+    """
+
+    def __init__(self, repo=None, *, ttl_sec: float = 300.0) -> None:
+        if repo is None:
+            from core.repositories.chat_coordination import IdempotencyRepo
+
+            repo = IdempotencyRepo()
+        self.repo = repo
+        self.ttl_sec = ttl_sec
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.repo.get(key=key)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        self.repo.put(key=key, result=result, ttl_sec=self.ttl_sec)
+
+
+def idempotency_scope(user_id: Union[int, str], key: str) -> str:
+    # Keys are only unique per client, so they are namespaced by user
+    return f"{user_id}:{key}"
+
+
+_LOCK = None
+_CACHE = None
+_INIT_LOCK = Lock()
+
+
+def _init() -> None:
+    global _LOCK, _CACHE
+    with _INIT_LOCK:
+        if _CACHE is not None:
+            return
+        backend = settings.chat_coordination_backend
+        if backend not in COORDINATION_BACKENDS:
+            raise ValueError(f"chat coordination backend must be one of {COORDINATION_BACKENDS}")
+        if backend == "mongo":
+            _LOCK = DistributedKeyedLock(lease_sec=settings.chat_user_lock_lease_sec)
+            _CACHE = MongoIdempotencyCache(ttl_sec=settings.chat_idempotency_ttl_sec)
+        else:
+            _LOCK = KeyedLock() if backend == "local" else None
+            _CACHE = IdempotencyCache(
+                ttl_sec=settings.chat_idempotency_ttl_sec, max_entries=settings.chat_idempotency_max_entries,
+            )
+
+
+def get_user_lock():
+    """Per-user lock for chat(), or None when chat_coordination_backend is "off"."""
+    if _CACHE is None:
+        _init()
+    return _LOCK
+
+
+def get_idempotency_cache():
+    if _CACHE is None:
+        _init()
+    return _CACHE
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from collections import OrderedDict, defaultdict
+from threading import Lock, RLock
+from typing import Any, Dict, Optional, Set, Tuple
+import time
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config import settings
+
+CHECKPOINT_MODES = ("off", "memory", "sqlite", "mongo")
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer that only keeps the latest checkpoint per thread and at most
+    `max_threads` threads (least recently written evicted first, plus optional TTL).
+    InMemorySaver itself keeps every checkpoint of every thread forever.
+    """
+
+    def __init__(self, *, max_threads: int = 1000, ttl_sec: Optional[float] = None) -> None:
+        super().__init__()
+        self.max_threads = max(1, max_threads)
+        self.ttl_sec = ttl_sec
+        self._lock = RLock()
+        self._lru: "OrderedDict[str, float]" = OrderedDict()
+        # Per-thread key indexes so pruning/eviction never scans the whole store
+        self._blob_keys: Dict[str, Set[Tuple[Any, ...]]] = defaultdict(set)
+        self._write_keys: Dict[str, Set[Tuple[Any, ...]]] = defaultdict(set)
+
+    def get_tuple(self, config):
+        with self._lock:
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._lock:
+            return iter(list(super().list(config, filter=filter, before=before, limit=limit)))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            out = super().put(config, checkpoint, metadata, new_versions)
+            for ch, ver in new_versions.items():
+                self._blob_keys[thread_id].add((thread_id, checkpoint_ns, ch, ver))
+            self._prune_thread(thread_id, checkpoint_ns, checkpoint)
+            self._lru[thread_id] = time.monotonic()
+            self._lru.move_to_end(thread_id)
+            self._evict()
+        return out
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys[thread_id].add((thread_id, checkpoint_ns, checkpoint_id))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop_thread(thread_id)
+
+    def thread_count(self) -> int:
+        return len(self._lru)
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str, checkpoint: Dict[str, Any]) -> None:
+        keep_id = checkpoint["id"]
+        ns_storage = self.storage[thread_id][checkpoint_ns]
+        for cid in [c for c in ns_storage if c != keep_id]:
+            del ns_storage[cid]
+        for key in [k for k in self._write_keys[thread_id] if k[1] == checkpoint_ns and k[2] != keep_id]:
+            self.writes.pop(key, None)
+            self._write_keys[thread_id].discard(key)
+        live = {(thread_id, checkpoint_ns, ch, ver) for ch, ver in (checkpoint.get("channel_versions") or {}).items()}
+        for key in [k for k in self._blob_keys[thread_id] if k[1] == checkpoint_ns and k not in live]:
+            self.blobs.pop(key, None)
+            self._blob_keys[thread_id].discard(key)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._lru:
+            oldest, touched = next(iter(self._lru.items()))
+            expired = self.ttl_sec is not None and now - touched > self.ttl_sec
+            if len(self._lru) <= self.max_threads and not expired:
+                break
+            self._drop_thread(oldest)
+
+    def _drop_thread(self, thread_id: str) -> None:
+        self._lru.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+
+
+def _sqlite_saver(path: str, *, ttl_sec: Optional[float], prune_every: int = 1000):
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class PruningSqliteSaver(SqliteSaver):
+        """
+        SqliteSaver that keeps only the latest checkpoint per thread and deletes threads
+        idle for longer than `ttl_sec` (checked every `prune_every` puts).
+        """
+
+        def setup(self) -> None:
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS thread_activity_updated ON thread_activity(updated_at)")
+            self.conn.commit()
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            out = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO thread_activity (thread_id, updated_at) VALUES (?, ?) "
+                    "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                    (thread_id, time.time()),
+                )
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id <> ?",
+                    (thread_id, checkpoint_ns, checkpoint["id"]),
+                )
+                cur.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id <> ?",
+                    (thread_id, checkpoint_ns, checkpoint["id"]),
+                )
+            self._puts = getattr(self, "_puts", 0) + 1
+            if ttl_sec and self._puts % prune_every == 0:
+                self.prune(ttl_sec)
+            return out
+
+        def delete_thread(self, thread_id: str) -> None:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+        def prune(self, ttl: float) -> int:
+            cutoff = time.time() - ttl
+            with self.cursor() as cur:
+                stale = [r[0] for r in cur.execute("SELECT thread_id FROM thread_activity WHERE updated_at < ?", (cutoff,))]
+                for thread_id in stale:
+                    cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                    cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                    cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+            return len(stale)
+
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return PruningSqliteSaver(conn)
+
+
+def _mongo_saver(*, ttl_sec: Optional[float]):
+    from langgraph.checkpoint.mongodb import MongoDBSaver
+
+    from core.database.mongodb_client import MongoManager
+
+    client = MongoManager(db=settings.checkpoint_mongo_db).mongo_client()
+    # TTL is enforced by a Mongo TTL index on created_at
+    return MongoDBSaver(client, db_name=settings.checkpoint_mongo_db, ttl=int(ttl_sec) if ttl_sec else None)
+
+
+def build_checkpointer(mode: Optional[str] = None):
+    """
+    Checkpointer for the agent graph, selected by settings.checkpoint_mode:
+    - off:    no checkpoints (nothing reads them back across turns)
+    - memory: BoundedMemorySaver (latest checkpoint per thread, LRU + TTL)
+    - sqlite: local SQLite file, latest checkpoint per thread, TTL pruning
+    - mongo:  MongoDBSaver with a TTL index
+    """
+    mode = mode or settings.checkpoint_mode
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"checkpoint mode must be one of {CHECKPOINT_MODES}")
+    ttl = settings.checkpoint_ttl_sec
+    if mode == "off":
+        return None
+    if mode == "memory":
+        return BoundedMemorySaver(max_threads=settings.checkpoint_max_threads, ttl_sec=ttl)
+    if mode == "sqlite":
+        return _sqlite_saver(settings.checkpoint_sqlite_path, ttl_sec=ttl)
+    return _mongo_saver(ttl_sec=ttl)
+
+
+_CHECKPOINTER: Any = None
+_CHECKPOINTER_READY = False
+_CHECKPOINTER_LOCK = Lock()
+
+
+def get_checkpointer():
+    """
+    Process-wide checkpointer from build_checkpointer(), shared by the agent graph and
+    /reset so an in-memory store is the same one the graph writes to. None when off.
+    """
+    global _CHECKPOINTER, _CHECKPOINTER_READY
+    if not _CHECKPOINTER_READY:
+        with _CHECKPOINTER_LOCK:
+            if not _CHECKPOINTER_READY:
+                _CHECKPOINTER = build_checkpointer()
+                _CHECKPOINTER_READY = True
+    return _CHECKPOINTER
+
+
+def delete_checkpoint_thread(thread_id: str) -> bool:
+    """Drop every checkpoint of thread_id; False when checkpointing is off."""
+    saver = get_checkpointer()
+    if saver is None:
+        return False
+    saver.delete_thread(thread_id)
+    return True
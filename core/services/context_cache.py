@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import time
+
+from core.observability import spans
+from core.observability.metrics import LLM_CONTEXT_CACHE
+
+# Local expiry runs this much ahead of the provider's so a handle is never used as it expires
+_EXPIRY_MARGIN_SEC = 30.0
+
+
+@dataclass
+class _Entry:
+    digest: str
+    handle: Any  # None = creation failed; don't retry this prefix until expires_at
+    expires_at: float
+
+
+class ContextCacheRegistry:
+    """
+    Provider context-cache handles, one per key (user), for the current prompt prefix.
+    A handle is reused while the prefix digest is unchanged and its TTL has not run out;
+    a changed prefix creates a new handle and deletes the old one. At most max_entries
+    handles are kept (least recently used deleted first). Concurrent misses for the same
+    key and digest share one create() call.
+    """
+
+    def __init__(self, *, ttl_sec: float = 600.0, max_entries: int = 1000) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._creating: Dict[str, Tuple[str, Future]] = {}
+
+    @staticmethod
+    def digest(*parts: Optional[str]) -> str:
+        h = hashlib.sha256()
+        for p in parts:
+            h.update((p or "").encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str, digest: str) -> Optional[Any]:
+        """Live handle for (key, digest) if one exists; never creates."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.digest != digest or entry.expires_at <= time.monotonic() or entry.handle is None:
+                return None
+            self._entries.move_to_end(key)
+        LLM_CONTEXT_CACHE.labels(result="hit").inc()
+        spans.incr("llm.context_cache_hit")
+        return entry.handle
+
+    def get_or_create(
+        self,
+        key: str,
+        digest: str,
+        create: Callable[[float], Any],
+        delete: Callable[[Any], None],
+    ) -> Optional[Any]:
+        """
+        Handle for (key, digest), calling create(ttl_sec) on a miss. Returns None if
+        creation fails (remembered for one TTL so failing prefixes aren't retried per turn).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.digest == digest and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                result = "hit" if entry.handle is not None else "skipped"
+                LLM_CONTEXT_CACHE.labels(result=result).inc()
+                spans.incr(f"llm.context_cache_{result}")
+                return entry.handle
+            creating = self._creating.get(key)
+            if creating is not None and creating[0] == digest:
+                pending = creating[1]
+            else:
+                pending = None
+                mine: Future = Future()
+                self._creating[key] = (digest, mine)
+        if pending is not None:
+            # Another caller is creating this very prefix: share its handle
+            return pending.result()
+
+        handle = None
+        stale = []
+        try:
+            try:
+                handle = create(self.ttl_sec)
+                LLM_CONTEXT_CACHE.labels(result="created").inc()
+                spans.incr("llm.context_cache_created")
+            except Exception:
+                LLM_CONTEXT_CACHE.labels(result="error").inc()
+                spans.incr("llm.context_cache_error")
+            with self._lock:
+                old = self._entries.get(key)
+                if old is not None and old.handle is not None and old.handle is not handle:
+                    stale.append(old.handle)
+                self._entries[key] = _Entry(digest=digest, handle=handle, expires_at=now + self.ttl_sec - _EXPIRY_MARGIN_SEC)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    if evicted.handle is not None:
+                        stale.append(evicted.handle)
+        finally:
+            with self._lock:
+                if self._creating.get(key, (None, None))[1] is mine:
+                    del self._creating[key]
+            mine.set_result(handle)
+        for h in stale:
+            try:
+                delete(h)
+            except Exception:
+                # Expires on the provider side anyway
+                pass
+        return handle
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_REGISTRY: Optional[ContextCacheRegistry] = None
+_REGISTRY_LOCK = Lock()
+
+
+def get_context_cache() -> ContextCacheRegistry:
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                from config import settings
+
+                _REGISTRY = ContextCacheRegistry(
+                    ttl_sec=settings.llm_context_cache_ttl_sec,
+                    max_entries=settings.llm_context_cache_max_entries,
+                )
+    return _REGISTRY
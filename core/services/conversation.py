@@ -40,6 +40,7 @@ class ConversationService:
         page_size: int = 50,
         cursor: Optional[str] = None,
         newest_first: bool = True,
+        read_preference: Optional[str] = None,
     ) -> Dict[str, Any]:
         if not (1 <= page_size <= 200):
             raise ValueError("page_size must be between 1 and 200")
@@ -59,6 +60,7 @@ class ConversationService:
             cursor=cursor,
             newest_first=newest_first,
             projection=projection,
+            read_preference=read_preference,
         )
 
     def delete_conversation(self, *, user_id: Union[int, str]) -> Dict[str, Any]:
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+import os
+
+import numpy as np
+
+from config import settings
+
+EMBEDDING_BACKENDS = ("sentence_transformers", "onnx")
+
+_SHARED: Dict[str, "Embedder"] = {}
+_SHARED_LOCK = Lock()
+
+
+class Embedder(ABC):
+    """
+    Minimal embedding backend interface used by MemoryService.
+    encode() returns a float32 array of shape (len(texts), dim), L2-normalized.
+    """
+
+    dim: int = 384
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerEmbedder(Embedder):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", *, batch_size: int = 32) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = int(self.model.get_sentence_embedding_dimension() or 384)
+        self.batch_size = batch_size
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vecs = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+class OnnxEmbedder(Embedder):
+    """
+    ONNX Runtime backend (no torch at runtime). Expects a directory produced by
+    export_onnx(): model.onnx (optionally model.int8.onnx) + tokenizer.json.
+    Mean pooling + L2 normalization reproduces all-MiniLM-L6-v2's SentenceTransformer output.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        *,
+        quantized: bool = True,
+        threads: Optional[int] = None,
+        max_length: int = 256,
+        batch_size: int = 32,
+    ) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        d = Path(model_dir)
+        model_path = d / ("model.int8.onnx" if quantized else "model.onnx")
+        if not model_path.exists():
+            raise FileNotFoundError(f"ONNX model not found: {model_path} (run export_onnx first)")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_path), sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(d / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+        self.dim = int(self.session.get_outputs()[0].shape[-1] or 384)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        out: List[np.ndarray] = []
+        for i in range(0, len(texts), self.batch_size):
+            out.append(self._encode_batch(texts[i : i + self.batch_size]))
+        return np.concatenate(out, axis=0)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in enc], dtype=np.int64)
+        attention = np.array([e.attention_mask for e in enc], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+        mask = attention[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def export_onnx(model_name: str, out_dir: str, *, quantize: bool = True) -> Path:
+    """
+    One-off export of a SentenceTransformer's transformer to ONNX (+ int8 dynamic quantization).
+    Needs torch/transformers at export time only. build_embedder() looks in
+    models/{model_name}-onnx unless settings.embedding_onnx_dir is set.
+
+        python -c "from core.services.embedders import export_onnx; export_onnx('all-MiniLM-L6-v2', 'models/all-MiniLM-L6-v2-onnx')"
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    d = Path(out_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    hf_model = st[0].auto_model.eval()
+    hf_tokenizer = st.tokenizer
+    hf_tokenizer.save_pretrained(str(d))
+
+    sample = hf_tokenizer(["export sample"], return_tensors="pt")
+    inputs = (sample["input_ids"], sample["attention_mask"], sample.get("token_type_ids", torch.zeros_like(sample["input_ids"])))
+    dynamic = {"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"}, "token_type_ids": {0: "batch", 1: "seq"}, "last_hidden_state": {0: "batch", 1: "seq"}}
+    torch.onnx.export(
+        hf_model,
+        inputs,
+        str(d / "model.onnx"),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic,
+        opset_version=17,
+    )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(d / "model.onnx"), str(d / "model.int8.onnx"), weight_type=QuantType.QInt8)
+    return d
+
+
+def build_embedder(model_name: str = "all-MiniLM-L6-v2", *, backend: Optional[str] = None) -> Embedder:
+    backend = backend or settings.embedding_backend
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"embedding backend must be one of {EMBEDDING_BACKENDS}")
+    if backend == "onnx":
+        model_dir = settings.embedding_onnx_dir or os.path.join("models", f"{model_name}-onnx")
+        return OnnxEmbedder(
+            model_dir,
+            quantized=settings.embedding_onnx_quantized,
+            threads=settings.embedding_threads,
+        )
+    if settings.embedding_threads:
+        import torch
+
+        torch.set_num_threads(settings.embedding_threads)
+    return SentenceTransformerEmbedder(model_name)
+
+
+def get_shared_embedder(model_name: str = "all-MiniLM-L6-v2") -> Embedder:
+    """
+    One embedder per model per process. Loading it before a pre-fork server forks
+    lets workers share the weights copy-on-write instead of each loading its own.
+    """
+    emb = _SHARED.get(model_name)
+    if emb is None:
+        with _SHARED_LOCK:
+            emb = _SHARED.get(model_name)
+            if emb is None:
+                emb = _SHARED[model_name] = build_embedder(model_name)
+    return emb
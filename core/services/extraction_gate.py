@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import math
+import re
+
+from core.observability.metrics import LTM_GATE_DECISIONS
+from core.search.lexical import fold_diacritics
+from core.services.seed_classifier import SeedCentroidClassifier
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_LAUGH_RE = re.compile(r"^(?:h[aeiou]+|k+|(?:ha|he|hi|hu|ke|kk)+|l+o+l+|x+d+)$")
+
+# Diacritic-folded greetings, acknowledgements and filler words (vi + en)
+FILLER_WORDS = frozenset({
+    "a", "ah", "alo", "anh", "ban", "biet", "buoi", "bye", "cam", "cau", "chao", "chi", "da", "dc", "duoc",
+    "em", "good", "hay", "hello", "hey", "hi", "hmm", "hm", "ha", "ho", "huh", "luon", "minh", "morning",
+    "nha", "nhe", "night", "nhi", "no", "o", "ok", "oke", "okay", "okie", "on", "oi", "roi", "sang", "sao",
+    "tam", "thank", "thanks", "the", "thi", "thx", "tks", "to", "u", "uh", "uhm", "uk", "um", "vang",
+    "vay", "voi", "xin", "ya", "yeah", "yes", "yep", "you",
+})
+
+
+def is_low_value_message(text: str, *, min_chars: int = 8) -> bool:
+    """
+    Cheap check for messages that cannot carry a durable fact: emoji/punctuation only,
+    very short, laughter, or nothing but greetings/acknowledgements ("ok", "dạ vâng", "hihi").
+    """
+    text = (text or "").strip()
+    words = _WORD_RE.findall(fold_diacritics(text.lower()))
+    if not words:
+        return True
+    if len("".join(words)) < min_chars and len(words) <= 2:
+        return True
+    return all(w in FILLER_WORDS or _LAUGH_RE.match(w) for w in words)
+
+
+# Seeds for the embedding classifier: messages that state something durable about the user
+# vs. chatter/requests that never do. Vietnamese first, a few English for mixed traffic.
+FACT_SEEDS = (
+    "Mình tên là Lan, năm nay 24 tuổi",
+    "Tôi đang làm kỹ sư phần mềm ở Hà Nội",
+    "Em là sinh viên năm ba trường Bách Khoa",
+    "Mình bị dị ứng hải sản",
+    "Nhà mình có nuôi một con mèo tên Mướp",
+    "Sở thích của tôi là chạy bộ và đọc sách",
+    "Mình vừa chuyển nhà vào Sài Gòn",
+    "Tôi sinh ra ở Huế",
+    "Mình đang học tiếng Nhật để đi du học",
+    "Bạn gái mình tên là Hoa",
+    "Tôi ăn chay đã ba năm nay",
+    "Mình không thích uống cà phê",
+    "I work as a nurse at a hospital",
+    "My sister lives in Da Nang",
+)
+CHATTER_SEEDS = (
+    "Thời tiết hôm nay thế nào?",
+    "Kể cho mình nghe một câu chuyện cười đi",
+    "Bạn là ai vậy?",
+    "Giải thích giúp mình thuyết tương đối",
+    "Dịch câu này sang tiếng Anh giúp mình",
+    "Viết cho mình một bài thơ về mùa thu",
+    "1 + 1 bằng mấy?",
+    "Ừ đúng rồi, mình hiểu rồi",
+    "Haha buồn cười quá",
+    "Cảm ơn bạn nhiều nha",
+    "Bạn nghĩ sao về chuyện đó?",
+    "Tiếp tục đi",
+    "What is the capital of France?",
+    "Can you summarize this article?",
+)
+
+_QUESTION_RE = re.compile(r"\?\s*$|^(?:ai|gi|sao|tai sao|the nao|bao nhieu|o dau|khi nao|what|why|how|who|when|where)\b")
+# First-person statements as phrases (diacritic-folded): a bare "minh"/"em"/"to"/"toi" is
+# also a name, a form of address, "tới"/"tối" or an English preposition
+_SELF_SUBJECT = r"(?:minh|toi|tui|tao|em|to)"
+_SELF_RE = re.compile(
+    rf"(?:^|[^\w']){_SELF_SUBJECT} (?:la|ten|dang|lam|song|o|co(?! the)|thich|khong|bi|vua|moi|sinh|hoc|nuoi|an|"
+    r"da|se|muon|ghet|yeu|dinh|nam nay|hien|van|rat|hay|sap|chua|tung)\b"
+    rf"|\b(?:cua|nha|vo|chong|me|bo|ban gai|ban trai|nguoi yeu) {_SELF_SUBJECT}\b"
+    r"|\b(?:i(?:'m| am| work| live| have| like| love| hate| was| study| prefer| grew| don't| do not)|my)\b"
+)
+
+
+class GateDecision(NamedTuple):
+    score: float
+    extract: bool
+    reason: str
+
+
+class ExtractionGate:
+    """
+    Local pre-filter in front of the LTM extraction LLM call. score() is a should-extract
+    probability in [0, 1]: 0 for content-free messages (heuristics), otherwise a logistic of
+    the margin between the fact and chatter centroids (shared MiniLM embedder), nudged by
+    cheap rules (first-person statements up, bare questions down).
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.35,
+        min_chars: int = 8,
+        use_embedding: bool = True,
+        temperature: float = 20.0,
+        classifier: Optional[SeedCentroidClassifier] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.use_embedding = use_embedding
+        self.temperature = temperature
+        self.classifier = classifier or SeedCentroidClassifier({"fact": FACT_SEEDS, "chatter": CHATTER_SEEDS})
+        self._lock = Lock()
+        self._counts: Dict[str, int] = {}
+
+    def score(self, text: str) -> Tuple[float, str]:
+        if is_low_value_message(text, min_chars=self.min_chars):
+            return 0.0, "heuristic"
+        folded = fold_diacritics((text or "").strip().lower())
+        score, reason = 0.5, "rules"
+        if self.use_embedding:
+            try:
+                sims = self.classifier.similarities(text)
+                margin = sims["fact"] - sims["chatter"]
+                score, reason = 1.0 / (1.0 + math.exp(-self.temperature * margin)), "embedding"
+            except Exception:
+                pass
+        if _SELF_RE.search(folded):
+            score = min(1.0, score + 0.15)
+        if _QUESTION_RE.search(folded):
+            score *= 0.6
+        return score, reason
+
+    def decide(self, text: str) -> GateDecision:
+        score, reason = self.score(text)
+        extract = score >= self.threshold
+        decision = "sent" if extract else "skipped"
+        LTM_GATE_DECISIONS.labels(decision=decision, reason=reason).inc()
+        with self._lock:
+            self._counts[f"{decision}.{reason}"] = self._counts.get(f"{decision}.{reason}", 0) + 1
+            self._counts[decision] = self._counts.get(decision, 0) + 1
+        return GateDecision(score=score, extract=extract, reason=reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts.get("sent", 0) + counts.get("skipped", 0)
+        return {
+            "threshold": self.threshold,
+            "use_embedding": self.use_embedding,
+            "counts": counts,
+            "skip_rate": round(counts.get("skipped", 0) / total, 4) if total else 0.0,
+        }
+
+
+_GATE: Optional[ExtractionGate] = None
+_GATE_LOCK = Lock()
+
+
+def get_extraction_gate() -> Optional[ExtractionGate]:
+    """
+    Process-wide gate configured from settings; None when settings.ltm_gate_enabled is off.
+    """
+    global _GATE
+    from config import settings
+
+    if not settings.ltm_gate_enabled:
+        return None
+    if _GATE is None:
+        with _GATE_LOCK:
+            if _GATE is None:
+                _GATE = ExtractionGate(
+                    threshold=settings.ltm_gate_threshold,
+                    min_chars=settings.ltm_gate_min_chars,
+                    use_embedding=settings.ltm_gate_use_embedding,
+                )
+    return _GATE
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import NamedTuple, Optional, Sequence, Tuple
+import math
+import re
+
+import numpy as np
+
+from core.observability.metrics import SEARCH_ROUTER_DECISIONS
+from core.search.lexical import fold_diacritics
+from core.services.seed_classifier import SeedCentroidClassifier
+
+# Messages that need fresh or external information vs. ones the assistant answers from
+# the conversation/general knowledge. Kept disjoint from bench/data/search_intent.json.
+SEARCH_SEEDS = (
+    "Giá vàng hôm nay bao nhiêu?",
+    "Tỷ giá đô la hôm nay thế nào",
+    "Kết quả trận Việt Nam gặp Thái Lan tối qua",
+    "Thời tiết Hà Nội ngày mai ra sao",
+    "Tin tức mới nhất về cơn bão",
+    "Tìm giúp mình quán phở ngon ở quận 1",
+    "Lịch chiếu phim ở rạp cuối tuần này",
+    "iPhone mới nhất giá bao nhiêu",
+    "Ai đang là tổng thống Mỹ hiện nay",
+    "Giá xăng tuần này tăng hay giảm",
+    "Lịch thi đấu Ngoại hạng Anh tuần này",
+    "Tra cứu giờ mở cửa của bảo tàng",
+    "Search for the latest Python release",
+    "What's the weather in Saigon today",
+)
+NO_SEARCH_SEEDS = (
+    "Mình buồn quá, không biết làm sao",
+    "Kể chuyện cười cho mình nghe đi",
+    "Giải thích đệ quy là gì",
+    "Viết giúp mình đoạn mở bài nghị luận",
+    "Mình tên là Lan, mình thích mèo",
+    "Bạn có nhớ mình thích ăn gì không?",
+    "Cảm ơn bạn nhiều nha",
+    "Dịch câu này sang tiếng Anh giúp mình",
+    "Làm sao để ngủ ngon hơn",
+    "Mình đang tìm động lực để học tiếp",
+    "Mình tìm thấy chìa khoá rồi",
+    "Sửa giúp mình đoạn code Python này",
+    "Write a short poem about rain",
+    "Tính giúp mình 15% của 200 nghìn",
+)
+
+# Explicit requests to look something up (folded, whole words; "tìm" alone is too ambiguous)
+_EXPLICIT_RE = re.compile(
+    r"\b(?:tim kiem|tra cuu|tra google|search|google|tren mang|tren web|tren internet|look up|lookup)\b"
+)
+# Freshness cues: the answer depends on information newer than the model
+_FRESH_RE = re.compile(
+    r"\b(?:hom nay|hom qua|toi qua|ngay mai|tuan nay|hien nay|hien tai|bay gio|moi nhat|gan day|"
+    r"tin tuc|ty gia|gia vang|gia xang|thoi tiet|ket qua|lich thi dau|latest|today|news|current)\b"
+)
+
+
+class RouteDecision(NamedTuple):
+    search: bool
+    confidence: float
+    reason: str
+
+
+class SearchIntentRouter:
+    """
+    Decides whether a message needs a web search, locally (no external calls).
+    confidence is P(search) in [0, 1]: a logistic of the margin between the search and
+    no-search seed centroids (shared MiniLM embedder), raised by explicit lookup requests
+    and freshness cues. Routes to search only at or above `threshold`.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.6,
+        use_embedding: bool = True,
+        temperature: float = 20.0,
+        classifier: Optional[SeedCentroidClassifier] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.use_embedding = use_embedding
+        self.temperature = temperature
+        self.classifier = classifier or SeedCentroidClassifier({"search": SEARCH_SEEDS, "no_search": NO_SEARCH_SEEDS})
+
+    def confidence(self, text: str, *, vector: Optional[Sequence[float]] = None) -> Tuple[float, str]:
+        folded = fold_diacritics((text or "").lower())
+        score, reason = 0.3, "rules"
+        if self.use_embedding and (text or "").strip():
+            try:
+                vec = np.asarray(vector, dtype=np.float32) if vector is not None else None
+                sims = self.classifier.similarities(text, vector=vec)
+                score = 1.0 / (1.0 + math.exp(-self.temperature * (sims["search"] - sims["no_search"])))
+                reason = "embedding"
+            except Exception:
+                pass
+        if _EXPLICIT_RE.search(folded):
+            score, reason = max(score, 0.9), "explicit"
+        elif _FRESH_RE.search(folded):
+            score = min(1.0, score + 0.3)
+        return score, reason
+
+    def route(self, text: str, *, vector: Optional[Sequence[float]] = None) -> RouteDecision:
+        score, reason = self.confidence(text, vector=vector)
+        decision = RouteDecision(search=score >= self.threshold, confidence=score, reason=reason)
+        SEARCH_ROUTER_DECISIONS.labels(search=str(decision.search).lower(), reason=reason).inc()
+        return decision
+
+
+_ROUTER: Optional[SearchIntentRouter] = None
+_ROUTER_LOCK = Lock()
+
+
+def get_search_router() -> SearchIntentRouter:
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                from config import settings
+
+                _ROUTER = SearchIntentRouter(
+                    threshold=settings.search_router_threshold,
+                    use_embedding=settings.search_router_use_embedding,
+                )
+    return _ROUTER
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, Optional
+import time
+
+from core.observability.metrics import LLM_BREAKER_OPEN
+
+
+class LLMTimeoutError(TimeoutError):
+    """The model did not answer within the task's timeout."""
+
+
+class LLMUnavailableError(RuntimeError):
+    """No model could be tried: the circuit breakers of the primary and fallback are open."""
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies; percentile() is None until min_samples.
+    """
+
+    def __init__(self, *, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._lock = Lock()
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, self.min_samples):
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; while open, allow() is False
+    until `reset_sec` have passed, then one trial call is let through (half-open):
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, *, failure_threshold: int = 5, reset_sec: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_sec = reset_sec
+        self._lock = Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_sec else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_sec or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        LLM_BREAKER_OPEN.labels(target=self.name).set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+        if self._opened_at is not None:
+            LLM_BREAKER_OPEN.labels(target=self.name).set(1)
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_TRACKERS: Dict[str, LatencyTracker] = {}
+_LOCK = Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """One breaker per provider:model, shared by every LLMService in the process."""
+    with _LOCK:
+        if name not in _BREAKERS:
+            from config import settings
+
+            _BREAKERS[name] = CircuitBreaker(
+                name, failure_threshold=settings.llm_breaker_failures, reset_sec=settings.llm_breaker_reset_sec,
+            )
+        return _BREAKERS[name]
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """One tracker per task:provider:model (latency differs a lot between tasks)."""
+    with _LOCK:
+        if name not in _TRACKERS:
+            from config import settings
+
+            _TRACKERS[name] = LatencyTracker(min_samples=settings.llm_hedge_min_samples)
+        return _TRACKERS[name]
@@ -1,34 +1,285 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+from datetime import timedelta
+import time
 
-import google.generativeai as genai
 from langsmith import traceable
 from config import settings
+from core.observability import spans
+from core.observability.metrics import LLM_CALLS, LLM_FALLBACKS, LLM_HEDGED, LLM_TTFB, external_call
+from core.services.context_cache import get_context_cache
+from core.services.llm_resilience import LLMTimeoutError, LLMUnavailableError, get_breaker, get_latency_tracker
+from core.services.prompt_builder import estimate_tokens
+
+LLM_TASKS = ("reply", "extraction", "summarization")
+FALLBACK_PROVIDERS = ("openai", "gemini", "none")
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_OPENAI = None
+_LOCK = Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    # Calls run here so they can be timed out and hedged; a lost/abandoned call finishes in the background
+    global _POOL
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                _POOL = ThreadPoolExecutor(max_workers=settings.llm_max_concurrency, thread_name_prefix="llm")
+    return _POOL
+
+
+def _openai_client():
+    global _OPENAI
+    if _OPENAI is None:
+        with _LOCK:
+            if _OPENAI is None:
+                from openai import OpenAI
+
+                _OPENAI = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url, max_retries=0)
+    return _OPENAI
 
 
 class LLMService:
+    """
+    Gemini chat for one task ("reply", "extraction", "summarization"), each with its own
+    model and timeout from settings. Hedged tasks send a second request once the first
+    outlives the task's observed p95 latency. Failed or timed-out calls, and calls while
+    the primary's circuit breaker is open, go to the fallback provider/model.
+    """
 
-    def __init__(self, *, model: str = "gemini-2.0-flash", temperature: float = 0.2) -> None:
+    def __init__(self, *, task: str = "reply", model: Optional[str] = None, temperature: float = 0.2) -> None:
+        if task not in LLM_TASKS:
+            raise ValueError(f"llm task must be one of {LLM_TASKS}")
         if not settings.google_api_key:
             raise RuntimeError("GOOGLE_API_KEY is not configured in settings")
+        if settings.llm_fallback_provider not in FALLBACK_PROVIDERS:
+            raise ValueError(f"llm fallback provider must be one of {FALLBACK_PROVIDERS}")
+        import google.generativeai as genai
+
         genai.configure(api_key=settings.google_api_key)
-        self.model = model
+        self._genai = genai
+        self.task = task
+        self.model = model or getattr(settings, f"llm_{task}_model")
+        self.timeout_sec = float(getattr(settings, f"llm_{task}_timeout_sec"))
+        self.hedge = task in settings.llm_hedge_tasks
         self.temperature = temperature
 
     @traceable(name="LLMService.chat")
-    def chat(self, *, system_prompt: Optional[str], user_prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
+    def chat(
+        self,
+        *,
+        system_prompt: Optional[str],
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]] = None,
+        prefix: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        cacheable_prefix: Optional[str] = None,
+    ) -> str:
+        """
+        The prompt sent is prefix + user_prompt. With a cache_key, the system prompt and
+        cacheable_prefix (default: prefix) go into a Gemini cached content for that key;
+        once it exists, calls with the same key and prefix send only user_prompt against
+        it. Until then (and on the fallback) prefix + user_prompt is sent uncached while
+        the cache is created in the background.
+        The primary and the fallback share one timeout_sec deadline: the fallback only gets
+        the time the primary left over.
+        Raises LLMTimeoutError when the last model tried timed out or no time is left for the
+        fallback, LLMUnavailableError when no model could be tried because of open circuit breakers.
+        """
+        deadline = time.monotonic() + self.timeout_sec
+        primary = f"gemini:{self.model}"
+        breaker = get_breaker(primary)
+        error: Optional[Exception] = None
+        if breaker.allow():
+            try:
+                text = self._call(
+                    primary,
+                    lambda timeout: self._gemini(
+                        self.model, system_prompt, user_prompt, response_format, prefix, cache_key, timeout, cacheable_prefix,
+                    ),
+                    hedge=self.hedge,
+                    deadline=deadline,
+                )
+                breaker.record_success()
+                return text
+            except Exception as e:
+                breaker.record_failure()
+                error = e
+            reason = "timeout" if isinstance(error, LLMTimeoutError) else "error"
+        else:
+            reason = "breaker_open"
+
+        fallback = self._fallback(system_prompt, (prefix or "") + user_prompt, response_format)
+        if fallback is None:
+            raise error or LLMUnavailableError(f"circuit breaker open for {primary}")
+        target, fn = fallback
+        fb_breaker = get_breaker(target)
+        if not fb_breaker.allow():
+            raise LLMUnavailableError(f"circuit breaker open for fallback {target} ({primary}: {reason})") from error
+        if deadline - time.monotonic() <= 0:
+            raise LLMTimeoutError(f"no time left for fallback {target} ({primary}: {reason})") from error
+        LLM_FALLBACKS.labels(task=self.task, reason=reason).inc()
+        spans.annotate("llm.fallback", f"{target} ({reason})")
+        try:
+            text = self._call(target, fn, hedge=False, deadline=deadline)
+        except Exception:
+            fb_breaker.record_failure()
+            raise
+        fb_breaker.record_success()
+        return text
+
+    def _call(self, target: str, fn: Callable[[float], str], *, hedge: bool, deadline: Optional[float] = None) -> str:
+        """
+        Run fn(timeout) on the LLM pool until deadline (default: self.timeout_sec from now);
+        with hedge, a second fn starts after the p95 delay and the first successful result wins.
+        """
+        tracker = get_latency_tracker(f"{self.task}:{target}")
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout_sec
+        budget = deadline - time.monotonic()
+        started: Dict[Future, float] = {}
+
+        def submit() -> None:
+            remaining = max(0.001, deadline - time.monotonic())
+            started[_pool().submit(copy_context().run, fn, remaining)] = time.monotonic()
+
+        submit()
+        delay = tracker.percentile(settings.llm_hedge_percentile) if hedge else None
+        if delay is not None and delay < budget:
+            done, _ = wait(list(started), timeout=delay)
+            if not done:
+                LLM_HEDGED.labels(task=self.task).inc()
+                spans.incr("llm.hedged")
+                submit()
+
+        pending = set(started)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                if f.exception() is None:
+                    tracker.observe(time.monotonic() - started[f])
+                    LLM_CALLS.labels(task=self.task, target=target, outcome="ok").inc()
+                    return f.result()
+                last_error = f.exception()
+        if pending or last_error is None:
+            LLM_CALLS.labels(task=self.task, target=target, outcome="timeout").inc()
+            raise LLMTimeoutError(f"{target} did not answer within {budget:.1f}s")
+        LLM_CALLS.labels(task=self.task, target=target, outcome="error").inc()
+        raise last_error
+
+    def _fallback(
+        self, system_prompt: Optional[str], prompt: str, response_format: Optional[Dict[str, Any]]
+    ) -> Optional[tuple]:
+        provider, model = settings.llm_fallback_provider, settings.llm_fallback_model
+        if provider == "none" or not model:
+            return None
+        if provider == "gemini":
+            if model == self.model:
+                return None
+            return f"gemini:{model}", lambda timeout: self._gemini(model, system_prompt, prompt, response_format, None, None, timeout)
+        return f"openai:{model}", lambda timeout: self._openai(model, system_prompt, prompt, response_format, timeout)
+
+    def _gemini(
+        self,
+        model_name: str,
+        system_prompt: Optional[str],
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        prefix: Optional[str],
+        cache_key: Optional[str],
+        timeout: float,
+        cacheable_prefix: Optional[str] = None,
+    ) -> str:
         generation_config: Dict[str, Any] = {"temperature": self.temperature}
         # Map OpenAI-like response_format to Gemini JSON responses if requested
         if response_format and response_format.get("type") == "json_object":
             generation_config["response_mime_type"] = "application/json"
 
-        model = genai.GenerativeModel(
-            model_name=self.model,
-            system_instruction=system_prompt or "",
-            generation_config=generation_config,
-        )
-        resp = model.generate_content(user_prompt)
-        return getattr(resp, "text", "") or ""
+        cacheable = cacheable_prefix or prefix
+        cached = self._cached_prefix(model_name, system_prompt, cacheable, cache_key) if cacheable and cache_key else None
+        if cached is not None:
+            model = self._genai.GenerativeModel.from_cached_content(cached_content=cached, generation_config=generation_config)
+        else:
+            model = self._genai.GenerativeModel(
+                model_name=model_name,
+                system_instruction=system_prompt or "",
+                generation_config=generation_config,
+            )
+            user_prompt = (prefix or "") + user_prompt
+        # Stream so time-to-first-chunk is observable; the caller still gets the full text
+        parts: List[str] = []
+        with external_call("gemini", "generate_content"):
+            t0 = time.perf_counter()
+            resp = model.generate_content(user_prompt, stream=True, request_options={"timeout": timeout})
+            for chunk in resp:
+                if not parts:
+                    ttfb = time.perf_counter() - t0
+                    LLM_TTFB.labels(model=model_name).observe(ttfb)
+                    spans.annotate("llm.ttfb_ms", round(ttfb * 1000.0, 2))
+                parts.append(getattr(chunk, "text", "") or "")
+        self._record_usage(resp)
+        return "".join(parts)
+
+    def _openai(
+        self,
+        model_name: str,
+        system_prompt: Optional[str],
+        user_prompt: str,
+        response_format: Optional[Dict[str, Any]],
+        timeout: float,
+    ) -> str:
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": user_prompt})
+        kwargs: Dict[str, Any] = {"model": model_name, "messages": messages, "temperature": self.temperature, "timeout": timeout}
+        if response_format:
+            kwargs["response_format"] = response_format
+        with external_call("openai", "chat_completions"):
+            resp = _openai_client().chat.completions.create(**kwargs)
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            spans.incr("llm.prompt_token_count", int(getattr(usage, "prompt_tokens", 0) or 0))
+            spans.incr("llm.candidates_token_count", int(getattr(usage, "completion_tokens", 0) or 0))
+        return resp.choices[0].message.content or ""
+
+    def _cached_prefix(self, model_name: str, system_prompt: Optional[str], prefix: str, cache_key: str) -> Optional[Any]:
+        if not settings.llm_context_cache_enabled:
+            return None
+        if estimate_tokens(system_prompt) + estimate_tokens(prefix) < settings.llm_context_cache_min_tokens:
+            return None
+
+        registry = get_context_cache()
+        key, digest = f"{model_name}:{cache_key}", registry.digest(system_prompt, prefix)
+        handle = registry.get(key, digest)
+        if handle is not None:
+            return handle
+
+        def create(ttl_sec: float) -> Any:
+            with external_call("gemini", "create_cached_content"):
+                return self._genai.caching.CachedContent.create(
+                    model=model_name,
+                    system_instruction=system_prompt or None,
+                    contents=[prefix],
+                    ttl=timedelta(seconds=ttl_sec),
+                )
 
+        # Off the request path: this turn goes out uncached, the next one finds the handle
+        _pool().submit(registry.get_or_create, key, digest, create, lambda h: h.delete())
+        return None
 
+    @staticmethod
+    def _record_usage(resp: Any) -> None:
+        usage = getattr(resp, "usage_metadata", None)
+        if usage is None:
+            return
+        for field in ("prompt_token_count", "candidates_token_count", "cached_content_token_count"):
+            n = getattr(usage, field, None)
+            if n:
+                spans.incr(f"llm.{field}", int(n))
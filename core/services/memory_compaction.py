@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timezone
+import heapq
+import math
+
+from config import settings
+from core.observability.metrics import LTM_EVICTED
+from core.repositories.long_term_memory import LongTermMemoryRepo
+from core.repositories.vector_memory import QdrantVectorRepo
+from core.services.summary_service import as_utc_naive
+
+
+def importance(
+    doc: Dict[str, Any],
+    *,
+    now: datetime,
+    half_life_days: float = 30.0,
+    default_confidence: float = 0.5,
+) -> float:
+    """
+    confidence x recency x frequency. Recency halves every half_life_days since the
+    memory was last retrieved (or created); frequency is 1 + ln(1 + hits).
+    """
+    conf = doc.get("confidence")
+    conf = default_confidence if conf is None else float(conf)
+    last = as_utc_naive(doc.get("last_accessed_at")) or as_utc_naive(doc.get("created_at"))
+    age_days = max(0.0, (now - last).total_seconds() / 86400.0) if last is not None else 0.0
+    recency = 0.5 ** (age_days / half_life_days) if half_life_days > 0 else 1.0
+    frequency = 1.0 + math.log1p(max(0, int(doc.get("hits") or 0)))
+    return conf * recency * frequency
+
+
+class MemoryCompactor:
+    """
+    Keeps every user at or under `capacity` long-term memories by evicting the lowest
+    importance() scores from Mongo, the BM25 stats and Qdrant.
+    """
+
+    def __init__(
+        self,
+        *,
+        repo: Optional[LongTermMemoryRepo] = None,
+        vectors: Optional[QdrantVectorRepo] = None,
+        capacity: Optional[int] = None,
+        half_life_days: Optional[float] = None,
+        default_confidence: Optional[float] = None,
+    ) -> None:
+        self.repo = repo or LongTermMemoryRepo()
+        self._vectors = vectors
+        self.capacity = settings.ltm_max_memories_per_user if capacity is None else capacity
+        self.half_life_days = settings.ltm_recency_half_life_days if half_life_days is None else half_life_days
+        self.default_confidence = settings.ltm_default_confidence if default_confidence is None else default_confidence
+
+    @property
+    def vectors(self) -> Optional[QdrantVectorRepo]:
+        if self._vectors is None and settings.qdrant_url:
+            try:
+                self._vectors = QdrantVectorRepo()
+            except Exception:
+                self._vectors = None
+        return self._vectors
+
+    def select_evictions(self, user_id: Union[int, str], *, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        The user's memories beyond capacity, lowest score first. Only scoring fields are read.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        # Min-heap of the `capacity` best (score, seq) seen so far; whatever falls out is evicted
+        keep: List[tuple] = []
+        evict: List[tuple] = []
+        for seq, doc in enumerate(self.repo.iter_scoring_fields(user_id=user_id)):
+            item = (
+                importance(doc, now=now, half_life_days=self.half_life_days, default_confidence=self.default_confidence),
+                seq,
+                doc,
+            )
+            if len(keep) < self.capacity:
+                heapq.heappush(keep, item)
+            elif item[:2] > keep[0][:2]:
+                evict.append(heapq.heapreplace(keep, item))
+            else:
+                evict.append(item)
+        evict.sort(key=lambda x: x[:2])
+        return [doc for _, _, doc in evict]
+
+    def compact_user(self, user_id: Union[int, str]) -> int:
+        victims = self.select_evictions(user_id)
+        if not victims:
+            return 0
+        deleted = self.repo.delete_memories(user_id=user_id, docs=victims)
+        if self.vectors is not None:
+            # Qdrant keeps one point per (user, text); drop it only once no Mongo doc has that text
+            try:
+                texts = {d.get("content") or "" for d in victims}
+                texts -= self.repo.contents_in_use(user_id=user_id, contents=list(texts))
+                self.vectors.delete_memories(user_id=user_id, texts=sorted(texts))
+            except Exception:
+                pass
+        LTM_EVICTED.inc(deleted)
+        return deleted
+
+    def run_once(self) -> Dict[str, int]:
+        users = evicted = 0
+        for user_id, _ in self.repo.users_over_capacity(capacity=self.capacity):
+            try:
+                evicted += self.compact_user(user_id)
+                users += 1
+            except Exception as e:
+                print(f"[ltm_compaction] user_id={user_id} failed: {e}")
+        return {"users": users, "evicted": evicted}
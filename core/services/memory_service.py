@@ -1,32 +1,129 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
 import json
+import time
 
-from sentence_transformers import SentenceTransformer
-
+from core.observability import spans
+from core.observability.metrics import EMBED_BATCH_SIZE, EMBED_LATENCY, timed
+from core.services.embedders import Embedder, get_shared_embedder
 from core.services.llm_service import LLMService
 
 from core.repositories.long_term_memory import LongTermMemoryRepo
 from core.repositories.vector_memory import QdrantVectorRepo
+from core.search.fusion import reciprocal_rank_fusion
+from config import settings
+
+RETRIEVAL_STRATEGIES = ("qdrant", "mongo", "hybrid")
+
+
+@dataclass
+class RetrievalResult:
+    docs: List[Dict[str, Any]]
+    served_by: Optional[str] = None
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    hits: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: Optional[str] = None
+
+    def as_detail(self) -> Dict[str, Any]:
+        return {
+            "served_by": self.served_by,
+            "timings_ms": self.timings_ms,
+            "hits": self.hits,
+            "errors": self.errors,
+            "skipped": self.skipped,
+        }
+
+
+class _ExpiringKeys:
+    """
+    Keys that expire ttl_sec after being added, LRU-bounded to max_entries; thread-safe.
+    """
+
+    def __init__(self, *, ttl_sec: float, max_entries: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self._lock = Lock()
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            deadline = self._until.get(key)
+            if deadline is None:
+                return False
+            if deadline < time.monotonic():
+                self._until.pop(key, None)
+                return False
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._until)
+
+    def add(self, key: str) -> None:
+        if self.ttl_sec <= 0:
+            return
+        with self._lock:
+            self._until[key] = time.monotonic() + self.ttl_sec
+            self._until.move_to_end(key)
+            while len(self._until) > self.max_entries:
+                self._until.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._until.pop(key, None)
 
 
 class MemoryService:
 
-    def __init__(self, *, model_name: str = "all-MiniLM-L6-v2", repo: Optional[LongTermMemoryRepo] = None, llm: Optional[LLMService] = None) -> None:
-        self._embedder = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        *,
+        model_name: str = "all-MiniLM-L6-v2",
+        repo: Optional[LongTermMemoryRepo] = None,
+        llm: Optional[LLMService] = None,
+        strategy: Optional[str] = None,
+        lexical_fusion: Optional[bool] = None,
+        embedder: Optional[Embedder] = None,
+    ) -> None:
+        self._embedder = embedder or get_shared_embedder(model_name)
         self._repo = repo or LongTermMemoryRepo()
-        self._llm = llm or LLMService()
+        self._llm = llm or LLMService(task="extraction")
         self._vec: Optional[QdrantVectorRepo] = None
         try:
             # Optional vector repo
             self._vec = QdrantVectorRepo()
         except Exception:
             self._vec = None
+        self.strategy = strategy or settings.ltm_retrieval_strategy
+        if self.strategy not in RETRIEVAL_STRATEGIES:
+            raise ValueError(f"ltm retrieval strategy must be one of {RETRIEVAL_STRATEGIES}")
+        if self.strategy == "qdrant" and self._vec is None:
+            raise RuntimeError("ltm retrieval strategy 'qdrant' requires QDRANT_URL")
+        self.lexical_fusion = settings.ltm_lexical_fusion if lexical_fusion is None else lexical_fusion
+        # Users known to have no memories (until the TTL runs out)
+        self._known_empty = _ExpiringKeys(
+            ttl_sec=settings.ltm_negative_cache_ttl_sec, max_entries=settings.ltm_negative_cache_max_users,
+        )
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = Lock()
+        self._write_pool: Optional[ThreadPoolExecutor] = None
 
     def embed_text(self, text: str) -> List[float]:
-        vec = self._embedder.encode(text, normalize_embeddings=False)
-        return [float(x) for x in vec.tolist()]
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        EMBED_BATCH_SIZE.observe(len(texts))
+        with timed(EMBED_LATENCY), spans.span("embedding.encode", batch=len(texts)):
+            vecs = self._embedder.encode(texts)
+        return [[float(x) for x in v] for v in vecs.tolist()]
 
     def add_long_term_memory(self, *, user_id: Union[int, str], content: str, source: str = "extracted", embed: bool = True) -> str:
         try:
@@ -39,34 +136,216 @@ class MemoryService:
                 self._vec.upsert_memory(user_id=user_id, text=content, embedding=embedding)
             except Exception:
                 pass
+        self._forget_empty(user_id)
         return self._repo.add_memory(user_id=user_id, content=content, embedding=embedding, source=source)
 
-    def search_long_term_memory(self, *, user_id: Union[int, str], query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        q_emb = self.embed_text(query)
+    def add_long_term_memories(
+        self,
+        *,
+        user_id: Union[int, str],
+        contents: List[str],
+        source: str = "extracted",
+        metadata: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched add_long_term_memory: one encode() for all facts, then the Mongo bulk insert
+        and the Qdrant batch upsert run concurrently. `metadata` is the per-fact
+        {"category", "confidence"}. Returns one {"content", "ok", "error"} per fact;
+        `ok` reflects Mongo (the source of truth), Qdrant stays best-effort.
+        """
+        if not contents:
+            return []
+        try:
+            embeddings = self.embed_texts(contents)
+        except Exception:
+            # Fallback: persist without embeddings to not lose the memories
+            embeddings = [[] for _ in contents]
+        vec_future = None
         if self._vec:
+            vec_future = self._submit_write(
+                self._vec.upsert_memories, user_id=user_id, texts=contents, embeddings=embeddings, payloads=metadata,
+            )
+        try:
+            errors = self._repo.add_memories(
+                user_id=user_id, items=list(zip(contents, embeddings)), source=source, metadata=metadata,
+            )
+        except Exception as e:
+            errors = [f"{type(e).__name__}: {e}"] * len(contents)
+        if vec_future is not None:
             try:
-                vec_hits = self._vec.search(user_id=user_id, query_embedding=q_emb, top_k=top_k)
-                # Map to legacy doc format
-                docs = [
-                    {"user_id": user_id, "content": hit.get("text"), "score": hit.get("score")}
-                    for hit in (vec_hits or [])
-                    if (hit.get("text") or "").strip()
-                ]
-                if docs:
-                    return docs
+                vec_future.result()
             except Exception:
                 pass
-        return self._repo.search_similar(user_id=user_id, query_embedding=q_emb, top_k=top_k)
+        self._forget_empty(user_id)
+        return [{"content": c, "ok": err is None, "error": err} for c, err in zip(contents, errors)]
+
+    def _submit_write(self, fn, **kwargs):
+        # Small shared pool for writes that run beside (or after) the caller's work
+        if self._write_pool is None:
+            with self._stats_lock:
+                if self._write_pool is None:
+                    self._write_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ltm-write")
+        return self._write_pool.submit(fn, **kwargs)
+
+    def search_long_term_memory(self, *, user_id: Union[int, str], query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.retrieve_long_term_memory(user_id=user_id, query=query, top_k=top_k).docs
+
+    def retrieve_long_term_memory(
+        self,
+        *,
+        user_id: Union[int, str],
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+    ) -> RetrievalResult:
+        """
+        Run the configured retrieval strategy and report which backend served the request.
+        - qdrant: vector search only
+        - mongo:  Atlas $vectorSearch, or streamed cosine over the user's Mongo memories
+        - hybrid: qdrant first; mongo only if qdrant is unavailable/empty and the user
+                  is not cached as having no memories at all
+        Pass query_embedding when the query was already embedded (e.g. batched by the caller).
+        Returned memories get a retrieval hit (ltm_track_hits), which compaction uses.
+        """
+        result = self._retrieve(user_id=user_id, query=query, top_k=top_k, query_embedding=query_embedding)
+        if result.docs and settings.ltm_track_hits:
+            self._submit_write(self._repo.record_hits, user_id=user_id, contents=[d.get("content") or "" for d in result.docs])
+        return result
+
+    def _retrieve(
+        self,
+        *,
+        user_id: Union[int, str],
+        query: str,
+        top_k: int,
+        query_embedding: Optional[List[float]],
+    ) -> RetrievalResult:
+        result = RetrievalResult(docs=[])
+        if self._is_known_empty(user_id):
+            result.skipped = "known_empty"
+            spans.incr("cache.ltm_known_empty_hit")
+            return result
+
+        q_emb = query_embedding if query_embedding is not None else self.embed_text(query)
+        # With fusion enabled, over-fetch vector candidates so RRF has something to re-rank
+        n_vec = top_k * max(1, settings.ltm_fusion_candidates) if self.lexical_fusion else top_k
+        vec_docs: List[Dict[str, Any]] = []
+        use_qdrant = self._vec is not None and self.strategy in ("qdrant", "hybrid")
+        if use_qdrant:
+            vec_docs = self._run_backend(result, "qdrant", lambda: self._search_qdrant(user_id, q_emb, n_vec))
+            if vec_docs:
+                result.served_by = "qdrant"
+        if not vec_docs and self.strategy != "qdrant":
+            vec_docs = self._run_backend(result, "mongo", lambda: self._repo.search_similar(user_id=user_id, query_embedding=q_emb, top_k=n_vec))
+            if vec_docs:
+                result.served_by = "mongo"
+            elif "mongo" not in result.errors:
+                # Mongo is the source of truth: nothing there means nothing anywhere
+                self._mark_empty(user_id)
+                return result
+
+        if not self.lexical_fusion or not vec_docs:
+            result.docs = vec_docs[:top_k]
+            return result
+        lex_docs = self._run_backend(result, "lexical", lambda: self._repo.search_lexical(user_id=user_id, query=query, top_k=n_vec))
+        if not lex_docs:
+            result.docs = vec_docs[:top_k]
+            return result
+        result.docs = self._fuse(vec_docs, lex_docs, top_k)
+        result.served_by = f"{result.served_by}+lexical"
+        return result
+
+    @staticmethod
+    def _fuse(vec_docs: List[Dict[str, Any]], lex_docs: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        # Memory content is the only key shared by Qdrant payloads and Mongo docs
+        by_content: Dict[str, Dict[str, Any]] = {}
+        for d in lex_docs + vec_docs:
+            by_content.setdefault((d.get("content") or "").strip(), d)
+        fused = reciprocal_rank_fusion(
+            [
+                [(d.get("content") or "").strip() for d in vec_docs],
+                [(d.get("content") or "").strip() for d in lex_docs],
+            ],
+            k=settings.ltm_rrf_k,
+        )
+        out: List[Dict[str, Any]] = []
+        for content, score in fused[:top_k]:
+            d = dict(by_content[content])
+            d.pop("embedding", None)
+            d["rrf_score"] = score
+            out.append(d)
+        return out
+
+    def _search_qdrant(self, user_id: Union[int, str], q_emb: List[float], top_k: int) -> List[Dict[str, Any]]:
+        vec_hits = self._vec.search(user_id=user_id, query_embedding=q_emb, top_k=top_k)
+        # Map to legacy doc format
+        return [
+            {"user_id": user_id, "content": hit.get("text"), "score": hit.get("score")}
+            for hit in (vec_hits or [])
+            if (hit.get("text") or "").strip()
+        ]
+
+    def _run_backend(self, result: RetrievalResult, backend: str, fn) -> List[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        docs: List[Dict[str, Any]] = []
+        error: Optional[str] = None
+        try:
+            docs = fn() or []
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            result.errors[backend] = error
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        result.timings_ms[backend] = round(elapsed_ms, 2)
+        result.hits[backend] = len(docs)
+        with self._stats_lock:
+            st = self._stats.setdefault(backend, {"calls": 0, "hits": 0, "empty": 0, "errors": 0, "total_ms": 0.0})
+            st["calls"] += 1
+            st["hits"] += len(docs)
+            st["empty"] += 0 if docs or error else 1
+            st["errors"] += 1 if error else 0
+            st["total_ms"] += elapsed_ms
+        return docs
+
+    def vector_backend(self) -> str:
+        return self._repo.detect_vector_backend()
+
+    def retrieval_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._stats_lock:
+            out = {k: dict(v) for k, v in self._stats.items()}
+        for st in out.values():
+            st["avg_ms"] = round(st["total_ms"] / st["calls"], 2) if st["calls"] else 0.0
+        return {
+            "strategy": self.strategy,
+            "mongo_vector_backend": self.vector_backend(),
+            "backends": out,
+            "known_empty_users": len(self._known_empty),
+        }
+
+    def _is_known_empty(self, user_id: Union[int, str]) -> bool:
+        return str(user_id) in self._known_empty
+
+    def _mark_empty(self, user_id: Union[int, str]) -> None:
+        self._known_empty.add(str(user_id))
+
+    def _forget_empty(self, user_id: Union[int, str]) -> None:
+        self._known_empty.discard(str(user_id))
 
     def list_long_term_memory(self, *, user_id: Union[int, str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
         return self._repo.list_by_user(user_id=user_id, limit=limit)
 
-    def extract_long_term_facts(self, *, message: str) -> List[str]:
+    def extract_long_term_facts(self, *, message: str, raise_on_llm_error: bool = False) -> List[str]:
+        return [f["text"] for f in self.extract_long_term_fact_items(message=message, raise_on_llm_error=raise_on_llm_error)]
+
+    def extract_long_term_fact_items(self, *, message: str, raise_on_llm_error: bool = False) -> List[Dict[str, Any]]:
         """
         Ask the LLM to extract atomic long-term facts from a free-form message.
         The LLM must return a strict JSON object:
           { "facts": [ { "text": str, "category": str, "confidence": float } ] }
         We accept any category, keep unique non-empty texts, and ignore parsing errors gracefully.
+        Returns {"text", "category", "confidence"} items; a missing/invalid confidence is
+        None and a category is a short snake_case label or None.
+        With raise_on_llm_error, a failed LLM call raises instead of returning [] so
+        queue consumers can retry/dead-letter it.
         """
 
         prompt = f"""
@@ -83,9 +362,14 @@ Nội dung:
 {message}
 """
 
-        facts: List[str] = []
+        facts: List[Dict[str, Any]] = []
         try:
             raw = self._llm.chat(system_prompt=None, user_prompt=prompt, response_format={"type": "json_object"})
+        except Exception:
+            if raise_on_llm_error:
+                raise
+            return facts
+        try:
             data = json.loads(raw)
             items = data.get("facts") or []
             seen = set()
@@ -93,7 +377,11 @@ Nội dung:
                 text = str((it or {}).get("text", "")).strip()
                 if 3 <= len(text) <= 200 and text not in seen:
                     seen.add(text)
-                    facts.append(text)
+                    facts.append({
+                        "text": text,
+                        "category": _clean_category(it.get("category")),
+                        "confidence": _clean_confidence(it.get("confidence")),
+                    })
         except Exception:
             # If the model didn't return valid JSON, do not guess; return empty for safety
             pass
@@ -104,3 +392,33 @@ Nội dung:
         return self._repo.delete_by_user(user_id=user_id)
 
 
+def _clean_category(value: Any) -> Optional[str]:
+    text = str(value or "").strip().lower().replace(" ", "_")
+    return text[:40] or None
+
+
+def _clean_confidence(value: Any) -> Optional[float]:
+    try:
+        conf = float(value)
+    except (TypeError, ValueError):
+        return None
+    if conf != conf:  # NaN
+        return None
+    return min(1.0, max(0.0, conf))
+
+
+_MEMORY_SERVICE: Optional[MemoryService] = None
+_MEMORY_SERVICE_LOCK = Lock()
+
+
+def get_memory_service() -> MemoryService:
+    """
+    Process-wide MemoryService, created on first use so importing this module stays cheap
+    and the agent graph and the extraction tool share one embedding model.
+    """
+    global _MEMORY_SERVICE
+    if _MEMORY_SERVICE is None:
+        with _MEMORY_SERVICE_LOCK:
+            if _MEMORY_SERVICE is None:
+                _MEMORY_SERVICE = MemoryService()
+    return _MEMORY_SERVICE
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import math
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Cheap tokenizer estimate (~4 chars/token, but never fewer tokens than words).
+    Good enough for budgeting without loading a real tokenizer.
+    """
+    if not text:
+        return 0
+    by_chars = math.ceil(len(text) / 4)
+    by_words = len(text.split())
+    return max(by_chars, by_words)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Shrink by characters until the estimate fits, keep the head of the text
+    cut = max(0, max_tokens * 4 - 1)
+    out = text[:cut]
+    while out and estimate_tokens(out + " …") > max_tokens:
+        out = out[: int(len(out) * 0.9)]
+    return (out.rstrip() + " …") if out else ""
+
+
+@dataclass
+class PromptBudget:
+    total: int = 3000
+    system: int = 200
+    summary: int = 400
+    profile: int = 300
+    long_term: int = 600
+    history: int = 1800
+    search: int = 400
+    max_turn: int = 300
+    # Provider minimum for cached content (0 = no caching). When the profile facts can
+    # grow the stable prefix to it (up to cached_profile tokens), that wider prefix is also
+    # returned as cacheable_prefix; it only reaches the model through a cache handle, so
+    # only the regular prefix is charged to `total`
+    cache_min: int = 0
+    cached_profile: int = 6000
+
+
+@dataclass
+class BuiltPrompt:
+    system_prompt: str
+    user_prompt: str
+    tokens: Dict[str, int] = field(default_factory=dict)
+    dropped_turns: int = 0
+    # user_prompt == prefix + suffix; prefix only changes when the summary or profile facts do
+    prefix: str = ""
+    suffix: str = ""
+    # Wider stable prefix (more profile facts) big enough for provider caching, or ""
+    cacheable_prefix: str = ""
+
+
+class PromptBuilder:
+    """
+    Assemble the respond() prompt under a token budget.
+    Sections are filled in priority order (system, user, summary, profile, long-term, search, history);
+    the user's message is never cut (ChatRequest caps its length), only the context around it.
+    history keeps the newest turns and drops/truncates the oldest first.
+    The user prompt is laid out as a stable per-user prefix (summary, profile facts) followed
+    by the per-turn suffix (query-relevant memories, history, search results, message), so
+    consecutive turns share a prefix the provider can cache. With budget.cache_min set, a
+    wider cacheable_prefix with more profile facts is built to reach the provider minimum.
+    """
+
+    def __init__(self, budget: Optional[PromptBudget] = None) -> None:
+        self.budget = budget or PromptBudget()
+
+    def build(
+        self,
+        *,
+        system: str,
+        user_message: str,
+        summary: Optional[str] = None,
+        profile: Optional[List[str]] = None,
+        long_term: Optional[List[str]] = None,
+        history: Optional[List[Dict[str, Any]]] = None,
+        search_results: Optional[List[Dict[str, Any]]] = None,
+    ) -> BuiltPrompt:
+        b = self.budget
+        tokens: Dict[str, int] = {}
+
+        system = truncate_to_tokens(system, b.system)
+        tokens["system"] = estimate_tokens(system)
+        user_message = user_message or ""
+        tokens["user"] = estimate_tokens(user_message)
+        remaining = max(0, b.total - tokens["system"] - tokens["user"])
+
+        summary_text = truncate_to_tokens((summary or "").strip(), min(b.summary, remaining))
+        summary_block = ("Conversation summary:\n" + summary_text) if summary_text else ""
+        tokens["summary"] = estimate_tokens(summary_block)
+        remaining = max(0, remaining - tokens["summary"])
+
+        profile_lines = self._fill_lines(list(profile or []), min(b.profile, remaining), b.max_turn)
+        profile_block = self._profile_block(profile_lines)
+        tokens["profile"] = estimate_tokens(profile_block)
+        remaining = max(0, remaining - tokens["profile"])
+        cacheable = ""
+        if b.cache_min > 0:
+            wide = self._prefix(summary_block, self._profile_block(self._fill_lines(list(profile or []), b.cached_profile, b.max_turn)))
+            if tokens["system"] + estimate_tokens(wide) >= b.cache_min:
+                cacheable = wide
+
+        # Only facts that made it into the regular prefix are left out of the long-term block
+        in_profile = {line.strip() for line in profile_lines}
+        relevant = [f for f in long_term or [] if f.strip() not in in_profile]
+        ltm_lines = self._fill_lines(relevant, min(b.long_term, remaining), b.max_turn)
+        ltm_block = ("Long-term memory:\n" + "\n".join(ltm_lines)) if ltm_lines else ""
+        tokens["long_term"] = estimate_tokens(ltm_block)
+        remaining = max(0, remaining - tokens["long_term"])
+
+        search_lines = [f"- {r.get('title','')} {r.get('url','')}".rstrip() for r in (search_results or [])]
+        search_lines = self._fill_lines(search_lines, min(b.search, remaining), b.max_turn)
+        search_block = ("Web search results:\n" + "\n".join(search_lines)) if search_lines else ""
+        tokens["search"] = estimate_tokens(search_block)
+        remaining = max(0, remaining - tokens["search"])
+
+        history_block, dropped = self._fill_history(list(history or []), min(b.history, remaining))
+        tokens["history"] = estimate_tokens(history_block)
+
+        volatile = [p for p in (ltm_block, history_block, search_block) if p]
+        prefix = self._prefix(summary_block, profile_block)
+        suffix = "".join(p + "\n\n" for p in volatile) + f"User: {user_message}\nAssistant:"
+        user_prompt = prefix + suffix
+        tokens["prefix"] = estimate_tokens(prefix)
+        tokens["cacheable_prefix"] = estimate_tokens(cacheable)
+        tokens["total"] = tokens["system"] + estimate_tokens(user_prompt)
+        return BuiltPrompt(
+            system_prompt=system, user_prompt=user_prompt, tokens=tokens, dropped_turns=dropped, prefix=prefix, suffix=suffix,
+            cacheable_prefix=cacheable,
+        )
+
+    @staticmethod
+    def _profile_block(lines: List[str]) -> str:
+        return ("Known facts about the user:\n" + "\n".join(lines)) if lines else ""
+
+    @staticmethod
+    def _prefix(*blocks: str) -> str:
+        return "Context (may be partial):\n" + "".join(p + "\n\n" for p in blocks if p)
+
+    @staticmethod
+    def _fill_lines(lines: List[str], budget: int, max_line: int) -> List[str]:
+        out: List[str] = []
+        used = 0
+        for line in lines:
+            line = truncate_to_tokens(line, max_line)
+            cost = estimate_tokens(line) + 1
+            if not line or used + cost > budget:
+                break
+            out.append(line)
+            used += cost
+        return out
+
+    def _fill_history(self, history: List[Dict[str, Any]], budget: int) -> tuple[str, int]:
+        # Walk newest -> oldest so the oldest turns are the ones that get dropped
+        kept: List[str] = []
+        costs: List[int] = []
+        used = estimate_tokens("Recent conversation:") + 1
+        for m in reversed(history):
+            line = f"{m.get('role', '')}: {m.get('content', '')}"
+            line = truncate_to_tokens(line, self.budget.max_turn)
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.append(line)
+            costs.append(cost)
+            used += cost
+        if len(kept) < len(history):
+            # The omitted-turns line is part of the block too: give up turns until it fits
+            while kept and used + estimate_tokens(self._omitted(len(history) - len(kept))) + 1 > budget:
+                kept.pop()
+                used -= costs.pop()
+        if not kept:
+            return "", len(history)
+        dropped = len(history) - len(kept)
+        kept.reverse()
+        if dropped:
+            kept.insert(0, self._omitted(dropped))
+        return "Recent conversation:\n" + "\n".join(kept), dropped
+
+    @staticmethod
+    def _omitted(n: int) -> str:
+        return f"({n} earlier turn(s) omitted)"
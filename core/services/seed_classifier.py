@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from core.services.embedders import Embedder, get_shared_embedder
+
+
+class SeedCentroidClassifier:
+    """
+    Nearest-centroid classifier over sentence embeddings of a few seed examples per label.
+    Uses the process-wide embedder, so it adds no model load; seed vectors are encoded once
+    on first use. similarities() returns the cosine similarity to each label's centroid.
+    """
+
+    def __init__(self, seeds: Mapping[str, Sequence[str]], *, embedder: Optional[Embedder] = None) -> None:
+        if not seeds or any(not examples for examples in seeds.values()):
+            raise ValueError("every label needs at least one seed example")
+        self.seeds = {label: list(examples) for label, examples in seeds.items()}
+        self.labels = list(self.seeds)
+        self._embedder = embedder
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = Lock()
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = get_shared_embedder()
+        return self._embedder
+
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    rows = []
+                    for label in self.labels:
+                        c = np.asarray(self.embedder.encode(self.seeds[label]), dtype=np.float32).mean(axis=0)
+                        rows.append(c / max(float(np.linalg.norm(c)), 1e-12))
+                    self._centroids = np.stack(rows)
+        return self._centroids
+
+    def similarities(self, text: str, *, vector: Optional[np.ndarray] = None) -> Dict[str, float]:
+        if vector is None:
+            vector = np.asarray(self.embedder.encode([text]), dtype=np.float32)[0]
+        sims = self.centroids() @ vector
+        return {label: float(s) for label, s in zip(self.labels, sims)}
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timezone
+
+from langsmith import traceable
+
+from config import settings
+from core.repositories.conversation import ConversationRepo
+from core.repositories.conversation_summary import ConversationSummaryRepo
+from core.repositories.long_term_memory import LongTermMemoryRepo
+from core.services.llm_service import LLMService
+
+
+def as_utc_naive(value: Any) -> Optional[datetime]:
+    """
+    Mongo returns naive UTC datetimes, the Kafka writer stores ISO strings; compare both safely.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def profile_fact_limit() -> int:
+    """How many memories go into the stable prompt prefix."""
+    if settings.prompt_profile_facts <= 0:
+        return 0
+    if settings.llm_context_cache_enabled:
+        return max(settings.prompt_profile_facts, settings.prompt_profile_facts_cached)
+    return settings.prompt_profile_facts
+
+
+class SummaryService:
+    """
+    Maintains a per-user rolling summary of the conversation.
+    The newest `keep_recent` messages are never summarized (they are sent verbatim);
+    the summary is folded forward once at least `every_n` older messages are pending.
+    Each fold also snapshots the user's newest memories as `profile`, so the stable prompt
+    prefix only changes when the summary does.
+    """
+
+    def __init__(
+        self,
+        *,
+        repo: Optional[ConversationSummaryRepo] = None,
+        conversation_repo: Optional[ConversationRepo] = None,
+        llm: Optional[LLMService] = None,
+        ltm_repo: Optional[LongTermMemoryRepo] = None,
+        every_n: Optional[int] = None,
+        keep_recent: Optional[int] = None,
+    ) -> None:
+        self.repo = repo or ConversationSummaryRepo()
+        self.conv_repo = conversation_repo or ConversationRepo()
+        self._llm = llm
+        self._ltm_repo = ltm_repo
+        self.every_n = every_n or settings.summary_every_n_messages
+        self.keep_recent = settings.summary_keep_recent if keep_recent is None else keep_recent
+
+    @property
+    def llm(self) -> LLMService:
+        if self._llm is None:
+            self._llm = LLMService(task="summarization")
+        return self._llm
+
+    @property
+    def ltm_repo(self) -> LongTermMemoryRepo:
+        if self._ltm_repo is None:
+            self._ltm_repo = LongTermMemoryRepo()
+        return self._ltm_repo
+
+    def get_summary(self, *, user_id: Union[int, str]) -> Optional[Dict[str, Any]]:
+        return self.repo.get(user_id=user_id)
+
+    def delete_summary(self, *, user_id: Union[int, str]) -> int:
+        return self.repo.delete_by_user(user_id=user_id)
+
+    @traceable(name="SummaryService.maybe_update")
+    def maybe_update(self, *, user_id: Union[int, str]) -> Optional[str]:
+        """
+        Fold pending messages into the summary if enough accumulated. Returns the new summary or None.
+        """
+        doc = self.repo.get(user_id=user_id) or {}
+        # Count first: the unsummarized messages are only read once a fold is due
+        unsummarized = self.conv_repo.count_after(user_id=user_id, cursor=doc.get("cursor"), limit=200 + self.keep_recent)
+        due = min(200, unsummarized - self.keep_recent)
+        if due < self.every_n:
+            return None
+        page = self.conv_repo.get_conversation(
+            user_id=user_id,
+            page_size=due,
+            cursor=doc.get("cursor"),
+            newest_first=False,
+        )
+        pending: List[Dict[str, Any]] = page["items"][:due]
+        if not pending:
+            return None
+
+        summary = self._summarize(previous=doc.get("summary") or "", messages=pending)
+        last = pending[-1]
+        self.repo.upsert(
+            user_id=user_id,
+            summary=summary,
+            cursor=ConversationRepo.cursor_for(last),
+            last_created_at=as_utc_naive(last.get("created_at")),
+            message_count=int(doc.get("message_count") or 0) + len(pending),
+            profile=self._profile_snapshot(user_id),
+        )
+        return summary
+
+    def _profile_snapshot(self, user_id: Union[int, str]) -> Optional[List[str]]:
+        # Oldest first, so new facts append to the end of the prefix; None keeps the live lookup
+        limit = profile_fact_limit()
+        if limit <= 0:
+            return []
+        try:
+            docs = self.ltm_repo.list_by_user(user_id=user_id, limit=limit)
+        except Exception:
+            return None
+        return [d.get("content", "") for d in reversed(docs) if d.get("content")]
+
+    def _summarize(self, *, previous: str, messages: List[Dict[str, Any]]) -> str:
+        turns = "\n".join(f"{m.get('role', '')}: {m.get('content', '')}" for m in messages)
+        prompt = f"""
+Bạn duy trì bản tóm tắt cuộc hội thoại giữa người dùng và trợ lý.
+Cập nhật bản tóm tắt hiện có với các tin nhắn mới bên dưới.
+Yêu cầu:
+- Giữ lại chủ đề, quyết định, yêu cầu còn dang dở và thông tin người dùng đã chia sẻ.
+- Bỏ lời chào/filler.
+- Tối đa {settings.summary_max_chars} ký tự, văn xuôi ngắn gọn, không markdown.
+
+Bản tóm tắt hiện có:
+{previous or "(chưa có)"}
+
+Tin nhắn mới:
+{turns}
+"""
+        text = self.llm.chat(system_prompt=None, user_prompt=prompt).strip()
+        return text[: settings.summary_max_chars] if text else previous
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from datetime import datetime
+from threading import Lock
+import base64
+import json
+
+from bson import ObjectId
+
+from config import settings
+from core.repositories.conversation import ConversationRepo
+from core.repositories.conversation_summary import ConversationSummaryRepo
+from core.repositories.long_term_memory import LongTermMemoryRepo
+from core.repositories.tool_logs import ToolLogRepo
+from core.repositories.user_data_jobs import UserDataJobRepo
+from core.repositories.vector_memory import QdrantVectorRepo
+
+# Derived/index fields that are not user data and would bloat exports
+_EXPORT_DROP = ("embedding", "lex_terms", "lex_tf", "lex_len")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_resume_token(collection: str, after_id: Any) -> str:
+    raw = json.dumps({"c": collection, "a": str(after_id)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8")
+
+
+def decode_resume_token(token: str) -> Tuple[str, Any]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode((token + "=" * (-len(token) % 4)).encode("utf-8")))
+        collection, after = raw["c"], raw["a"]
+    except Exception as e:
+        raise ValueError("malformed resume_token") from e
+    return collection, ObjectId(after) if ObjectId.is_valid(after) else after
+
+
+class UserDataService:
+    """
+    Chunked, bounded-memory export and deletion of everything stored for a user:
+    messages, long-term memories (+ lexical stats), tool logs, the rolling summary and
+    the user's Qdrant points. Work is done batch_size documents at a time.
+    """
+
+    def __init__(
+        self,
+        *,
+        conversation: Optional[ConversationRepo] = None,
+        memory: Optional[LongTermMemoryRepo] = None,
+        tool_logs: Optional[ToolLogRepo] = None,
+        summary: Optional[ConversationSummaryRepo] = None,
+        jobs: Optional[UserDataJobRepo] = None,
+        vectors: Optional[QdrantVectorRepo] = None,
+    ) -> None:
+        self.repos = {
+            "messages": conversation or ConversationRepo(),
+            "long_term_memory": memory or LongTermMemoryRepo(),
+            "tool_logs": tool_logs or ToolLogRepo(),
+            "conversation_summaries": summary or ConversationSummaryRepo(),
+        }
+        self.jobs = jobs or UserDataJobRepo()
+        self._vectors = vectors
+        self.batch_size = settings.user_data_batch_size
+        self.pause_sec = settings.user_data_batch_pause_ms / 1000.0
+        self.job_stale_sec = settings.user_data_job_stale_sec
+
+    @property
+    def vectors(self) -> Optional[QdrantVectorRepo]:
+        if self._vectors is None and settings.qdrant_url:
+            try:
+                self._vectors = QdrantVectorRepo()
+            except Exception:
+                self._vectors = None
+        return self._vectors
+
+    def export_ndjson(
+        self,
+        *,
+        user_id: Union[int, str],
+        batch_size: Optional[int] = None,
+        resume_token: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        NDJSON lines: one {"type": "doc"} per document, a {"type": "progress"} line with a
+        resume_token after every batch, and a final {"type": "done"}. Restarting with the
+        last resume_token continues right after the last completed batch.
+        The resume_token is checked here, before any line is produced (ValueError if invalid).
+        """
+        names = list(self.repos)
+        start, after_id = 0, None
+        if resume_token:
+            name, after_id = decode_resume_token(resume_token)
+            if name not in names:
+                raise ValueError(f"resume_token names unknown collection {name!r}")
+            start = names.index(name)
+        return self._export_lines(user_id, names, start, after_id, batch_size or self.batch_size)
+
+    def _export_lines(
+        self, user_id: Union[int, str], names: List[str], start: int, after_id: Any, batch_size: int,
+    ) -> Iterator[str]:
+        counts: Dict[str, int] = {}
+        yield json.dumps({"type": "export", "user_id": user_id, "collections": names[start:]}) + "\n"
+        for i, name in enumerate(names[start:], start):
+            n = 0
+            batches = self.repos[name].iter_by_user(
+                user_id=user_id, batch_size=batch_size, after_id=after_id if i == start else None,
+            )
+            for batch in batches:
+                for doc in batch:
+                    for k in _EXPORT_DROP:
+                        doc.pop(k, None)
+                    yield json.dumps({"type": "doc", "collection": name, "doc": doc}, default=_json_default, ensure_ascii=False) + "\n"
+                n += len(batch)
+                yield json.dumps({
+                    "type": "progress",
+                    "collection": name,
+                    "exported": n,
+                    "resume_token": encode_resume_token(name, batch[-1]["_id"]),
+                }) + "\n"
+            counts[name] = n
+        yield json.dumps({"type": "done", "counts": counts}) + "\n"
+
+    def delete_all(
+        self,
+        *,
+        user_id: Union[int, str],
+        job_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Batched delete across every store. With job_id, progress is written to the job
+        after each batch and finished stages are skipped, so a crashed job can be resumed.
+        """
+        batch_size = batch_size or self.batch_size
+        job = self.jobs.get(job_id=job_id) if job_id else None
+        done = set((job or {}).get("done") or [])
+        counts: Dict[str, int] = dict((job or {}).get("progress") or {})
+        if job_id:
+            self.jobs.update(job_id=job_id, set_fields={"status": "running", "error": None})
+
+        stages: List[Tuple[str, Callable[..., int]]] = [(name, repo.delete_by_user) for name, repo in self.repos.items()]
+        if self.vectors is not None:
+            stages.append(("qdrant", self.vectors.delete_by_user))
+        try:
+            for name, delete in stages:
+                if name in done:
+                    continue
+                if job_id:
+                    self.jobs.update(job_id=job_id, set_fields={"stage": name})
+
+                def on_batch(n: int, name: str = name) -> None:
+                    counts[name] = counts.get(name, 0) + n
+                    if job_id:
+                        self.jobs.update(job_id=job_id, inc={f"progress.{name}": n})
+
+                kwargs: Dict[str, Any] = {"user_id": user_id, "batch_size": batch_size, "on_batch": on_batch}
+                if name != "qdrant":
+                    kwargs["pause_sec"] = self.pause_sec
+                deleted = delete(**kwargs)
+                if name == "conversation_summaries":
+                    # Single-document delete, no batches
+                    on_batch(deleted)
+                counts.setdefault(name, 0)
+                if job_id:
+                    self.jobs.mark_stage_done(job_id=job_id, stage=name)
+        except Exception as e:
+            if job_id:
+                self.jobs.update(job_id=job_id, set_fields={"status": "failed", "error": str(e)})
+            raise
+        if job_id:
+            self.jobs.update(job_id=job_id, set_fields={"status": "done", "stage": None})
+        return counts
+
+    def start_delete_job(self, *, user_id: Union[int, str]) -> Dict[str, Any]:
+        return self.jobs.create(user_id=user_id, kind="delete")
+
+    def claim_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.claim(job_id=job_id, stale_sec=self.job_stale_sec)
+
+    def run_job(self, job_id: str, *, claimed: bool = False) -> None:
+        """
+        Run a delete job. Unless the caller already claimed it, the job is claimed first,
+        so two requests (or workers) never run the same job concurrently.
+        """
+        job = self.jobs.get(job_id=job_id) if claimed else self.claim_job(job_id)
+        if job is None:
+            return
+        try:
+            self.delete_all(user_id=job["user_id"], job_id=job_id)
+        except Exception:
+            pass
+
+
+_SERVICE: Optional[UserDataService] = None
+_SERVICE_LOCK = Lock()
+
+
+def get_user_data_service() -> UserDataService:
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = UserDataService()
+    return _SERVICE
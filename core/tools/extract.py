@@ -5,9 +5,36 @@ from typing import List, Union
 from langchain_core.tools import tool
 from langsmith import traceable
 
-from core.services.memory_service import MemoryService
+from core.observability.spans import annotate
+from core.services.extraction_gate import get_extraction_gate
+from core.services.memory_service import get_memory_service
 
-MEMORY = MemoryService()
+
+def extract_and_store(user_id: Union[int, str], message: str, *, strict: bool = False) -> List[str]:
+    """
+    Extract facts from a message and persist them; returns the persisted facts.
+    strict=True raises when the LLM call fails or no extracted fact could be stored,
+    so the caller (the ltm consumer) can retry or dead-letter the message.
+    Messages the extraction gate scores below its threshold never reach the LLM.
+    """
+    gate = get_extraction_gate()
+    if gate is not None and not gate.decide(message).extract:
+        return []
+    memory = get_memory_service()
+    facts = memory.extract_long_term_fact_items(message=message, raise_on_llm_error=strict)
+    results = memory.add_long_term_memories(
+        user_id=user_id,
+        contents=[f["text"] for f in facts],
+        source="extracted",
+        metadata=[{"category": f["category"], "confidence": f["confidence"]} for f in facts],
+    )
+    persisted = [r["content"] for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        annotate("ltm.facts_failed", len(failed))
+    if strict and failed and not persisted:
+        raise RuntimeError(f"no extracted fact could be stored: {failed[0]['error']}")
+    return persisted
 
 
 @tool("extract_long_term_facts")
@@ -17,14 +44,4 @@ def extract_long_term_facts_tool(user_id: Union[int, str], message: str) -> List
     Extract atomic long-term facts from a message and persist them to long-term memory.
     Returns the list of persisted facts.
     """
-    facts = MEMORY.extract_long_term_facts(message=message)
-    persisted: List[str] = []
-    for f in facts:
-        try:
-            MEMORY.add_long_term_memory(user_id=user_id, content=f, source="extracted")
-            persisted.append(f)
-        except Exception:
-            continue
-    return persisted
-
-
+    return extract_and_store(user_id, message)
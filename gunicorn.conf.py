@@ -0,0 +1,54 @@
+"""
+Production entrypoint: pre-fork uvicorn workers sharing one preloaded embedding model.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Tunables (env): WEB_CONCURRENCY, PORT, GUNICORN_TIMEOUT, PROMETHEUS_MULTIPROC_DIR.
+"""
+import gc
+import os
+import tempfile
+
+# Per-user state must not live in a worker: nothing reads graph checkpoints back, so
+# default to none; set CHECKPOINT_MODE=mongo to persist them across workers.
+os.environ.setdefault("CHECKPOINT_MODE", "off")
+# Aggregate /metrics across workers (must be set before prometheus_client is imported)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prom-"))
+# Workers run the lifespan warmup themselves; the master only preloads fork-safe state
+os.environ.setdefault("WARMUP_ON_STARTUP", "true")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5002')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    from app.warmup import preload_for_fork
+
+    server.log.info("preloaded before fork: %s", preload_for_fork())
+    # Move everything loaded so far out of GC tracking so workers don't dirty shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # One intra-op thread pool per worker; N workers x all cores oversubscribes the CPU
+    threads = os.environ.get("EMBEDDING_THREADS")
+    if threads:
+        try:
+            import torch
+
+            torch.set_num_threads(int(threads))
+        except ImportError:
+            pass
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from config import settings
+from core.services.memory_compaction import MemoryCompactor
+
+
+def run_forever(interval_sec: Optional[float] = None) -> None:
+    """
+    Periodic LTM compaction: every interval_sec, evict the lowest-scoring memories of
+    every user above settings.ltm_max_memories_per_user.
+    """
+    interval_sec = interval_sec or settings.ltm_compaction_interval_sec
+    compactor = MemoryCompactor()
+    print(f"[ltm_compaction] Started. capacity={compactor.capacity} interval={interval_sec}s")
+    while True:
+        t0 = time.perf_counter()
+        try:
+            out = compactor.run_once()
+            print(f"[ltm_compaction] {out['evicted']} memories evicted across {out['users']} users in {time.perf_counter() - t0:.1f}s")
+        except Exception as e:
+            print(f"[ltm_compaction] run failed: {e}")
+        time.sleep(max(0.0, interval_sec - (time.perf_counter() - t0)))
+
+
+if __name__ == "__main__":
+    run_forever()
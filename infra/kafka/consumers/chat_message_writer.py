@@ -9,7 +9,7 @@ TOPIC = "chat-messages"
 def main():
     repo = ConversationRepo(db_name="EMOSTAGRAM", collection="messages")
 
-    repo.client._MongoManager__database[repo.collection].create_index([("message_id", ASCENDING)], unique=True)
+    repo.client.collection(repo.collection).create_index([("message_id", ASCENDING)], unique=True)
 
     consumer = Consumer({
         "bootstrap.servers": settings.kafka_bootstrap,
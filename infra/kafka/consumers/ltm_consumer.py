@@ -1,48 +1,96 @@
 from __future__ import annotations
 
-import json
-from confluent_kafka import Consumer
-from core.tools.extract import extract_long_term_facts_tool
+import time
+from typing import List, Optional
+from core.observability.metrics import KAFKA_CONSUMED, KAFKA_PROCESS_LATENCY
+from infra.kafka.dead_letter import handle_with_retries
+from infra.kafka.lag import report_consumer_lag
+from core.tools.extract import extract_and_store
 from config import settings
 
 
-def run_consumer(group_id: str = "ltm-extract-consumers") -> None:
+def process_payload(payload: dict, *, strict: bool = False) -> List[str]:
+    user_id = payload.get("user_id")
+    text = payload.get("message") or ""
+    if user_id is None or not text:
+        return []
+    print(f"[ltm_consumer] Processing user_id={user_id}")
+    facts = extract_and_store(user_id, text, strict=strict)
+    try:
+        n = len(facts or [])
+    except Exception:
+        n = 0
+    if n:
+        # Log up to first 5 facts for readability
+        preview = facts[:5]
+        print(f"[ltm_consumer] Saved {n} fact(s) for user_id={user_id}: {preview}")
+    else:
+        print(f"[ltm_consumer] No facts extracted for user_id={user_id}")
+    return facts or []
+
+
+def handle_message(msg, producer, *, max_retries: int) -> str:
+    return handle_with_retries(
+        msg,
+        producer,
+        lambda payload: process_payload(payload, strict=True),
+        dlq_topic=settings.ltm_dead_letter_topic,
+        max_retries=max_retries,
+        name="ltm_consumer",
+    )
+
+
+def run_consumer(group_id: Optional[str] = None) -> None:
+    """
+    At-least-once consumer: offsets are committed only after a message was processed or
+    written to the dead-letter topic, so a restart resumes from the last committed offset
+    instead of skipping the backlog. Lag/throughput metrics are served on
+    settings.ltm_consumer_metrics_port.
+    """
+    from confluent_kafka import Consumer, Producer
+
+    topic = settings.ltm_extract_topic
     conf = {
         "bootstrap.servers": settings.kafka_bootstrap,
-        "group.id": group_id,
-        "auto.offset.reset": "latest",
-        "enable.auto.commit": True,
+        "group.id": group_id or settings.ltm_extract_group,
+        "auto.offset.reset": "earliest",
+        "enable.auto.commit": False,
+        # Long LLM retries must not get the consumer kicked out of the group
+        "max.poll.interval.ms": 600000,
     }
+    if settings.ltm_consumer_metrics_port:
+        from prometheus_client import start_http_server
+
+        start_http_server(settings.ltm_consumer_metrics_port)
     c = Consumer(conf)
-    c.subscribe(["ltm-extract"])
-    print("[ltm_consumer] Started. Subscribed to 'ltm-extract'.")
+    dlq = Producer({"bootstrap.servers": settings.kafka_bootstrap, "acks": "all"})
+    c.subscribe([topic])
+    print(f"[ltm_consumer] Started. Subscribed to '{topic}'.")
+    last_lag = 0.0
     try:
         while True:
             msg = c.poll(1.0)
-            if msg is None or msg.error():
+            if time.monotonic() - last_lag > 5.0:
+                report_consumer_lag(c, topic)
+                last_lag = time.monotonic()
+            if msg is None:
                 continue
-            try:
-                payload = json.loads(msg.value().decode("utf-8"))
-                user_id = payload.get("user_id")
-                text = payload.get("message") or ""
-                if user_id is None or not text:
-                    continue
-                print(f"[ltm_consumer] Processing user_id={user_id}")
-                facts = extract_long_term_facts_tool.invoke({"user_id": user_id, "message": text})
-                try:
-                    n = len(facts or [])
-                except Exception:
-                    n = 0
-                if n:
-                    # Log up to first 5 facts for readability
-                    preview = facts[:5]
-                    print(f"[ltm_consumer] Saved {n} fact(s) for user_id={user_id}: {preview}")
-                else:
-                    print(f"[ltm_consumer] No facts extracted for user_id={user_id}")
-            except Exception:
+            if msg.error():
+                print(f"[ltm_consumer] consumer error: {msg.error()}")
                 continue
+            t0 = time.perf_counter()
+            try:
+                outcome = handle_message(msg, dlq, max_retries=settings.ltm_consumer_max_retries)
+            except Exception as e:
+                # DLQ unavailable: stop without committing so the message is redelivered
+                print(f"[ltm_consumer] dead-letter write failed, stopping: {e}")
+                KAFKA_CONSUMED.labels(topic=topic, outcome="error").inc()
+                raise
+            KAFKA_PROCESS_LATENCY.labels(topic=topic).observe(time.perf_counter() - t0)
+            KAFKA_CONSUMED.labels(topic=topic, outcome=outcome).inc()
+            c.commit(message=msg, asynchronous=False)
     finally:
         c.close()
 
 if __name__ == "__main__":
-    run_consumer()
\ No newline at end of file
+    run_consumer()
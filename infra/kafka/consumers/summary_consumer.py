@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+from core.observability.metrics import KAFKA_CONSUMED, KAFKA_PROCESS_LATENCY
+from core.services.summary_service import SummaryService
+from infra.kafka.dead_letter import handle_with_retries
+from infra.kafka.lag import report_consumer_lag
+from config import settings
+
+
+def process_payload(payload: dict, *, svc: Optional[SummaryService] = None) -> Optional[str]:
+    user_id = payload.get("user_id")
+    if user_id is None:
+        return None
+    summary = (svc or SummaryService()).maybe_update(user_id=user_id)
+    if summary is not None:
+        print(f"[summary_consumer] Updated summary for user_id={user_id} ({len(summary)} chars)")
+    return summary
+
+
+def handle_message(msg, producer, *, max_retries: int, svc: Optional[SummaryService] = None) -> str:
+    return handle_with_retries(
+        msg,
+        producer,
+        lambda payload: process_payload(payload, svc=svc),
+        dlq_topic=settings.summary_dead_letter_topic,
+        max_retries=max_retries,
+        name="summary_consumer",
+    )
+
+
+def run_consumer(group_id: Optional[str] = None) -> None:
+    """
+    At-least-once consumer, same commit/retry/dead-letter handling as ltm_consumer.
+    Metrics are served on settings.summary_consumer_metrics_port.
+    """
+    from confluent_kafka import Consumer, Producer
+
+    topic = settings.summary_topic
+    conf = {
+        "bootstrap.servers": settings.kafka_bootstrap,
+        "group.id": group_id or settings.summary_group,
+        "auto.offset.reset": "earliest",
+        "enable.auto.commit": False,
+        # Summarization retries back off for minutes in the worst case
+        "max.poll.interval.ms": 600000,
+    }
+    if settings.summary_consumer_metrics_port:
+        from prometheus_client import start_http_server
+
+        start_http_server(settings.summary_consumer_metrics_port)
+    svc = SummaryService()
+    c = Consumer(conf)
+    dlq = Producer({"bootstrap.servers": settings.kafka_bootstrap, "acks": "all"})
+    c.subscribe([topic])
+    print(f"[summary_consumer] Started. Subscribed to '{topic}'.")
+    last_lag = 0.0
+    try:
+        while True:
+            msg = c.poll(1.0)
+            if time.monotonic() - last_lag > 5.0:
+                report_consumer_lag(c, topic)
+                last_lag = time.monotonic()
+            if msg is None:
+                continue
+            if msg.error():
+                print(f"[summary_consumer] consumer error: {msg.error()}")
+                continue
+            t0 = time.perf_counter()
+            try:
+                outcome = handle_message(msg, dlq, max_retries=settings.summary_consumer_max_retries, svc=svc)
+            except Exception as e:
+                # DLQ unavailable: stop without committing so the message is redelivered
+                print(f"[summary_consumer] dead-letter write failed, stopping: {e}")
+                KAFKA_CONSUMED.labels(topic=topic, outcome="error").inc()
+                raise
+            KAFKA_PROCESS_LATENCY.labels(topic=topic).observe(time.perf_counter() - t0)
+            KAFKA_CONSUMED.labels(topic=topic, outcome=outcome).inc()
+            c.commit(message=msg, asynchronous=False)
+    finally:
+        c.close()
+
+if __name__ == "__main__":
+    run_consumer()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Callable, Optional
+
+
+def dead_letter(producer, dlq_topic: str, msg, payload: Optional[dict], error: Exception, attempts: int) -> None:
+    producer.produce(
+        topic=dlq_topic,
+        key=msg.key(),
+        value=json.dumps({
+            "topic": msg.topic(),
+            "partition": msg.partition(),
+            "offset": msg.offset(),
+            "payload": payload,
+            "raw": None if payload is not None else msg.value().decode("utf-8", "replace"),
+            "error": repr(error),
+            "attempts": attempts,
+            "failed_at": time.time(),
+        }, ensure_ascii=False),
+    )
+    # Block until the DLQ write is acknowledged; the offset is committed right after
+    producer.flush(10.0)
+
+
+def handle_with_retries(
+    msg,
+    producer,
+    process: Callable[[dict], object],
+    *,
+    dlq_topic: str,
+    max_retries: int,
+    name: str,
+) -> str:
+    """
+    Run process(payload) for one message with retries; after max_retries failures it goes
+    to dlq_topic. Returns the outcome label. Raises only if the DLQ write fails, in which
+    case the offset must not be committed.
+    """
+    payload: Optional[dict] = None
+    try:
+        payload = json.loads(msg.value().decode("utf-8"))
+    except Exception as e:
+        # Malformed messages never succeed; dead-letter them straight away
+        dead_letter(producer, dlq_topic, msg, None, e, 0)
+        return "dead_letter"
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            process(payload)
+            return "ok"
+        except Exception as e:
+            print(f"[{name}] attempt {attempt} failed for offset {msg.offset()}: {e}")
+            if attempt > max_retries:
+                dead_letter(producer, dlq_topic, msg, payload, e, attempt)
+                return "dead_letter"
+            time.sleep(min(2 ** attempt, 30))
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from threading import Event, Lock, Thread
+from typing import Dict, Optional, Tuple
+import random
+import time
+
+from core.observability.metrics import KAFKA_CONSUMER_LAG, KAFKA_GROUP_LAG, LTM_EXTRACT_SKIPPED
+
+_MONITORS: Dict[Tuple[str, str], Optional["GroupLagMonitor"]] = {}
+_MONITORS_LOCK = Lock()
+
+
+class GroupLagMonitor:
+    """
+    Lag of a consumer group on one topic (sum over partitions of high watermark minus
+    committed offset), refreshed on a daemon thread so producers can read it for free.
+    lag() is None until the first successful refresh or when Kafka is unreachable.
+    """
+
+    def __init__(self, bootstrap_servers: str, *, topic: str, group_id: str, refresh_sec: float = 10.0) -> None:
+        from confluent_kafka import Consumer
+
+        # Same group.id only to read its committed offsets; this consumer never subscribes or commits
+        self._consumer = Consumer({
+            "bootstrap.servers": bootstrap_servers,
+            "group.id": group_id,
+            "enable.auto.commit": False,
+        })
+        self.topic = topic
+        self.group_id = group_id
+        self.refresh_sec = refresh_sec
+        self._lag: Optional[int] = None
+        self._updated_at = 0.0
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name=f"lag-monitor-{topic}", daemon=True)
+        self._thread.start()
+
+    def lag(self) -> Optional[int]:
+        # A value older than a few refresh periods means the monitor is stuck; don't act on it
+        if self._lag is None or time.monotonic() - self._updated_at > 3 * self.refresh_sec:
+            return None
+        return self._lag
+
+    def refresh(self, timeout: float = 5.0) -> int:
+        from confluent_kafka import TopicPartition
+
+        meta = self._consumer.list_topics(self.topic, timeout=timeout)
+        parts = [TopicPartition(self.topic, p) for p in (meta.topics[self.topic].partitions or {})]
+        total = 0
+        for tp in self._consumer.committed(parts, timeout=timeout):
+            low, high = self._consumer.get_watermark_offsets(tp, timeout=timeout, cached=False)
+            # Negative offset = nothing committed yet; everything retained counts as lag
+            total += max(0, high - (tp.offset if tp.offset >= 0 else low))
+        self._lag, self._updated_at = total, time.monotonic()
+        KAFKA_GROUP_LAG.labels(topic=self.topic, group=self.group_id).set(total)
+        return total
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                pass
+            self._stop.wait(self.refresh_sec)
+        self._consumer.close()
+
+
+def report_consumer_lag(c, topic: str) -> None:
+    # Lag per assigned partition = high watermark - current position (cached watermarks, no broker round trip)
+    try:
+        for tp in c.position(c.assignment()):
+            low, high = c.get_watermark_offsets(tp, cached=True)
+            if high < 0:
+                continue
+            pos = tp.offset if tp.offset >= 0 else low
+            KAFKA_CONSUMER_LAG.labels(topic=topic, partition=str(tp.partition)).set(max(0, high - pos))
+    except Exception:
+        pass
+
+
+def get_lag_monitor(topic: str, group_id: str) -> Optional[GroupLagMonitor]:
+    """
+    Process-wide monitor per (topic, group), started on first use; None if it cannot be created.
+    """
+    key = (topic, group_id)
+    if key in _MONITORS:
+        return _MONITORS[key]
+    with _MONITORS_LOCK:
+        if key not in _MONITORS:
+            from config import settings
+
+            try:
+                _MONITORS[key] = GroupLagMonitor(
+                    settings.kafka_bootstrap, topic=topic, group_id=group_id, refresh_sec=settings.ltm_lag_refresh_sec,
+                )
+            except Exception:
+                _MONITORS[key] = None
+    return _MONITORS[key]
+
+
+def should_enqueue_extraction(message: str, *, lag: Optional[int] = None, rng: Optional[random.Random] = None) -> bool:
+    """
+    Backpressure policy for ltm-extract producers. Below the soft lag everything is sent;
+    above it low-value messages (greetings, acknowledgements, emoji) are dropped; above
+    the hard lag the remainder is sampled with probability hard_lag / lag.
+    Unknown lag (no monitor / Kafka unreachable) never drops anything.
+    """
+    from config import settings
+    from core.services.extraction_gate import is_low_value_message
+
+    if lag is None:
+        monitor = get_lag_monitor(settings.ltm_extract_topic, settings.ltm_extract_group)
+        lag = monitor.lag() if monitor is not None else None
+    if lag is None or lag <= settings.ltm_backpressure_soft_lag:
+        return True
+    if is_low_value_message(message):
+        LTM_EXTRACT_SKIPPED.labels(reason="low_value").inc()
+        return False
+    hard = settings.ltm_backpressure_hard_lag
+    if hard and lag > hard:
+        keep = max(settings.ltm_backpressure_min_keep, hard / lag)
+        if (rng or random).random() >= keep:
+            LTM_EXTRACT_SKIPPED.labels(reason="sampled").inc()
+            return False
+    return True
@@ -1,9 +1,20 @@
 
-from confluent_kafka import Producer
 import json, time
+from threading import Lock
+from typing import Optional
+
+from core.observability.metrics import KAFKA_DELIVERY_LATENCY, KAFKA_PRODUCE_ERRORS, KAFKA_PRODUCE_LATENCY
+from core.observability.spans import span
+
+_DEFAULT: Optional["KafkaProducerClient"] = None
+_DEFAULT_FAILED = False
+_DEFAULT_LOCK = Lock()
+
 
 class KafkaProducerClient:
     def __init__(self, bootstrap_servers: str):
+        from confluent_kafka import Producer
+
         self.producer = Producer({
             "bootstrap.servers": bootstrap_servers,
             "enable.idempotence": False,  
@@ -16,13 +27,41 @@ class KafkaProducerClient:
     def send(self, topic: str, key: str, value: dict, timeout: float = 0.0):
         payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
         err_holder = {"err": None}
+        t0 = time.perf_counter()
 
         def _cb(err, msg):
             err_holder["err"] = err
+            KAFKA_DELIVERY_LATENCY.labels(topic=topic, outcome="error" if err else "ok").observe(time.perf_counter() - t0)
 
-        self.producer.produce(topic=topic, key=key, value=payload, callback=_cb)
-        # fire-and-forget to avoid blocking request latency; errors will appear in broker metrics/logs
-        self.producer.poll(0)
+        try:
+            with span(f"kafka.produce.{topic}"):
+                self.producer.produce(topic=topic, key=key, value=payload, callback=_cb)
+                # fire-and-forget to avoid blocking request latency; errors will appear in broker metrics/logs
+                self.producer.poll(0)
+        except Exception:
+            KAFKA_PRODUCE_ERRORS.labels(topic=topic).inc()
+            raise
+        finally:
+            KAFKA_PRODUCE_LATENCY.labels(topic=topic).observe(time.perf_counter() - t0)
 
     def flush(self):
         self.producer.flush(5.0)
+
+
+def get_default_producer() -> Optional[KafkaProducerClient]:
+    """
+    Process-wide producer for settings.kafka_bootstrap, created on first use.
+    Returns None if Kafka is unavailable (callers fall back to inline processing).
+    """
+    global _DEFAULT, _DEFAULT_FAILED
+    if _DEFAULT is not None or _DEFAULT_FAILED:
+        return _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None and not _DEFAULT_FAILED:
+            from config import settings
+
+            try:
+                _DEFAULT = KafkaProducerClient(bootstrap_servers=settings.kafka_bootstrap)
+            except Exception:
+                _DEFAULT_FAILED = True
+    return _DEFAULT
@@ -0,0 +1,13 @@
+import os
+
+# Settings() requires these; tests never talk to the real services
+for _k, _v in {
+    "OPENAI_API_KEY": "x",
+    "OPENAI_BASE_URL": "http://localhost",
+    "DATASTAX_TOKEN": "x",
+    "ASTRA_CLIENT_ID": "x",
+    "ASTRA_CLIENT_SECRET": "x",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "KAFKA_BOOTSTRAP": "localhost:9092",
+}.items():
+    os.environ.setdefault(_k, _v)
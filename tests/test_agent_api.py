@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from fastapi.testclient import TestClient
+
+from app.api.v1 import agent as agent_api
+from app.main import app
+from config import settings
+from core.services.chat_coordination import UserBusyError
+from core.services.llm_resilience import LLMTimeoutError, LLMUnavailableError
+
+
+class _Agent:
+    def __init__(self, error):
+        self.error = error
+
+    def chat(self, **kwargs):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, status", [
+    (UserBusyError("timed out waiting for lock '1'"), 409),
+    (LLMTimeoutError("gemini:m did not answer within 20.0s"), 504),
+    (LLMUnavailableError("circuit breaker open for gemini:m"), 503),
+    (ValueError("bad input"), 400),
+])
+def test_chat_error_status(monkeypatch, error, status):
+    monkeypatch.setattr(agent_api, "get_agent", lambda: _Agent(error))
+    resp = TestClient(app).post("/v1/agent/chat", json={"username": "u", "message": "hi"})
+    assert resp.status_code == status
+    assert resp.json()["detail"] == str(error)
+
+
+def test_chat_rejects_overlong_message(monkeypatch):
+    monkeypatch.setattr(agent_api, "get_agent", lambda: _Agent(AssertionError("must not run")))
+    resp = TestClient(app).post("/v1/agent/chat", json={"username": "u", "message": "x" * (settings.chat_message_max_chars + 1)})
+    assert resp.status_code == 422
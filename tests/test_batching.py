@@ -0,0 +1,31 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from core.repositories.batching import delete_in_batches, iter_batches
+
+
+@pytest.fixture
+def coll():
+    c = mongomock.MongoClient().db.items
+    c.insert_many([{"_id": i, "user_id": i % 2} for i in range(11)])
+    return c
+
+
+def test_iter_batches_pages_in_id_order(coll):
+    batches = list(iter_batches(coll, {"user_id": 0}, batch_size=2))
+    assert [len(b) for b in batches] == [2, 2, 2]
+    assert [d["_id"] for b in batches for d in b] == [0, 2, 4, 6, 8, 10]
+
+
+def test_iter_batches_resumes_after_id(coll):
+    ids = [d["_id"] for b in iter_batches(coll, {}, batch_size=4, after_id=6) for d in b]
+    assert ids == [7, 8, 9, 10]
+
+
+def test_delete_in_batches_reports_each_chunk(coll):
+    chunks = []
+    assert delete_in_batches(coll, {"user_id": 1}, batch_size=2, on_batch=chunks.append) == 5
+    assert chunks == [2, 2, 1]
+    assert coll.count_documents({"user_id": 1}) == 0
+    assert coll.count_documents({}) == 6
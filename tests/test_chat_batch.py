@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from config import settings
+from core.services.agent_service import AgentService
+
+
+class _Memory:
+    def embed_texts(self, texts):
+        return [[0.0] for _ in texts]
+
+
+class _WorkerDied(BaseException):
+    pass
+
+
+def _agent(chat):
+    agent = AgentService.__new__(AgentService)
+    agent.memory = _Memory()
+    agent.chat = chat
+    return agent
+
+
+def test_user_id_zero_keeps_items_of_that_user_in_order():
+    seen, lock = [], threading.Lock()
+
+    def chat(*, user_id, username, message, query_embedding, idempotency_key):
+        with lock:
+            seen.append((user_id, message))
+        return {"message": message}
+
+    items = [
+        {"user_id": 0, "username": "a", "message": "1"},
+        {"user_id": 0, "username": "b", "message": "2"},
+        {"user_id": 0, "username": "a", "message": "3"},
+    ]
+    out = list(_agent(chat).chat_batch(items, max_concurrency=4))
+    assert {o["user_id"] for o in out} == {0}
+    assert seen == [(0, "1"), (0, "2"), (0, "3")]
+
+
+def test_dead_worker_fails_remaining_items_instead_of_hanging(monkeypatch):
+    monkeypatch.setattr(settings, "chat_batch_result_timeout_sec", 0.2)
+
+    def chat(*, user_id, username, message, query_embedding, idempotency_key):
+        if user_id == 2:
+            raise _WorkerDied()
+        return {"message": message}
+
+    items = [{"user_id": 1, "username": "u1", "message": "hi"}, {"user_id": 2, "username": "u2", "message": "hi"}]
+    out = {o["index"]: o for o in _agent(chat).chat_batch(items, max_concurrency=2)}
+    assert out[0]["ok"] is True
+    assert out[1] == {"index": 1, "user_id": 2, "ok": False, "error": "timed out waiting for result"}
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from core.services import chat_coordination
+from core.services.chat_coordination import DistributedKeyedLock, IdempotencyCache, KeyedLock, UserBusyError, idempotency_scope
+
+
+def test_keyed_lock_times_out_while_held():
+    lock = KeyedLock()
+    with lock.hold("u1"):
+        with pytest.raises(UserBusyError):
+            with lock.hold("u1", timeout=0.01):
+                pass
+        # Other keys are independent
+        with lock.hold("u2", timeout=0.01):
+            pass
+    assert lock._locks == {}
+
+
+def test_keyed_lock_serializes_same_key():
+    lock, active, peak = KeyedLock(), [0], [0]
+
+    def worker():
+        with lock.hold("u1"):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            active[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+
+
+class _LeaseRepo:
+    def __init__(self):
+        self.owner = None
+
+    def try_acquire(self, *, key, owner, lease_sec):
+        if self.owner is None:
+            self.owner = owner
+            return True
+        return False
+
+    def release(self, *, key, owner):
+        if self.owner == owner:
+            self.owner = None
+
+
+def test_distributed_lock_waits_for_lease():
+    repo = _LeaseRepo()
+    lock = DistributedKeyedLock(repo, poll_sec=0.001)
+    repo.owner = "other-process"
+    with pytest.raises(UserBusyError):
+        with lock.hold("u1", timeout=0.02):
+            pass
+    repo.owner = None
+    with lock.hold("u1", timeout=0.02):
+        assert repo.owner is not None
+    assert repo.owner is None
+
+
+def test_idempotency_cache_returns_copies():
+    cache = IdempotencyCache(ttl_sec=60)
+    cache.put("k", {"reply": "hi", "meta": {"n": 1}})
+    hit = cache.get("k")
+    hit["meta"]["n"] = 2
+    assert cache.get("k") == {"reply": "hi", "meta": {"n": 1}}
+
+
+def test_idempotency_cache_expires_and_bounds(monkeypatch):
+    cache = IdempotencyCache(ttl_sec=10, max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, {"k": k})
+    assert cache.get("a") is None and cache.get("c") == {"k": "c"}
+    now = chat_coordination.time.monotonic()
+    monkeypatch.setattr(chat_coordination.time, "monotonic", lambda: now + 11)
+    assert cache.get("c") is None
+
+
+def test_idempotency_scope_is_per_user():
+    assert idempotency_scope(1, "k") != idempotency_scope(2, "k")
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("langgraph")
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from core.services.checkpointing import BoundedMemorySaver, _sqlite_saver
+
+
+def _put(saver, thread_id):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, empty_checkpoint(), {}, {})
+
+
+def test_memory_saver_delete_thread():
+    saver = BoundedMemorySaver(max_threads=10)
+    _put(saver, "1")
+    _put(saver, "2")
+    saver.delete_thread("1")
+    assert saver.get_tuple({"configurable": {"thread_id": "1"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "2"}}) is not None
+    assert saver.thread_count() == 1
+
+
+def test_sqlite_saver_delete_thread_drops_activity(tmp_path):
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    saver = _sqlite_saver(str(tmp_path / "cp.sqlite"), ttl_sec=None)
+    _put(saver, "1")
+    saver.delete_thread("1")
+    assert saver.get_tuple({"configurable": {"thread_id": "1"}}) is None
+    with saver.cursor() as cur:
+        assert list(cur.execute("SELECT * FROM thread_activity")) == []
+
+
+def _soak(saver, *, workers=4, turns=25, users_per_worker=5):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from bench.checkpoint_soak import _build
+
+    graph = _build(saver)
+
+    def run(w):
+        for i in range(turns):
+            uid = f"{w}-{i % users_per_worker}"
+            graph.invoke({"user_id": uid, "user_message": f"turn {i}"}, config={"configurable": {"thread_id": uid}})
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, range(workers)))
+
+
+def test_memory_saver_stays_bounded_under_concurrent_turns():
+    saver = BoundedMemorySaver(max_threads=12)
+    _soak(saver)
+    assert saver.thread_count() <= 12
+    for namespaces in saver.storage.values():
+        assert all(len(checkpoints) <= 1 for checkpoints in namespaces.values())
+
+
+def test_sqlite_saver_stays_bounded_under_concurrent_turns(tmp_path):
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    saver = _sqlite_saver(str(tmp_path / "cp.sqlite"), ttl_sec=None)
+    _soak(saver)
+    with saver.cursor() as cur:
+        per_thread = dict(cur.execute("SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"))
+        writes = cur.execute("SELECT COUNT(DISTINCT checkpoint_id) FROM writes").fetchone()[0]
+    assert len(per_thread) == 4 * 5
+    assert max(per_thread.values()) == 1
+    assert writes <= len(per_thread)
+    # Idle threads go away entirely once past the TTL
+    assert saver.prune(-1) == 20
+    with saver.cursor() as cur:
+        assert cur.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 0
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from core.services import context_cache
+from core.services.context_cache import ContextCacheRegistry
+
+
+class _Handles:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.deleted = []
+
+    def create(self, ttl_sec):
+        if self.fail:
+            raise RuntimeError("too small")
+        self.created.append(f"h{len(self.created)}")
+        return self.created[-1]
+
+    def delete(self, handle):
+        self.deleted.append(handle)
+
+
+def test_reuses_handle_while_digest_unchanged():
+    reg, h = ContextCacheRegistry(ttl_sec=600), _Handles()
+    d = reg.digest("sys", "prefix")
+    assert reg.get_or_create("u1", d, h.create, h.delete) == "h0"
+    assert reg.get_or_create("u1", d, h.create, h.delete) == "h0"
+    assert h.created == ["h0"] and h.deleted == []
+
+
+def test_changed_prefix_replaces_and_deletes_old_handle():
+    reg, h = ContextCacheRegistry(ttl_sec=600), _Handles()
+    reg.get_or_create("u1", reg.digest("a"), h.create, h.delete)
+    assert reg.get_or_create("u1", reg.digest("b"), h.create, h.delete) == "h1"
+    assert h.deleted == ["h0"]
+
+
+def test_expired_entry_is_recreated(monkeypatch):
+    reg, h = ContextCacheRegistry(ttl_sec=600), _Handles()
+    d = reg.digest("a")
+    reg.get_or_create("u1", d, h.create, h.delete)
+    now = context_cache.time.monotonic()
+    monkeypatch.setattr(context_cache.time, "monotonic", lambda: now + 600)
+    assert reg.get_or_create("u1", d, h.create, h.delete) == "h1"
+
+
+def test_failed_creation_is_not_retried_until_expiry():
+    reg, h = ContextCacheRegistry(ttl_sec=600), _Handles(fail=True)
+    d = reg.digest("a")
+    assert reg.get_or_create("u1", d, h.create, h.delete) is None
+    h.fail = False
+    assert reg.get_or_create("u1", d, h.create, h.delete) is None
+    assert h.created == []
+
+
+def test_lru_bound_deletes_evicted_handles():
+    reg, h = ContextCacheRegistry(ttl_sec=600, max_entries=2), _Handles()
+    for key in ("u1", "u2", "u3"):
+        reg.get_or_create(key, reg.digest(key), h.create, h.delete)
+    assert reg.size() == 2
+    assert h.deleted == ["h0"]
+
+
+def test_digest_separates_parts():
+    assert ContextCacheRegistry.digest("ab", "c") != ContextCacheRegistry.digest("a", "bc")
+    assert ContextCacheRegistry.digest(None, "x") == ContextCacheRegistry.digest("", "x")
+
+
+def test_concurrent_misses_create_one_handle():
+    import threading
+    import time as _time
+
+    reg, created, lock = ContextCacheRegistry(ttl_sec=600), [], threading.Lock()
+
+    def create(ttl_sec):
+        _time.sleep(0.05)
+        with lock:
+            created.append(f"h{len(created)}")
+            return created[-1]
+
+    d, out = reg.digest("prefix"), []
+    threads = [threading.Thread(target=lambda: out.append(reg.get_or_create("u1", d, create, lambda h: None))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert created == ["h0"]
+    assert out == ["h0"] * 8
@@ -0,0 +1,21 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+
+from core.services.embedders import Embedder
+
+
+def test_embedder_is_abstract():
+    with pytest.raises(TypeError):
+        Embedder()
+
+
+def test_embedder_subclass_implements_encode():
+    class Ones(Embedder):
+        dim = 2
+
+        def encode(self, texts):
+            return np.ones((len(texts), self.dim), dtype=np.float32)
+
+    assert Ones().encode(["a", "b"]).shape == (2, 2)
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from core.services.embedders import OnnxEmbedder, SentenceTransformerEmbedder
+
+ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx")
+
+TEXTS = [
+    "Người dùng tên là Nguyễn Minh Anh",
+    "Người dùng sống ở quận Bình Thạnh, TP Hồ Chí Minh",
+    "Người dùng có một con mèo tên Mochi",
+    "The user prefers answers in English when discussing code",
+    "tôi có ăn được hải sản không, tôm thì sao",
+    "gợi ý quán cà phê yên tĩnh",
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return SentenceTransformerEmbedder().encode(TEXTS)
+
+
+@pytest.mark.parametrize("quantized,min_cos", [(False, 0.999), (True, 0.98)])
+def test_onnx_matches_sentence_transformers(reference, quantized, min_cos):
+    if not os.path.isdir(ONNX_DIR):
+        pytest.skip(f"no exported ONNX model at {ONNX_DIR}")
+    vecs = OnnxEmbedder(ONNX_DIR, quantized=quantized).encode(TEXTS)
+    assert vecs.shape == reference.shape == (len(TEXTS), 384)
+
+    # Same direction per text...
+    per_text = (vecs * reference).sum(axis=1)
+    assert per_text.min() >= min_cos
+    # ...and the pairwise similarity structure used for retrieval is preserved
+    assert np.abs(vecs @ vecs.T - reference @ reference.T).max() < (1 - min_cos) * 5
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("prometheus_client")
+
+from core.search.lexical import fold_diacritics
+from core.services.extraction_gate import _QUESTION_RE, _SELF_RE, ExtractionGate, is_low_value_message
+
+LABELLED = json.loads((Path(__file__).resolve().parent.parent / "bench" / "data" / "extraction_gate.json").read_text(encoding="utf-8"))["messages"]
+
+
+def _by_label(label):
+    return [it["text"] for it in LABELLED if it["label"] == label]
+
+
+def _self(text):
+    return bool(_SELF_RE.search(fold_diacritics(text.lower())))
+
+
+@pytest.mark.parametrize("text", ["", "ok", "dạ vâng", "hihi", "hahaha", "😂😂", "cảm ơn bạn nha", "!!!"])
+def test_low_value_messages(text):
+    assert is_low_value_message(text)
+
+
+@pytest.mark.parametrize("text", ["Mình bị dị ứng hải sản", "I work as a nurse at a hospital"])
+def test_substantive_messages(text):
+    assert not is_low_value_message(text)
+
+
+@pytest.mark.parametrize("text", _by_label("fact"))
+def test_first_person_facts_match_self_phrase(text):
+    assert _self(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Em ơi tóm tắt đoạn này giúp anh",
+    "Minh Anh bảo mai họp lúc 9 giờ",
+    "Đi tới chợ Bến Thành rồi rẽ trái",
+    "Tối nay ăn gì cũng được",
+    "Send it to me later",
+    "Kể chuyện cổ tích cho mình nghe đi",
+])
+def test_ambiguous_pronoun_tokens_are_not_self_statements(text):
+    assert not _self(text)
+
+
+def test_question_penalty_applies_to_first_person_questions():
+    gate = ExtractionGate(use_embedding=False)
+    statement, _ = gate.score("Mình có nên học tiếng Hàn")
+    question, _ = gate.score("Mình có nên học tiếng Hàn không?")
+    assert _QUESTION_RE.search(fold_diacritics("mình có nên học tiếng hàn không?"))
+    assert question == pytest.approx(statement * 0.6)
+
+
+def test_rules_only_gate_on_labelled_messages():
+    gate = ExtractionGate(use_embedding=False, threshold=0.55)
+    decide = lambda t: gate.score(t)[0] >= gate.threshold
+    assert all(decide(t) for t in _by_label("fact"))
+    assert not any(decide(t) for t in _by_label("question"))
+    chatter = _by_label("chatter")
+    assert sum(not decide(t) for t in chatter) / len(chatter) >= 0.9
+
+
+def test_rules_only_gate_skips_filler_and_counts_decisions():
+    gate = ExtractionGate(use_embedding=False, threshold=0.5)
+    assert not gate.decide("ok nhé").extract
+    assert gate.decide("Tôi sinh ra ở Huế").extract
+    stats = gate.stats()
+    assert stats["counts"]["skipped.heuristic"] == 1
+    assert stats["counts"]["sent.rules"] == 1
+    assert stats["skip_rate"] == 0.5
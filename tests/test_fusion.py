@@ -0,0 +1,8 @@
+from core.search.fusion import reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]])
+    ids = [doc_id for doc_id, _ in fused]
+    assert set(ids[:2]) == {"a", "b"}
+    assert set(ids) == {"a", "b", "c", "d"}
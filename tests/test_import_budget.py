@@ -0,0 +1,60 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+ROOT = Path(__file__).resolve().parent.parent
+# Wall-clock import budget is machine dependent, so it is only checked when set
+BUDGET_MS = os.environ.get("IMPORT_BUDGET_MS")
+HEAVY = [
+    "torch", "sentence_transformers", "google.generativeai", "google.genai", "qdrant_client", "tavily",
+    "confluent_kafka", "langgraph",
+]
+
+# Settings() requires these; values are never used at import time
+DUMMY_ENV = {
+    "OPENAI_API_KEY": "x",
+    "OPENAI_BASE_URL": "http://localhost",
+    "DATASTAX_TOKEN": "x",
+    "ASTRA_CLIENT_ID": "x",
+    "ASTRA_CLIENT_SECRET": "x",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "KAFKA_BOOTSTRAP": "localhost:9092",
+}
+
+
+def _import_app():
+    code = (
+        "import sys, json; import app.main; "
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, **{k: os.environ.get(k, v) for k, v in DUMMY_ENV.items()}}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+app\.main$", line)
+        if m:
+            cumulative_us = int(m.group(1))
+    return json.loads(proc.stdout.strip().splitlines()[-1]), cumulative_us
+
+
+def test_app_main_import_is_light():
+    heavy_loaded, _ = _import_app()
+    assert heavy_loaded == []
+
+
+@pytest.mark.skipif(not BUDGET_MS, reason="set IMPORT_BUDGET_MS to check the import time")
+def test_app_main_import_time_budget():
+    _, cumulative_us = _import_app()
+    assert cumulative_us is not None
+    assert cumulative_us / 1000.0 < float(BUDGET_MS)
@@ -0,0 +1,37 @@
+from core.search.lexical import bm25_scores, fold_diacritics, term_frequencies, tokenize
+
+
+def test_fold_diacritics():
+    assert fold_diacritics("Đà Nẵng, Hà Nội") == "Da Nang, Ha Noi"
+
+
+def test_tokenize_adds_folded_forms_and_bigrams():
+    tokens = tokenize("Hà Nội")
+    assert "hà" in tokens and "ha" in tokens
+    assert "nội" in tokens and "noi" in tokens
+    assert "ha_noi" in tokens
+
+
+def test_tokenize_maps_d_stroke():
+    assert "da_nang" in tokenize("Đà Nẵng")
+
+
+def test_term_frequencies_counts_tokens():
+    tf, n = term_frequencies("mèo mèo chó")
+    assert tf["mèo"] == 2 and tf["meo"] == 2
+    assert n == sum(tf.values())
+
+
+def test_bm25_ranks_matching_docs_only():
+    docs = [(i, *term_frequencies(text)) for i, text in enumerate(["nuôi mèo tên Mướp", "thích chạy bộ", "mèo và chó"])]
+    avgdl = sum(d[2] for d in docs) / len(docs)
+    scored = bm25_scores(tokenize("con meo"), docs, n_docs=len(docs), avgdl=avgdl)
+    assert {doc_id for doc_id, _ in scored} == {0, 2}
+    assert all(s > 0 for _, s in scored)
+    assert [s for _, s in scored] == sorted((s for _, s in scored), reverse=True)
+
+
+def test_bm25_rarer_term_scores_higher():
+    docs = [(0, *term_frequencies("cà phê sữa")), (1, *term_frequencies("cà phê đen")), (2, *term_frequencies("trà sữa"))]
+    scored = dict(bm25_scores(["den", "sua"], docs, n_docs=3, avgdl=5))
+    assert scored[1] > scored[0]
@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from core.services import llm_resilience
+from core.services.llm_resilience import CircuitBreaker, LatencyTracker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", c)
+    return c
+
+
+def test_latency_tracker_needs_min_samples():
+    t = LatencyTracker(window=10, min_samples=3)
+    t.observe(0.1)
+    t.observe(0.2)
+    assert t.percentile(0.95) is None
+    t.observe(0.3)
+    assert t.percentile(0.95) == 0.3
+    assert t.percentile(0.0) == 0.1
+
+
+def test_latency_tracker_window_drops_oldest():
+    t = LatencyTracker(window=3, min_samples=1)
+    for s in (9.0, 0.1, 0.2, 0.3):
+        t.observe(s)
+    assert t.percentile(1.0) == 0.3
+
+
+def test_breaker_opens_at_threshold(clock):
+    b = CircuitBreaker("t1", failure_threshold=2, reset_sec=30)
+    b.record_failure()
+    assert b.allow() and b.state == "closed"
+    b.record_failure()
+    assert not b.allow() and b.state == "open"
+
+
+def test_breaker_success_resets_failure_count(clock):
+    b = CircuitBreaker("t2", failure_threshold=2, reset_sec=30)
+    b.record_failure()
+    b.record_success()
+    b.record_failure()
+    assert b.state == "closed"
+
+
+def test_breaker_half_open_lets_one_trial_through(clock):
+    b = CircuitBreaker("t3", failure_threshold=1, reset_sec=30)
+    b.record_failure()
+    clock.now += 30
+    assert b.state == "half_open"
+    assert b.allow()
+    assert not b.allow()
+    b.record_success()
+    assert b.state == "closed" and b.allow()
+
+
+def test_breaker_failed_trial_reopens(clock):
+    b = CircuitBreaker("t4", failure_threshold=1, reset_sec=30)
+    b.record_failure()
+    clock.now += 31
+    assert b.allow()
+    b.record_failure()
+    assert b.state == "open" and not b.allow()
+    clock.now += 30
+    assert b.allow()
@@ -0,0 +1,237 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from config import settings
+from core.services import llm_resilience
+from core.services.context_cache import get_context_cache
+from core.services.llm_resilience import LLMTimeoutError, LLMUnavailableError, get_breaker, get_latency_tracker
+from core.services.llm_service import LLMService
+
+# model_name -> callable(prompt) returning the reply or raising; default "ok"
+BEHAVIOUR = {}
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Model:
+    def __init__(self, calls, **kwargs):
+        self.calls = calls
+        self.kwargs = kwargs
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append(("generate", self.kwargs, prompt))
+        return [_Chunk(BEHAVIOUR.get(self.kwargs.get("model_name"), lambda p: "ok")(prompt))]
+
+
+def _fake_genai(calls):
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+
+    class GenerativeModel(_Model):
+        def __init__(self, **kwargs):
+            super().__init__(calls, **kwargs)
+
+        @classmethod
+        def from_cached_content(cls, *, cached_content, generation_config):
+            calls.append(("from_cached", cached_content))
+            return cls(cached_content=cached_content)
+
+    class CachedContent:
+        @staticmethod
+        def create(**kwargs):
+            calls.append(("create_cache", kwargs))
+            return types.SimpleNamespace(name="cachedContents/1", delete=lambda: None)
+
+    genai.GenerativeModel = GenerativeModel
+    genai.caching = types.SimpleNamespace(CachedContent=CachedContent)
+    return genai
+
+
+@pytest.fixture
+def genai_calls(monkeypatch):
+    calls = []
+    google = types.ModuleType("google")
+    google.generativeai = _fake_genai(calls)
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", google.generativeai)
+    monkeypatch.setattr(settings, "google_api_key", "x")
+    monkeypatch.setattr(settings, "llm_fallback_provider", "none")
+    monkeypatch.setattr(settings, "llm_hedge_tasks", [])
+    monkeypatch.setattr(settings, "llm_context_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_context_cache_min_tokens", 1024)
+    monkeypatch.setattr(settings, "llm_breaker_failures", 2)
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 5)
+    monkeypatch.setattr(llm_resilience, "_BREAKERS", {})
+    monkeypatch.setattr(llm_resilience, "_TRACKERS", {})
+    BEHAVIOUR.clear()
+    return calls
+
+
+def _wait_for_cache(llm, cache_key, prefix, timeout=2.0):
+    registry = get_context_cache()
+    key, digest = f"{llm.model}:{cache_key}", registry.digest("sys", prefix)
+    deadline = time.monotonic() + timeout
+    while registry.get(key, digest) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return registry.get(key, digest) is not None
+
+
+def test_large_prefix_uses_cached_content(genai_calls):
+    llm = LLMService(task="reply")
+    prefix = "Context (may be partial):\n" + "fact " * 1200
+    assert llm.chat(system_prompt="sys", user_prompt="User: hi", prefix=prefix, cache_key="cache-user-1") == "ok"
+    # The first turn goes out uncached while the cache is created off the request path
+    assert _wait_for_cache(llm, "cache-user-1", prefix)
+    assert llm.chat(system_prompt="sys", user_prompt="User: hi", prefix=prefix, cache_key="cache-user-1") == "ok"
+    kinds = [c[0] for c in genai_calls]
+    assert kinds.count("create_cache") == 1
+    assert kinds.count("from_cached") == 1
+    assert [c[2] for c in genai_calls if c[0] == "generate"] == [prefix + "User: hi", "User: hi"]
+
+
+def test_wide_prefix_is_sent_only_through_the_cache(genai_calls):
+    llm = LLMService(task="reply")
+    narrow = "Context:\nshort\n"
+    wide = "Context:\n" + "fact " * 1200
+    kwargs = dict(system_prompt="sys", user_prompt="User: hi", prefix=narrow, cache_key="cache-user-3", cacheable_prefix=wide)
+    assert llm.chat(**kwargs) == "ok"
+    assert _wait_for_cache(llm, "cache-user-3", wide)
+    assert llm.chat(**kwargs) == "ok"
+    created = [c[1] for c in genai_calls if c[0] == "create_cache"]
+    assert created[0]["contents"] == [wide]
+    # Uncached turns carry only the narrow prefix; the wide one never goes inline
+    assert [c[2] for c in genai_calls if c[0] == "generate"] == [narrow + "User: hi", "User: hi"]
+
+
+def test_small_prefix_is_sent_inline(genai_calls):
+    llm = LLMService(task="reply")
+    assert llm.chat(system_prompt="sys", user_prompt="User: hi", prefix="Context:\nshort\n", cache_key="cache-user-2") == "ok"
+    assert [c[0] for c in genai_calls] == ["generate"]
+    assert genai_calls[0][2] == "Context:\nshort\n" + "User: hi"
+
+
+def _slow_then_fast():
+    lock, n = threading.Lock(), [0]
+
+    def fn(timeout):
+        with lock:
+            n[0] += 1
+            first = n[0] == 1
+        if first:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    return fn, n
+
+
+def test_hedge_fires_after_p95_and_first_answer_wins(genai_calls):
+    llm = LLMService(task="reply")
+    tracker = get_latency_tracker("reply:hedge-target")
+    for _ in range(5):
+        tracker.observe(0.02)
+    fn, n = _slow_then_fast()
+    assert llm._call("hedge-target", fn, hedge=True) == "fast"
+    assert n[0] == 2
+
+
+def test_no_hedge_before_min_samples(genai_calls):
+    llm = LLMService(task="reply")
+    fn, n = _slow_then_fast()
+    assert llm._call("cold-target", fn, hedge=True) == "slow"
+    assert n[0] == 1
+
+
+def test_call_timeout_raises_llm_timeout(genai_calls):
+    llm = LLMService(task="reply")
+    llm.timeout_sec = 0.05
+    with pytest.raises(LLMTimeoutError):
+        llm._call("t", lambda timeout: time.sleep(0.3) or "late", hedge=False)
+
+
+def test_call_error_is_reraised(genai_calls):
+    llm = LLMService(task="reply")
+
+    def boom(timeout):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        llm._call("t", boom, hedge=False)
+
+
+def _failing(prompt):
+    raise RuntimeError("gemini down")
+
+
+def test_primary_failure_goes_to_fallback_model(genai_calls, monkeypatch):
+    monkeypatch.setattr(settings, "llm_fallback_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_fallback_model", "backup-model")
+    BEHAVIOUR.update({"primary-model": _failing, "backup-model": lambda p: "from backup"})
+    llm = LLMService(task="reply", model="primary-model")
+    assert llm.chat(system_prompt="sys", user_prompt="hi") == "from backup"
+    assert llm.chat(system_prompt="sys", user_prompt="hi") == "from backup"
+    # Two failures open the primary's breaker: the next call skips it entirely
+    assert get_breaker("gemini:primary-model").state == "open"
+    before = len(genai_calls)
+    assert llm.chat(system_prompt="sys", user_prompt="hi") == "from backup"
+    assert [c[1]["model_name"] for c in genai_calls[before:]] == ["backup-model"]
+
+
+def test_fallback_gets_only_the_time_left(genai_calls, monkeypatch):
+    monkeypatch.setattr(settings, "llm_fallback_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_fallback_model", "backup-model")
+    llm = LLMService(task="reply", model="primary-model")
+    llm.timeout_sec = 1.0
+    timeouts = {}
+
+    def fake_gemini(model_name, system_prompt, user_prompt, response_format, prefix, cache_key, timeout, *rest):
+        timeouts[model_name] = timeout
+        if model_name == "primary-model":
+            time.sleep(0.4)
+            raise RuntimeError("gemini down")
+        return "from backup"
+
+    monkeypatch.setattr(llm, "_gemini", fake_gemini)
+    assert llm.chat(system_prompt="sys", user_prompt="hi") == "from backup"
+    assert timeouts["backup-model"] <= 0.65
+
+
+def test_primary_timeout_leaves_no_time_for_fallback(genai_calls, monkeypatch):
+    monkeypatch.setattr(settings, "llm_fallback_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_fallback_model", "backup-model")
+    BEHAVIOUR.update({"primary-model": lambda p: time.sleep(0.3) or "late"})
+    llm = LLMService(task="reply", model="primary-model")
+    llm.timeout_sec = 0.05
+    with pytest.raises(LLMTimeoutError):
+        llm.chat(system_prompt="sys", user_prompt="hi")
+    assert [c[1]["model_name"] for c in genai_calls] == ["primary-model"]
+
+
+def test_breaker_open_without_fallback_is_unavailable(genai_calls):
+    llm = LLMService(task="reply", model="primary-model")
+    breaker = get_breaker("gemini:primary-model")
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(LLMUnavailableError):
+        llm.chat(system_prompt="sys", user_prompt="hi")
+
+
+def test_both_breakers_open_is_unavailable(genai_calls, monkeypatch):
+    monkeypatch.setattr(settings, "llm_fallback_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_fallback_model", "backup-model")
+    for name in ("gemini:primary-model", "gemini:backup-model"):
+        get_breaker(name).record_failure()
+        get_breaker(name).record_failure()
+    with pytest.raises(LLMUnavailableError):
+        LLMService(task="reply", model="primary-model").chat(system_prompt="sys", user_prompt="hi")
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+
+from pymongo.errors import OperationFailure
+
+from core.repositories import long_term_memory
+from core.repositories.long_term_memory import LongTermMemoryRepo
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    monkeypatch.setattr(long_term_memory.settings, "ltm_mongo_vector_backend", "auto")
+    monkeypatch.setattr(long_term_memory.settings, "ltm_vector_backend_reprobe_sec", 300.0)
+    r = LongTermMemoryRepo(collection="ltm_backend_test")
+    long_term_memory._VECTOR_BACKEND.pop((r.db_name, r.collection), None)
+    monkeypatch.setattr(r, "_vector_index_ready", lambda: True)
+    monkeypatch.setattr(r, "search_similar_local", lambda **kw: ["local"])
+    yield r
+    long_term_memory._VECTOR_BACKEND.pop((r.db_name, r.collection), None)
+
+
+def _search(repo):
+    return repo.search_similar(user_id=1, query_embedding=[0.1, 0.2], top_k=1)
+
+
+def test_transient_atlas_error_falls_back_for_one_call(repo, monkeypatch):
+    calls = []
+
+    def flaky(**kw):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationFailure("interrupted", code=11601)
+        return ["atlas"]
+
+    monkeypatch.setattr(repo, "search_vector", flaky)
+    assert _search(repo) == ["local"]
+    assert repo.detect_vector_backend() == "atlas"
+    assert _search(repo) == ["atlas"]
+
+
+def test_unsupported_vector_search_demotes_until_reprobe(repo, monkeypatch):
+    def unsupported(**kw):
+        raise OperationFailure("Unrecognized pipeline stage name: '$vectorSearch'", code=40324)
+
+    monkeypatch.setattr(repo, "search_vector", unsupported)
+    assert _search(repo) == ["local"]
+    assert repo.detect_vector_backend() == "local"
+
+    monkeypatch.setattr(repo, "search_vector", lambda **kw: ["atlas"])
+    now = long_term_memory.time.monotonic()
+    monkeypatch.setattr(long_term_memory.time, "monotonic", lambda: now + 301)
+    assert _search(repo) == ["atlas"]
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from core.services.memory_compaction import MemoryCompactor, importance
+
+NOW = datetime(2026, 1, 31)
+
+
+def test_importance_halves_per_half_life():
+    fresh = importance({"confidence": 0.8, "created_at": NOW}, now=NOW, half_life_days=30)
+    old = importance({"confidence": 0.8, "created_at": NOW - timedelta(days=30)}, now=NOW, half_life_days=30)
+    assert fresh == pytest.approx(0.8)
+    assert old == pytest.approx(0.4)
+
+
+def test_importance_uses_last_access_hits_and_default_confidence():
+    doc = {"created_at": NOW - timedelta(days=300), "last_accessed_at": NOW, "hits": 3}
+    assert importance(doc, now=NOW, default_confidence=0.5) == pytest.approx(0.5 * (1 + 1.3862943611198906))
+    assert importance({"confidence": 0.9, "created_at": NOW.isoformat()}, now=NOW) == pytest.approx(0.9)
+
+
+class _Repo:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def iter_scoring_fields(self, *, user_id):
+        return iter(self.docs)
+
+    def delete_memories(self, *, user_id, docs):
+        ids = {d["_id"] for d in docs}
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+        return before - len(self.docs)
+
+    def contents_in_use(self, *, user_id, contents):
+        return {d["content"] for d in self.docs} & set(contents)
+
+
+class _Vectors:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_memories(self, *, user_id, texts):
+        self.deleted.extend(texts)
+
+
+def _doc(i, confidence, content=None):
+    return {"_id": i, "content": content or f"fact{i}", "confidence": confidence, "created_at": NOW}
+
+
+def test_select_evictions_returns_lowest_scores_beyond_capacity():
+    repo = _Repo([_doc(0, 0.9), _doc(1, 0.1), _doc(2, 0.5), _doc(3, 0.3), _doc(4, 0.8)])
+    victims = MemoryCompactor(repo=repo, vectors=_Vectors(), capacity=3, half_life_days=30).select_evictions(1, now=NOW)
+    assert [d["_id"] for d in victims] == [1, 3]
+
+
+def test_select_evictions_under_capacity_is_empty():
+    repo = _Repo([_doc(0, 0.9), _doc(1, 0.1)])
+    assert MemoryCompactor(repo=repo, vectors=_Vectors(), capacity=2).select_evictions(1, now=NOW) == []
+
+
+def test_compact_keeps_vector_point_of_duplicated_content():
+    # Two docs share "likes tea"; evicting one must not drop the shared Qdrant point
+    repo = _Repo([_doc(0, 0.9, "likes tea"), _doc(1, 0.1, "likes tea"), _doc(2, 0.2), _doc(3, 0.8)])
+    vectors = _Vectors()
+    compactor = MemoryCompactor(repo=repo, vectors=vectors, capacity=2, half_life_days=30)
+    assert compactor.compact_user(1) == 2
+    assert vectors.deleted == ["fact2"]
+
+
+def test_repo_delete_memories_only_counts_deleted_docs(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from core.database.mongodb_client import MongoManager
+    from core.repositories.long_term_memory import LongTermMemoryRepo
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(MongoManager, "collection", lambda self, name, **kw: db[name])
+    repo = LongTermMemoryRepo()
+    db[repo.collection].insert_many([{"_id": i, "user_id": "1", "content": f"f{i}", "lex_len": 10 + i} for i in range(3)])
+    db[repo.stats_collection].insert_one({"user_id": "1", "doc_count": 3, "total_len": 33})
+    # _id 9 was already gone: it must not be subtracted from the BM25 stats
+    victims = [{"_id": 0, "lex_len": 10}, {"_id": 2, "lex_len": 12}, {"_id": 9, "lex_len": 50}]
+    assert repo.delete_memories(user_id=1, docs=victims) == 2
+    stats = db[repo.stats_collection].find_one({"user_id": "1"})
+    assert (stats["doc_count"], stats["total_len"]) == (1, 11)
+    assert repo.contents_in_use(user_id=1, contents=["f0", "f1"]) == {"f1"}
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("numpy")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from core.services import memory_service
+from core.services.memory_service import _ExpiringKeys
+
+
+def test_expiring_keys_expire(monkeypatch):
+    keys = _ExpiringKeys(ttl_sec=10, max_entries=10)
+    keys.add("1")
+    assert "1" in keys
+    now = memory_service.time.monotonic()
+    monkeypatch.setattr(memory_service.time, "monotonic", lambda: now + 11)
+    assert "1" not in keys
+    assert len(keys) == 0
+
+
+def test_expiring_keys_bounded_lru():
+    keys = _ExpiringKeys(ttl_sec=60, max_entries=2)
+    for k in ("1", "2", "3"):
+        keys.add(k)
+    assert len(keys) == 2
+    assert "1" not in keys and "3" in keys
+
+
+def test_expiring_keys_discard_and_disabled():
+    keys = _ExpiringKeys(ttl_sec=60, max_entries=2)
+    keys.add("1")
+    keys.discard("1")
+    keys.discard("missing")
+    assert "1" not in keys
+    off = _ExpiringKeys(ttl_sec=0, max_entries=2)
+    off.add("1")
+    assert "1" not in off
@@ -0,0 +1,117 @@
+from core.services.prompt_builder import PromptBudget, PromptBuilder, estimate_tokens, truncate_to_tokens
+
+
+def _turns(n, words=20):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn{i} " + "lorem " * words} for i in range(n)]
+
+
+def test_truncate_to_tokens_keeps_short_text():
+    assert truncate_to_tokens("hello world", 10) == "hello world"
+
+
+def test_truncate_to_tokens_fits_budget():
+    text = "word " * 200
+    out = truncate_to_tokens(text, 20)
+    assert out.endswith(" …")
+    assert estimate_tokens(out) <= 20
+    assert text.startswith(out[:-2].rstrip())
+
+
+def test_truncate_to_tokens_zero_budget():
+    assert truncate_to_tokens("anything", 0) == ""
+
+
+def test_fill_history_keeps_newest_turns():
+    builder = PromptBuilder()
+    block, dropped = builder._fill_history(_turns(3, words=2), 1000)
+    assert dropped == 0
+    assert block.splitlines()[0] == "Recent conversation:"
+    assert "omitted" not in block
+    assert block.index("turn0") < block.index("turn2")
+
+
+def test_fill_history_omitted_line_stays_within_budget():
+    builder = PromptBuilder()
+    history = _turns(40)
+    for budget in range(30, 400, 7):
+        block, dropped = builder._fill_history(history, budget)
+        assert dropped > 0
+        assert estimate_tokens(block) <= budget + 2  # +1 per newline join in the estimate
+        if block:
+            assert f"({dropped} earlier turn(s) omitted)" in block
+            assert "turn39" in block
+
+
+def test_fill_history_nothing_fits():
+    block, dropped = PromptBuilder()._fill_history(_turns(2, words=400), 10)
+    assert (block, dropped) == ("", 2)
+
+
+def test_build_splits_stable_prefix_from_turn_suffix():
+    built = PromptBuilder().build(
+        system="You are helpful.",
+        user_message="hi there",
+        summary="User likes tea.",
+        profile=["Lives in Hue", "Has a cat"],
+        long_term=["Has a cat", "Allergic to shrimp"],
+        history=_turns(2, words=3),
+        search_results=[{"title": "Tea", "url": "http://t"}],
+    )
+    assert built.user_prompt == built.prefix + built.suffix
+    assert "User likes tea." in built.prefix and "Lives in Hue" in built.prefix
+    assert "Allergic to shrimp" in built.suffix
+    # Profile facts are not repeated in the long-term block
+    assert built.suffix.count("Has a cat") == 0
+    assert built.suffix.endswith("User: hi there\nAssistant:")
+    assert built.dropped_turns == 0
+
+
+def test_build_respects_total_budget():
+    budget = PromptBudget(total=400)
+    built = PromptBuilder(budget).build(
+        system="sys " * 50,
+        user_message="question " * 50,
+        summary="summary " * 500,
+        profile=["fact " * 30] * 20,
+        long_term=["memory " * 30] * 20,
+        history=_turns(60),
+    )
+    assert built.tokens["total"] <= budget.total + 20
+    assert built.dropped_turns > 0
+
+
+def _facts(n):
+    return [f"fact {i}: " + "detail " * 10 for i in range(n)]
+
+
+def test_cacheable_prefix_reaches_cache_min_without_growing_the_prompt():
+    budget = PromptBudget(total=1500, profile=100, cache_min=1024, cached_profile=4000)
+    built = PromptBuilder(budget).build(system="sys", user_message="hi", profile=_facts(200), history=_turns(30))
+    assert 1024 <= built.tokens["system"] + built.tokens["cacheable_prefix"] <= 4000 + 50
+    assert built.cacheable_prefix.startswith("Context (may be partial):\n")
+    # The regular prompt (sent whenever no cache handle is used) stays within the total
+    assert built.tokens["profile"] <= 100
+    assert built.tokens["total"] <= budget.total + 20
+    assert built.user_prompt == built.prefix + built.suffix
+
+
+def test_short_profile_has_no_cacheable_prefix():
+    budget = PromptBudget(total=1500, profile=100, cache_min=1024, cached_profile=4000)
+    built = PromptBuilder(budget).build(system="sys", user_message="hi", profile=_facts(5))
+    assert built.cacheable_prefix == ""
+    assert built.tokens["cacheable_prefix"] == 0
+
+
+def test_memories_missing_from_the_prefix_stay_in_the_long_term_block():
+    budget = PromptBudget(total=1500, profile=30)
+    facts = _facts(10)
+    built = PromptBuilder(budget).build(system="sys", user_message="hi", profile=facts, long_term=[facts[-1]])
+    assert facts[-1].strip() not in built.prefix
+    assert facts[-1].strip() in built.suffix
+
+
+def test_user_message_is_never_cut():
+    message = "question " * 2000
+    built = PromptBuilder(PromptBudget(total=400)).build(system="sys", user_message=message, history=_turns(10))
+    assert built.suffix.endswith(f"User: {message}\nAssistant:")
+    assert built.tokens["history"] == 0
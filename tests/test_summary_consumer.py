@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from infra.kafka import dead_letter
+from infra.kafka.consumers import summary_consumer
+
+
+class _Msg:
+    def __init__(self, value: bytes):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+    def key(self):
+        return b"1"
+
+    def topic(self):
+        return "conversation-summary"
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return 42
+
+
+class _Producer:
+    def __init__(self):
+        self.produced = []
+
+    def produce(self, **kwargs):
+        self.produced.append(kwargs)
+
+    def flush(self, timeout):
+        return 0
+
+
+class _Svc:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def maybe_update(self, *, user_id):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("llm down")
+        return "summary"
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(dead_letter.time, "sleep", lambda s: None)
+
+
+def test_retries_then_succeeds():
+    producer, svc = _Producer(), _Svc(failures=2)
+    msg = _Msg(json.dumps({"user_id": 1}).encode())
+    assert summary_consumer.handle_message(msg, producer, max_retries=3, svc=svc) == "ok"
+    assert svc.calls == 3 and producer.produced == []
+
+
+def test_exhausted_retries_go_to_dead_letter():
+    producer, svc = _Producer(), _Svc(failures=10)
+    msg = _Msg(json.dumps({"user_id": 1}).encode())
+    assert summary_consumer.handle_message(msg, producer, max_retries=2, svc=svc) == "dead_letter"
+    assert svc.calls == 3
+    (record,) = producer.produced
+    assert record["topic"] == summary_consumer.settings.summary_dead_letter_topic
+    body = json.loads(record["value"])
+    assert body["payload"] == {"user_id": 1} and body["attempts"] == 3 and body["offset"] == 42
+
+
+def test_malformed_message_is_dead_lettered_without_processing():
+    producer, svc = _Producer(), _Svc(failures=0)
+    assert summary_consumer.handle_message(_Msg(b"not json"), producer, max_retries=3, svc=svc) == "dead_letter"
+    assert svc.calls == 0
+    assert json.loads(producer.produced[0]["value"])["raw"] == "not json"
@@ -0,0 +1,89 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langsmith")
+
+from config import settings
+from core.services.summary_service import SummaryService
+
+
+class _Summaries:
+    def __init__(self):
+        self.doc = None
+
+    def get(self, *, user_id):
+        return self.doc
+
+    def upsert(self, *, user_id, **fields):
+        self.doc = fields
+
+
+class _Conversation:
+    def __init__(self, n=12):
+        self.n = n
+        self.pages = []
+
+    def count_after(self, *, user_id, cursor, limit):
+        return min(self.n, limit)
+
+    def get_conversation(self, *, user_id, page_size, cursor, newest_first):
+        self.pages.append(page_size)
+        return {"items": [{"_id": i, "role": "user", "content": f"m{i}"} for i in range(min(self.n, page_size))]}
+
+
+class _Memories:
+    def list_by_user(self, *, user_id, limit):
+        return [{"content": f"fact{i}"} for i in reversed(range(3))][:limit]
+
+
+class _LLM:
+    def chat(self, **kwargs):
+        return "summary"
+
+
+def test_fold_snapshots_profile_oldest_first(monkeypatch):
+    monkeypatch.setattr(settings, "prompt_profile_facts", 20)
+    repo = _Summaries()
+    svc = SummaryService(
+        repo=repo, conversation_repo=_Conversation(), llm=_LLM(), ltm_repo=_Memories(), every_n=4, keep_recent=6,
+    )
+    assert svc.maybe_update(user_id=1) == "summary"
+    assert repo.doc["profile"] == ["fact0", "fact1", "fact2"]
+    assert repo.doc["message_count"] == 6
+
+
+def test_no_fold_reads_no_messages():
+    repo, conv = _Summaries(), _Conversation()
+    svc = SummaryService(repo=repo, conversation_repo=conv, llm=_LLM(), ltm_repo=_Memories(), every_n=10, keep_recent=6)
+    assert svc.maybe_update(user_id=1) is None
+    assert repo.doc is None
+    assert conv.pages == []
+
+
+def test_fold_reads_only_the_due_messages():
+    conv = _Conversation(n=15)
+    svc = SummaryService(repo=_Summaries(), conversation_repo=conv, llm=_LLM(), ltm_repo=_Memories(), every_n=4, keep_recent=6)
+    svc.maybe_update(user_id=1)
+    assert conv.pages == [9]
+
+
+def test_count_after_counts_messages_past_the_cursor(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from datetime import datetime, timedelta
+
+    from bson import ObjectId
+
+    from core.database.mongodb_client import MongoManager
+    from core.repositories.conversation import ConversationRepo
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(MongoManager, "collection", lambda self, name, **kw: db[name])
+    repo = ConversationRepo()
+    t0 = datetime(2026, 1, 1)
+    docs = [{"_id": ObjectId(), "user_id": 7, "content": f"m{i}", "created_at": t0 + timedelta(seconds=i)} for i in range(5)]
+    db[repo.collection].insert_many(docs)
+    assert repo.count_after(user_id=7) == 5
+    assert repo.count_after(user_id="7", cursor=ConversationRepo.cursor_for(docs[1])) == 3
+    assert repo.count_after(user_id=7, limit=2) == 2
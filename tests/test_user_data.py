@@ -0,0 +1,73 @@
+import base64
+import json
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip("mongomock")
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+
+from core.database.mongodb_client import MongoManager
+from core.services.user_data import UserDataService, encode_resume_token
+
+
+IDS = sorted(ObjectId() for _ in range(5))
+
+
+@pytest.fixture
+def svc(monkeypatch):
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(MongoManager, "collection", lambda self, name, **kw: db[name])
+    db["messages"].insert_many([{"_id": oid, "user_id": 7, "content": f"m{i}"} for i, oid in enumerate(IDS)])
+    db["long_term_memory"].insert_many([{"_id": i, "user_id": "7", "content": f"f{i}"} for i in range(3)])
+    service = UserDataService()
+    service.batch_size = 2
+    return service
+
+
+def _lines(lines):
+    return [json.loads(line) for line in lines]
+
+
+def test_export_resumes_after_the_last_batch(svc):
+    out = _lines(svc.export_ndjson(user_id=7))
+    docs = [(o["collection"], o["doc"]["content"]) for o in out if o["type"] == "doc"]
+    assert docs == [("messages", f"m{i}") for i in range(5)] + [("long_term_memory", f"f{i}") for i in range(3)]
+    token = [o for o in out if o["type"] == "progress"][1]["resume_token"]
+    resumed = _lines(svc.export_ndjson(user_id=7, resume_token=token))
+    assert [o["doc"]["content"] for o in resumed if o["type"] == "doc"] == ["m4", "f0", "f1", "f2"]
+
+
+@pytest.mark.parametrize("token", [
+    "not-base64-json",
+    base64.urlsafe_b64encode(b'{"x": 1}').decode(),
+    encode_resume_token("no_such_collection", 1),
+])
+def test_invalid_resume_token_fails_before_streaming(svc, token):
+    with pytest.raises(ValueError):
+        svc.export_ndjson(user_id=7, resume_token=token)
+
+
+def test_delete_all_removes_every_store(svc):
+    counts = svc.delete_all(user_id=7)
+    assert counts["messages"] == 5 and counts["long_term_memory"] == 3
+    assert _lines(svc.export_ndjson(user_id=7))[-1] == {"type": "done", "counts": {
+        "messages": 0, "long_term_memory": 0, "tool_logs": 0, "conversation_summaries": 0,
+    }}
+
+
+def test_export_endpoint_rejects_bad_token_with_400(svc, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.api.v1 import agent as agent_api
+    from app.main import app
+
+    monkeypatch.setattr(agent_api, "get_user_data_service", lambda: svc)
+    client = TestClient(app)
+    assert client.get("/v1/agent/export/7", params={"resume_token": "garbage"}).status_code == 400
+    resp = client.get("/v1/agent/export/7")
+    assert resp.status_code == 200 and json.loads(resp.text.splitlines()[-1])["type"] == "done"
@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("prometheus_client")
+qdrant_client = pytest.importorskip("qdrant_client")
+from qdrant_client.http import models as qmodels
+
+from config import settings
+from core.repositories.vector_memory import QdrantVectorRepo
+
+VEC = [0.1] * 384
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    client = qdrant_client.QdrantClient(location=":memory:")
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant.test")
+    monkeypatch.setattr(qdrant_client, "QdrantClient", lambda **kw: client)
+    return QdrantVectorRepo(collection="ltm_test")
+
+
+def _points(repo):
+    points, _ = repo.client.scroll(collection_name=repo.collection, limit=100, with_payload=True)
+    return sorted((p.payload["user_id"], p.payload["text"], str(p.id)) for p in points)
+
+
+def _legacy(repo, user_id, text):
+    # Points from before ids were derived from (user, text)
+    repo.client.upsert(
+        collection_name=repo.collection,
+        points=[qmodels.PointStruct(id=str(uuid.uuid4()), vector=VEC, payload={"user_id": str(user_id), "text": text})],
+    )
+
+
+def test_upsert_replaces_legacy_random_id_points(repo):
+    _legacy(repo, 1, "likes tea")
+    _legacy(repo, 2, "likes tea")
+    _legacy(repo, 1, "has a cat")
+    assert repo.upsert_memories(user_id=1, texts=["likes tea"], embeddings=[VEC]) == 1
+    assert repo.upsert_memories(user_id=1, texts=["likes tea"], embeddings=[VEC]) == 1
+    user1 = [p for p in _points(repo) if p[0] == "1"]
+    assert [p[1] for p in user1] == ["has a cat", "likes tea"]
+    assert ("1", "likes tea", repo.point_id(1, "likes tea")) in user1
+    # Other users' points with the same text are untouched
+    assert [p[1] for p in _points(repo) if p[0] == "2"] == ["likes tea"]
+
+
+def test_delete_memories_removes_legacy_points_too(repo):
+    _legacy(repo, 1, "likes tea")
+    repo.upsert_memories(user_id=1, texts=["has a cat"], embeddings=[VEC])
+    repo.delete_memories(user_id=1, texts=["likes tea", "has a cat"])
+    assert _points(repo) == []